@@ -1,12 +1,20 @@
 # src/autoheader/__init__.py
 
-from importlib.metadata import version, PackageNotFoundError
+# Exports are resolved lazily (PEP 562): the `autoheader` console script
+# imports this package first, and should not pay for the SDK or package
+# metadata on every invocation.
 
-try:
-    __version__ = version("autoheader")
-except PackageNotFoundError:
-    __version__ = "0.0.0"
+__all__ = ["AutoHeader", "HeaderResult"]
 
-from .api import AutoHeader, HeaderResult
 
-__all__ = ["AutoHeader", "HeaderResult"]
+def __getattr__(name: str):
+    if name in __all__:
+        from . import api
+        return getattr(api, name)
+    if name == "__version__":
+        from importlib.metadata import version, PackageNotFoundError
+        try:
+            return version("autoheader")
+        except PackageNotFoundError:
+            return "0.0.0"
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -8,8 +8,10 @@ from . import config
 from . import filesystem
 from . import planner
 from . import core
+from . import hashing
+from . import journal
 from .models import RuntimeContext, PlanItem, LanguageConfig
-from .constants import ROOT_MARKERS
+from .constants import ROOT_MARKERS, MAX_FILE_SIZE_BYTES, GENERATED_MARKERS, MINIFIED_LINE_LENGTH
 
 @dataclass
 class HeaderResult:
@@ -44,6 +46,9 @@ class AutoHeader:
         # Load excludes
         gitignore_excludes = filesystem.load_gitignore_patterns(self.root)
         self.excludes = list(self.general_config.get("exclude", [])) + gitignore_excludes
+        self.cache_hash = self.general_config.get("cache_hash", hashing.DEFAULT_CACHE_ALGORITHM)
+        # Id of the last journaled apply/remove, for undo()
+        self.last_run_id: str | None = None
 
     def _execute(
         self,
@@ -51,7 +56,8 @@ class AutoHeader:
         mode: Literal["apply", "remove", "check"],
         dry_run: bool = False,
         override: bool = False,
-        workers: int | None = None
+        workers: int | None = None,
+        patch_out: str | Path | None = None,
     ) -> List[HeaderResult]:
 
         if paths:
@@ -76,6 +82,11 @@ class AutoHeader:
             remove=remove,
             check_hash=False, # TODO: Expose check_hash
             timeout=self.timeout,
+            streaming_threshold=self.general_config.get("streaming_threshold", MAX_FILE_SIZE_BYTES),
+            cache_hash_algorithm=self.cache_hash,
+            header_hash_algorithm=self.general_config.get("header_hash", hashing.DEFAULT_HEADER_ALGORITHM),
+            generated_markers=self.general_config.get("generated_markers", GENERATED_MARKERS),
+            minified_line_length=self.general_config.get("minified_line_length", MINIFIED_LINE_LENGTH),
         )
 
         plan_generator, _ = planner.plan_files(
@@ -130,18 +141,38 @@ class AutoHeader:
         # Filter items to process
         to_process = [
             item for item in plan_items
-            if item.action not in ("skip-excluded", "skip-header-exists")
+            if item.action not in ("skip-excluded", "skip-header-exists", "skip-generated")
         ]
 
         # Also add skipped items to results for completeness?
         # The user might want to know what happened to all files.
         for item in plan_items:
-            if item.action in ("skip-excluded", "skip-header-exists"):
+            if item.action in ("skip-excluded", "skip-header-exists", "skip-generated"):
                  results.append(HeaderResult(path=item.path, status=item.action))
 
+        if patch_out is not None:
+            from . import patch
+            patched = patch.emit_patch(
+                to_process,
+                Path(patch_out),
+                blank_lines_after=self.general_config.get("blank_lines_after", 1),
+                workers=workers,
+            )
+            results.extend(HeaderResult(path=item.path, status=item.action) for item in patched)
+            return results
+
         if not to_process:
             return results
 
+        fsync_policy = filesystem.FsyncPolicy(self.general_config.get("fsync", "none"))
+        run_journal = None
+        if not dry_run and self.general_config.get("journal", True):
+            run_journal = journal.RunJournal(
+                self.root,
+                hash_algorithm=self.cache_hash,
+                sync=(fsync_policy.mode == "file"),
+            )
+
         with ThreadPoolExecutor(max_workers=workers) as executor:
             future_to_item = {
                 executor.submit(
@@ -150,6 +181,9 @@ class AutoHeader:
                     backup=False, # TODO: Expose backup
                     dry_run=dry_run,
                     blank_lines_after=self.general_config.get("blank_lines_after", 1),
+                    cache_hash_algorithm=self.cache_hash,
+                    fsync=fsync_policy,
+                    journal=run_journal,
                 ): item
                 for item in to_process
             }
@@ -178,7 +212,10 @@ class AutoHeader:
                     ))
 
         if not dry_run:
+            fsync_policy.commit(workers)
             filesystem.save_cache(self.root, new_cache)
+        if run_journal is not None and run_journal.close():
+            self.last_run_id = run_journal.run_id
 
         return results
 
@@ -194,6 +231,31 @@ class AutoHeader:
         """
         return self._execute(paths, mode="remove", dry_run=dry_run)
 
+    def undo(self, run_id: str = "latest", workers: int | None = None) -> journal.UndoResult:
+        """
+        Restore all files changed by a journaled run (default: the latest).
+        Raises ValueError if there is no such run or it was already undone.
+        """
+        resolved = journal.resolve_run(self.root, run_id)
+        if resolved is None:
+            raise ValueError(f"No journaled run to undo ({run_id}).")
+        return journal.undo(self.root, resolved, workers or self.general_config.get("workers", 8))
+
+    def emit_patch(
+        self,
+        out: str | Path,
+        paths: List[str | Path] | None = None,
+        override: bool = False,
+        remove: bool = False,
+    ) -> List[HeaderResult]:
+        """
+        Write the changes apply() (or remove()) would make as one
+        git-apply compatible unified diff to `out`, without modifying files.
+        Returns one result per file in the patch, with the action as status.
+        """
+        mode = "remove" if remove else "apply"
+        return self._execute(paths, mode=mode, override=override, patch_out=out)
+
     def check(self, paths: List[str | Path] | None = None) -> List[HeaderResult]:
         """
         Check if files have correct headers.
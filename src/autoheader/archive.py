@@ -0,0 +1,150 @@
+# src/autoheader/archive.py
+
+from __future__ import annotations
+from pathlib import Path, PurePosixPath
+from typing import IO, Dict, Iterable, Iterator, List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+import dataclasses
+import logging
+import tarfile
+import zipfile
+import zlib
+
+from . import filters
+from . import filesystem
+from .constants import STREAM_HEAD_BYTES
+from .models import LanguageConfig, PlanItem, RuntimeContext
+from .planner import _analyze_blob, _get_language_for_file
+
+log = logging.getLogger(__name__)
+
+# What a corrupt member or a truncated archive raises once reading has begun
+_READ_ERRORS = (tarfile.TarError, zipfile.BadZipFile, zlib.error, EOFError)
+
+
+def _members(archive: Path) -> Iterator[Tuple[str, int, IO[bytes]]]:
+    """
+    (name, size, open stream) for each regular file in a zip (wheel) or tar
+    (sdist, optionally compressed) archive, in archive order. Tarballs are
+    read in one sequential pass, so compressed ones are decompressed once.
+    """
+    if zipfile.is_zipfile(archive):
+        with zipfile.ZipFile(archive) as zf:
+            for zinfo in zf.infolist():
+                if not zinfo.is_dir():
+                    with zf.open(zinfo) as stream:
+                        yield zinfo.filename, zinfo.file_size, stream
+        return
+    try:
+        tf = tarfile.open(archive, mode="r|*")
+    except tarfile.TarError as e:
+        raise ValueError(f"{archive} is not a zip or tar archive: {e}") from e
+    with tf:
+        for tinfo in tf:
+            if tinfo.isfile():
+                member = tf.extractfile(tinfo)
+                if member is not None:
+                    yield tinfo.name, tinfo.size, member
+
+
+class MemberResolver:
+    """
+    Maps archive member names to the repository paths their headers name:
+    an sdist member "pkg-1.0/src/pkg/mod.py" is "src/pkg/mod.py" and a
+    wheel member "pkg/mod.py" of a src layout is also "src/pkg/mod.py".
+    Members that match no (or more than one) repository file keep their name.
+    """
+
+    def __init__(self, repo_paths: Iterable[str]):
+        self.paths = set(repo_paths)
+        self.by_name: Dict[str, List[str]] = {}
+        for rel_posix in self.paths:
+            self.by_name.setdefault(PurePosixPath(rel_posix).name, []).append(rel_posix)
+
+    def resolve(self, name: str) -> str:
+        parts = PurePosixPath(name).parts
+        # Longest tail of the member name that is a repository path (drops an sdist's top directory)
+        for i in range(len(parts)):
+            tail = "/".join(parts[i:])
+            if tail in self.paths:
+                return tail
+        # A repository path that ends with the member name (a wheel of a src layout)
+        matches = [p for p in self.by_name.get(parts[-1], []) if p.endswith("/" + name)]
+        if len(matches) == 1:
+            return matches[0]
+        return name
+
+
+def scan_archive(
+    archive: Path,
+    context: RuntimeContext,
+    languages: List[LanguageConfig],
+    resolver: MemberResolver,
+) -> List[PlanItem]:
+    """
+    Plans every managed member of `archive` straight from the archive
+    stream; nothing is extracted. Members above the streaming threshold
+    are analysed from a head read unless a hash must cover their content.
+    Items are named "<archive>!/<member>" for reporting.
+    Raises ValueError for an archive that cannot be read to the end.
+    """
+    try:
+        display = archive.relative_to(context.root).as_posix()
+    except ValueError:
+        display = str(archive)
+    items = []
+    try:
+        for name, size, stream in _members(archive):
+            rel_posix = resolver.resolve(name)
+            lang = _get_language_for_file(PurePosixPath(rel_posix), languages)
+            if lang is None:
+                continue
+            path = context.root / rel_posix
+            if filters.is_excluded(path, context.root, context.excludes) or not filters.within_depth(path, context.root, context.depth):
+                item = PlanItem(path, rel_posix, "skip-excluded", prefix=lang.prefix, check_encoding=lang.check_encoding, template=lang.template, analysis_mode=lang.analysis_mode, license_spdx=lang.license_spdx)
+            else:
+                whole = size <= context.streaming_threshold or context.check_hash or "{hash}" in lang.template
+                data = stream.read() if whole else stream.read(STREAM_HEAD_BYTES)
+                item = _analyze_blob(rel_posix, data, lang, context, size=size)
+            items.append(dataclasses.replace(item, path=archive, rel_posix=f"{display}!/{name}"))
+    except _READ_ERRORS as e:
+        raise ValueError(f"{archive} is unreadable: {e}") from e
+    log.debug(f"{display}: {len(items)} managed members.")
+    return items
+
+
+def plan_archives(
+    context: RuntimeContext,
+    archives: List[Path],
+    languages: List[LanguageConfig],
+    workers: int,
+) -> Tuple[Iterator[Tuple[PlanItem, dict | None]], int | None]:
+    """
+    Plans the members of several archives, scanned in parallel (one thread
+    per archive; decompression runs outside the GIL). Member names are
+    resolved against the managed files of the working tree.
+    Returns: (iterator, None), as the member count is only known once read.
+    Raises IOError or ValueError for unreadable archives, here or, for a
+    corrupt member, from the iterator.
+    """
+    for archive in archives:
+        try:
+            readable = zipfile.is_zipfile(archive) or tarfile.is_tarfile(archive)
+        except _READ_ERRORS as e:
+            raise ValueError(f"{archive} is unreadable: {e}") from e
+        if not readable:
+            raise ValueError(f"{archive} is not a zip or tar archive.")
+    repo_paths = [
+        path.relative_to(context.root).as_posix()
+        for path, _ in filesystem.find_configured_files(context.root, languages)
+        if not filters.is_excluded(path, context.root, context.excludes)
+    ]
+    resolver = MemberResolver(repo_paths)
+
+    def generator():
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(archives)))) as pool:
+            for items in pool.map(lambda a: scan_archive(a, context, languages, resolver), archives):
+                for item in items:
+                    yield item, None
+
+    return generator(), None
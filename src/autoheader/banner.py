@@ -2,13 +2,9 @@
 
 # src/create_dump/banner.py
 
-from rich.console import Console
-from rich.text import Text
+# rich and the palette helpers are imported inside print_logo(), so
+# importing this module stays cheap.
 import math
-import random
-import os
-
-console = Console()
 
 def lerp(a, b, t):
     return a + (b - a) * t
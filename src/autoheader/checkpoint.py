@@ -0,0 +1,114 @@
+# src/autoheader/checkpoint.py
+
+from __future__ import annotations
+from pathlib import Path
+from typing import Dict, TextIO
+import json
+import logging
+import threading
+import time
+
+from .constants import (
+    CHECKPOINT_FILE_NAME,
+    CHECKPOINT_INTERVAL_FILES,
+    CHECKPOINT_INTERVAL_SECONDS,
+)
+
+log = logging.getLogger(__name__)
+
+
+def load_checkpoint(root: Path, signature: dict) -> Dict[str, dict]:
+    """
+    Returns the files completed by an interrupted run as
+    {rel_posix: cache entry}, or {} if there is no checkpoint or it was
+    written by a run with different options (`signature`).
+    """
+    path = root / CHECKPOINT_FILE_NAME
+    if not path.is_file():
+        return {}
+    done: Dict[str, dict] = {}
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            header = json.loads(f.readline() or "{}")
+            if header.get("signature") != signature:
+                log.warning("Checkpoint was written with different options; ignoring it.")
+                return {}
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # The last line may be torn if the run was killed mid-write
+                    continue
+                done[record["path"]] = {"mtime": record["mtime"], "hash": record["hash"]}
+    except (IOError, ValueError) as e:
+        log.warning(f"Could not load checkpoint: {e}")
+        return {}
+    return done
+
+
+def _ends_mid_line(path: Path) -> bool:
+    try:
+        with path.open("rb") as f:
+            f.seek(0, 2)
+            if f.tell() == 0:
+                return False
+            f.seek(-1, 2)
+            return f.read(1) != b"\n"
+    except IOError:
+        return False
+
+
+class Checkpoint:
+    """
+    Append-only record of the files a run has completed.
+
+    Each completed file is one JSON line; lines are buffered and flushed
+    every CHECKPOINT_INTERVAL_FILES files or CHECKPOINT_INTERVAL_SECONDS,
+    so a preempted run loses at most one interval of progress. The first
+    line holds the run's option `signature`, so `--resume` never applies
+    a checkpoint to a run that would write different headers.
+    """
+
+    def __init__(self, root: Path, signature: dict, resume: bool = False):
+        self.path = root / CHECKPOINT_FILE_NAME
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._last_flush = time.monotonic()
+        # Resuming appends to the interrupted run's records, so a second
+        # interruption still remembers the first run's progress.
+        torn = resume and _ends_mid_line(self.path)
+        self._file: TextIO = self.path.open("a" if resume else "w", encoding="utf-8")
+        if not resume or self._file.tell() == 0:
+            self._file.write(json.dumps({"signature": signature}) + "\n")
+            self._file.flush()
+        elif torn:
+            self._file.write("\n")  # Terminate the torn record instead of extending it
+
+    def record(self, rel_posix: str, entry: dict) -> None:
+        """Marks `rel_posix` as done with its new cache entry."""
+        with self._lock:
+            self._file.write(json.dumps({"path": rel_posix, **entry}) + "\n")
+            self._pending += 1
+            if (
+                self._pending >= CHECKPOINT_INTERVAL_FILES
+                or time.monotonic() - self._last_flush >= CHECKPOINT_INTERVAL_SECONDS
+            ):
+                self._flush_locked()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        self._file.flush()
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def close(self, completed: bool) -> None:
+        """Closes the checkpoint; a completed run has nothing to resume, so it is deleted."""
+        with self._lock:
+            self._file.close()
+        if completed:
+            self.path.unlink()
+        else:
+            log.warning("Run interrupted; continue it with 'autoheader --resume'.")
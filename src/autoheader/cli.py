@@ -1,50 +1,57 @@
 # src/autoheader/cli.py
 
-
+from __future__ import annotations
 import argparse
 from pathlib import Path
 import sys
-from typing import List
+from typing import Dict, List
 import logging
-import importlib.metadata
 import time
-from rich.progress import track, Progress
 
-# --- ADD THIS ---
-try:
-    from rich_argparse import RichHelpFormatter
-except ImportError:
-    # Fallback for environments where rich-argparse isn't installed
-    RichHelpFormatter = argparse.HelpFormatter  # type: ignore
-# --- END ADD ---
+# rich, rich_argparse, the banner and package metadata are imported where
+# they are used: a hook or CI run that never shows them never pays for them.
 
 # Add TimeoutError
 from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError
 
 from . import app
+from . import launcher
 from . import ui
-from .banner import print_logo
 from . import config
 # --- MODIFIED ---
 from .constants import (
     DEFAULT_EXCLUDES,
     ROOT_MARKERS,
     CONFIG_FILE_NAME,  # <-- ADD THIS
+    MAX_FILE_SIZE_BYTES,
+    FSYNC_MODES,
+    SKIP_WORKTREE_REASON,
+    GENERATED_MARKERS,
+    MINIFIED_LINE_LENGTH,
 )
 # Update imports to use planner and new core
-from .planner import plan_files
+from .planner import configured_files, plan_blobs, plan_files, plan_revision, select_renamed
 from .core import write_with_header
 
 # --- ADD THIS IMPORT ---
 from . import filesystem
+from . import git
+from . import hashing
+from . import journal
+from . import checkpoint
+from . import planfile
 from .models import PlanItem, RuntimeContext
 
 # Get the root logger for our application
 log = logging.getLogger("autoheader")
 
+_HELP_FLAGS = ("-h", "--help")
+
 
 def get_version() -> str:
     """Get package version from metadata."""
+    import importlib.metadata
+
     try:
         # Get version from package metadata
         return importlib.metadata.version("autoheader")
@@ -53,18 +60,45 @@ def get_version() -> str:
         return "0.1.0-dev"
 
 
+def use_rich_help(parser: argparse.ArgumentParser) -> None:
+    """
+    Renders help with rich_argparse. Only done when help is shown: argparse
+    instantiates the formatter for every add_argument() call.
+    """
+    try:
+        from rich_argparse import RichHelpFormatter
+    except ImportError:
+        # Fallback for environments where rich-argparse isn't installed
+        return
+    parser.formatter_class = RichHelpFormatter
+
+
+class _VersionAction(argparse.Action):
+    """`--version`, reading package metadata only when asked for."""
+
+    def __init__(self, option_strings, dest=argparse.SUPPRESS, default=argparse.SUPPRESS, help=None):
+        super().__init__(option_strings=option_strings, dest=dest, default=default, nargs=0, help=help)
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        print(f"{parser.prog} {get_version()}")
+        parser.exit()
+
+
+def _show_banner() -> bool:
+    """The banner is for people at a terminal, not hooks, pipes or CI logs."""
+    return sys.stdout.isatty() and not ui.console.quiet
+
+
 def build_parser() -> argparse.ArgumentParser:
     p = argparse.ArgumentParser(
         prog="autoheader",
         description="Add a repo-relative path header to source files, safely and repeatably.",
-        # --- ADD THIS LINE ---
-        formatter_class=RichHelpFormatter,
     )
 
     p.add_argument(
         "--version",
-        action="version",
-        version=f"%(prog)s {get_version()}",
+        action=_VersionAction,
+        help="show program's version number and exit",
     )
 
     p.add_argument(
@@ -103,6 +137,66 @@ def build_parser() -> argparse.ArgumentParser:
         action="store_true",
         help="Verify file integrity by checking content hash in headers.",
     )
+    g_ci.add_argument(
+        "--header-hash",
+        choices=sorted(hashing.ALGORITHMS),
+        help="Hash algorithm for the {hash} placeholder. (Config: [general] header_hash)",
+    )
+    g_ci.add_argument(
+        "--cache-hash",
+        choices=sorted(hashing.ALGORITHMS),
+        help="Hash algorithm for cache entries. (Config: [general] cache_hash)",
+    )
+    g_ci.add_argument(
+        "--plan-out",
+        type=Path,
+        metavar="FILE",
+        help="Also write the planned actions, with file fingerprints, to FILE (NDJSON).",
+    )
+    g_ci.add_argument(
+        "--apply-plan",
+        type=Path,
+        metavar="FILE",
+        help="Execute a plan from --plan-out instead of scanning; files changed since are refused.",
+    )
+    g_changed = g_ci.add_mutually_exclusive_group()
+    g_changed.add_argument(
+        "--since",
+        metavar="REF",
+        help="Only files changed since the merge base of REF and HEAD (per git, working tree included).",
+    )
+    g_changed.add_argument(
+        "--staged",
+        action="store_true",
+        help="Only files staged in the git index. With --check, their staged content is checked.",
+    )
+    g_changed.add_argument(
+        "--renames",
+        nargs="?",
+        const="HEAD",
+        metavar="RANGE",
+        help="Rewrite headers of files git reports as renamed in RANGE (default: HEAD vs the working tree) "
+        "whose header still names the old path.",
+    )
+    g_changed.add_argument(
+        "--rev",
+        metavar="COMMIT",
+        help="Check the files of COMMIT as committed, read from git without a checkout "
+        "(with --check or --format sarif).",
+    )
+    g_changed.add_argument(
+        "--archive",
+        nargs="+",
+        type=Path,
+        metavar="ARCHIVE",
+        help="Check the source files inside wheels, zips and (compressed) tarballs, without extracting them "
+        "(with --check or --format sarif).",
+    )
+    g_ci.add_argument(
+        "--untracked",
+        action="store_true",
+        help="With --since, also include untracked files that git does not ignore.",
+    )
     g_ci_mode = g_ci.add_mutually_exclusive_group()
     g_ci_mode.add_argument(
         "--check",
@@ -138,6 +232,30 @@ def build_parser() -> argparse.ArgumentParser:
         "-y", "--yes", action="store_true", help="Assume yes to all confirmation prompts."
     )
     g_config.add_argument("--backup", action="store_true", help="Create .bak backups before writing.")
+    g_config.add_argument(
+        "--no-journal",
+        dest="journal",
+        action="store_false",
+        help="Do not record this run in the undo journal. (Config: [general] journal)",
+    )
+    g_config.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue an interrupted --no-dry-run run, skipping files it already completed.",
+    )
+    g_config.add_argument(
+        "--undo",
+        nargs="?",
+        const="latest",
+        metavar="RUN_ID",
+        help="Restore all files changed by a journaled run (default: the latest).",
+    )
+    g_config.add_argument(
+        "--fsync",
+        choices=FSYNC_MODES,
+        help="Durability of atomic writes: none, file (per file) or batch (group commit at end). "
+        "(Config: [general] fsync)",
+    )
     g_config.add_argument(
         "--root",
         type=Path,
@@ -156,6 +274,13 @@ def build_parser() -> argparse.ArgumentParser:
         type=float,
         help="Timeout in seconds for processing a single file. (Config: [general] timeout)",
     )
+    g_config.add_argument(
+        "--streaming-threshold",
+        type=int,
+        metavar="BYTES",
+        help="Stream files larger than this instead of loading them into memory. "
+        "(Config: [general] streaming_threshold)",
+    )
     g_config.add_argument("--config-url", type=str, help="URL to fetch remote configuration from.")
     g_config.add_argument("--clear-cache", action="store_true", help="Clear the cache before running.")
     # --- END ADD ---
@@ -172,6 +297,18 @@ def build_parser() -> argparse.ArgumentParser:
         metavar="GLOB",
         help="Extra glob(s) to exclude (can repeat). Defaults also exclude common dangerous paths.",
     )
+    g_filter.add_argument(
+        "--sniff",
+        action="store_true",
+        help="Also manage extensionless files no glob matches, by their shebang, modeline or "
+        "encoding cookie (first 512 bytes; verdicts are cached). (Config: [detection] sniff)",
+    )
+    g_filter.add_argument(
+        "--workspace",
+        action="store_true",
+        help="Treat every directory below the root with its own autoheader.toml as a package "
+        "with its own languages, excludes and depth; headers name package-relative paths.",
+    )
     g_filter.add_argument(
         "--markers",
         action="append",
@@ -197,6 +334,13 @@ def build_parser() -> argparse.ArgumentParser:
     )
     g_output.add_argument("--no-color", action="store_true", help="Disable colored output.")
     g_output.add_argument("--no-emoji", action="store_true", help="Disable emoji prefixes.")
+    g_output.add_argument(
+        "--emit-patch",
+        type=Path,
+        metavar="FILE",
+        help="Write all planned changes as one git-apply compatible diff to FILE ('-' for stdout) "
+        "instead of modifying files.",
+    )
     g_output.add_argument(
         "--format",
         type=str,
@@ -229,15 +373,28 @@ def setup_logging(verbosity: int, quiet: bool) -> None:
 
 
 def main(argv: List[str] | None = None) -> int:
+    exit_code = launcher.dispatch(argv if argv is not None else sys.argv[1:])
+    if exit_code is not None:
+        return exit_code
+    return run(argv)
+
+
+def run(argv: List[str] | None = None) -> int:
+    """The full CLI, for the arguments `launcher.dispatch` leaves to it."""
     start_time = time.monotonic()
-    print_logo() # Print logo unconditionally at the start
+    raw_args = argv if argv is not None else sys.argv[1:]
+
     parser = build_parser()
 
     # If run without any flags or files, show help and exit
-    args_list = argv if argv is not None else sys.argv[1:]
-    if not args_list:
-        parser.print_help()
-        return 0
+    if not raw_args or any(flag in raw_args for flag in _HELP_FLAGS):
+        use_rich_help(parser)
+        if _show_banner():
+            from .banner import print_logo
+            print_logo()
+        if not raw_args:
+            parser.print_help()
+            return 0
 
     # --- MODIFIED: Config Loading ---
     temp_args, remaining_argv = parser.parse_known_args(argv)
@@ -248,6 +405,14 @@ def main(argv: List[str] | None = None) -> int:
         exclude=[],
         blank_lines_after=1,
         timeout=60.0,  # <-- ADD DEFAULT HERE
+        streaming_threshold=MAX_FILE_SIZE_BYTES,
+        cache_hash=hashing.DEFAULT_CACHE_ALGORITHM,
+        header_hash=hashing.DEFAULT_HEADER_ALGORITHM,
+        fsync="none",
+        journal=True,
+        sniff=False,
+        generated_markers=list(GENERATED_MARKERS),
+        minified_line_length=MINIFIED_LINE_LENGTH,
         # prefix=HEADER_PREFIX  <-- REMOVED
     )
 
@@ -257,16 +422,35 @@ def main(argv: List[str] | None = None) -> int:
     )
 
     # Load general settings
-    general_config = config.load_general_config(toml_data)
+    try:
+        general_config = config.load_general_config(toml_data)
+    except ValueError as e:
+        ui.console.print(f"[red]Invalid {CONFIG_FILE_NAME}: {e}[/red]")
+        return 1
     parser.set_defaults(**general_config)
 
     # Final parse
     args = parser.parse_args(argv)
     # --- END MODIFIED ---
 
+    # --rev and --archive plans describe a commit or an archive, not the
+    # working tree: report only
+    if (args.rev or args.archive) and (not (args.check or args.format == "sarif") or args.plan_out or args.apply_plan):
+        parser.error("--rev and --archive only report: use them with --check or --format sarif")
+    if args.archive and args.files:
+        parser.error("explicit files cannot be combined with --archive")
+    if args.workspace and (args.files or args.since or args.staged or args.rev or args.archive or args.renames or args.apply_plan):
+        parser.error("--workspace plans the whole tree: it cannot be combined with files, git selections or --apply-plan")
+
     # --- BUG FIX: Configure Rich Console ---
     ui.console.no_color = args.no_color
     ui.console.quiet = args.quiet
+    # Output parsed by tools (or nobody) skips rich and the banner entirely
+    machine_output = args.check or args.format == "sarif" or str(args.emit_patch) == "-"
+    ui.console.plain = True if args.quiet or machine_output else None
+    if not ui.console.is_plain and _show_banner():
+        from .banner import print_logo
+        print_logo()
     # --- END BUG FIX ---
 
     # Configure logging as the first step
@@ -324,6 +508,24 @@ def main(argv: List[str] | None = None) -> int:
             ui.console.print("[bold]Cache cleared.[/bold]")
     # --- END ADD ---
 
+    if args.undo:
+        run_id = journal.resolve_run(root, args.undo)
+        if run_id is None:
+            ui.console.print(f"[red]No journaled run to undo ({args.undo}).[/red]")
+            return 1
+        try:
+            result = journal.undo(root, run_id, workers=args.workers)
+        except (ValueError, IOError) as e:
+            ui.console.print(f"[red]Undo failed: {e}[/red]")
+            return 1
+        for rel in result.restored:
+            ui.console.print(ui.format_action("RESTORE", rel, args.no_emoji, False))
+        ui.console.print(
+            f"[bold]Undo {run_id}:[/bold] restored={len(result.restored)}, "
+            f"unchanged={len(result.unchanged)}, conflicts={len(result.conflicts)}"
+        )
+        return 1 if result.conflicts else 0
+
     # --- NEW: LSP Server ---
     if args.lsp:
         try:
@@ -354,9 +556,9 @@ def main(argv: List[str] | None = None) -> int:
     ):
         return 1
 
-    # --- NEW: Confirmation for --no-dry-run (skip in check mode) ---
-    if not args.dry_run and not args.yes and not args.check:
-        needs_backup_warning = not args.backup
+    # --- NEW: Confirmation for --no-dry-run (skip in check mode and for reports, which never write) ---
+    if not args.dry_run and not args.yes and not machine_output and not args.emit_patch:
+        needs_backup_warning = not args.backup and not args.journal
         if not ui.confirm_no_dry_run(needs_backup_warning):
             return 1
     # --- END NEW ---
@@ -385,46 +587,160 @@ def main(argv: List[str] | None = None) -> int:
     log.debug(f"Root markers = {args.markers}")
     log.debug(f"Blank lines after header = {args.blank_lines_after}")
     log.debug(f"Processing timeout = {args.timeout}s")  # <-- ADD LOGGING
+    log.debug(f"Streaming threshold = {args.streaming_threshold} bytes")
     # log.debug(f"Header prefix = {args.prefix}") # <-- REMOVED
 
+    # Options that change what a run writes; a checkpoint only resumes
+    # a run with the same ones.
+    run_signature = {
+        "override": args.override,
+        "remove": args.remove,
+        "check_hash": args.check_hash,
+        "header_hash": args.header_hash,
+        "cache_hash": args.cache_hash,
+        "blank_lines_after": args.blank_lines_after,
+    }
+    resume_entries = checkpoint.load_checkpoint(root, run_signature) if args.resume else {}
+    if resume_entries:
+        log.info(f"Resuming: {len(resume_entries)} files were completed before the interruption.")
+
+    context = RuntimeContext(
+        root=root,
+        excludes=all_excludes,
+        depth=args.depth,
+        # Renamed files are selected for a stale path, which override fixes
+        override=args.override or bool(args.renames),
+        remove=args.remove,
+        check_hash=args.check_hash,
+        timeout=args.timeout,
+        streaming_threshold=args.streaming_threshold,
+        cache_hash_algorithm=args.cache_hash,
+        header_hash_algorithm=args.header_hash,
+        resume=resume_entries,
+        sniff=args.sniff,
+        generated_markers=args.generated_markers,
+        minified_line_length=args.minified_line_length,
+    )
+    files = [file.resolve() for file in args.files] or None
+    staged_entries = None
+    if args.untracked and not args.since:
+        parser.error("--untracked requires --since")
+    if args.since and args.files:
+        parser.error("explicit files cannot be combined with --since")
+    if args.staged and (args.check or args.format == "sarif"):
+        # Report on what would be committed: the staged content, from the index
+        try:
+            staged_entries = git.staged_blobs(root, [str(file.resolve().relative_to(root)) for file in args.files])
+        except (RuntimeError, ValueError) as e:
+            ui.console.print(f"[red]{e}[/red]")
+            return 1
+        log.info(f"git reports {len(staged_entries)} staged files.")
+    elif args.since or args.staged:
+        try:
+            changed = git.changed_files(root, since=args.since, staged=args.staged, untracked=args.untracked)
+        except RuntimeError as e:
+            ui.console.print(f"[red]{e}[/red]")
+            return 1
+        if files is not None:
+            changed = [path for path in changed if path in set(files)]
+        # An empty list plans nothing, rather than scanning the whole tree
+        files = configured_files(changed, languages)
+        log.info(f"git reports {len(changed)} changed files, {len(files)} managed.")
+    elif args.renames:
+        if args.files or args.remove:
+            parser.error("--renames cannot be combined with explicit files or --remove")
+        try:
+            renames = git.renamed_files(root, args.renames)
+        except RuntimeError as e:
+            ui.console.print(f"[red]{e}[/red]")
+            return 1
+        files = select_renamed(renames, context, languages, args.workers)
+        log.info(f"git reports {len(renames)} renamed files, {len(files)} with a header naming the old path.")
+
     # 1. PLAN
-    with ui.console.status("Initializing project context..."):
-        context = RuntimeContext(
-            root=root,
-            excludes=all_excludes,
-            depth=args.depth,
-            override=args.override,
-            remove=args.remove,
-            check_hash=args.check_hash,
-            timeout=args.timeout,
-        )
-        # Use planner module
-        plan_generator, total_files = plan_files(
-            context,
-            files=[file.resolve() for file in args.files],
-            languages=languages,
-            workers=args.workers,
+    stale_items: List[PlanItem] = []
+    ws = None
+    # Only a walk of the whole tree may drop the cache entries it did not see
+    full_scan = False
+    if args.apply_plan:
+        # Discovery and analysis were done by the run that wrote the plan
+        try:
+            loaded = planfile.read_plan(args.apply_plan, root)
+        except (IOError, ValueError) as e:
+            ui.console.print(f"[red]Failed to load plan: {e}[/red]")
+            return 1
+        plan, stale_items = planfile.verify_plan(loaded, args.workers)
+        for item in stale_items:
+            log.warning(f"Refusing {item.rel_posix}: it changed after the plan was made.")
+        new_cache = filesystem.load_cache(root)
+    else:
+        with ui.console.status("Initializing project context..."):
+            # Use planner module
+            if args.rev:
+                try:
+                    plan_generator, total_files = plan_revision(
+                        context,
+                        args.rev,
+                        languages,
+                        args.workers,
+                        paths=[file.resolve().relative_to(root).as_posix() for file in args.files] or None,
+                    )
+                except (RuntimeError, ValueError) as e:
+                    ui.console.print(f"[red]{e}[/red]")
+                    return 1
+            elif args.archive:
+                from . import archive
+                try:
+                    plan_generator, total_files = archive.plan_archives(
+                        context, [path.resolve() for path in args.archive], languages, args.workers
+                    )
+                except (IOError, ValueError) as e:
+                    ui.console.print(f"[red]{e}[/red]")
+                    return 1
+            elif staged_entries is not None:
+                plan_generator, total_files = plan_blobs(context, staged_entries, languages, args.workers)
+            elif args.workspace:
+                from .workspace import Workspace
+                try:
+                    ws = Workspace(context, languages)
+                except ValueError as e:
+                    ui.console.print(f"[red]{e}[/red]")
+                    return 1
+                use_cache = not context.override and not context.remove
+                full_scan = True
+                plan_generator, total_files = ws.plan(
+                    args.workers, cache=filesystem.load_cache(root) if use_cache else {}
+                )
+            else:
+                full_scan = files is None
+                plan_generator, total_files = plan_files(
+                    context,
+                    files=files,
+                    languages=languages,
+                    workers=args.workers,
+                )
+
+        # Execute plan generation with progress bar
+        plan = []
+        new_cache = {}
+
+        # We use track directly on the generator, handling the UI here
+        results = ui.track(
+            plan_generator,
+            description="Planning files...",
+            total=total_files,
         )
 
-    # Execute plan generation with progress bar
-    plan = []
-    new_cache = {}
-
-    # We use track directly on the generator, handling the UI here
-    results = track(
-        plan_generator,
-        description="Planning files...",
-        console=ui.console,
-        disable=ui.console.quiet,
-        transient=True,
-        total=total_files,
-    )
-
-    for plan_item, cache_info in results:
-        plan.append(plan_item)
-        if cache_info:
-            rel_posix, cache_entry = cache_info
-            new_cache[rel_posix] = cache_entry
+        try:
+            for plan_item, cache_info in results:
+                plan.append(plan_item)
+                if cache_info:
+                    rel_posix, cache_entry = cache_info
+                    new_cache[rel_posix] = cache_entry
+        except (IOError, ValueError) as e:
+            # An archive found corrupt only once its members are read
+            ui.console.print(f"[red]{e}[/red]")
+            return 1
 
     log.info(f"Plan complete. Found {len(plan)} files.")
 
@@ -434,19 +750,37 @@ def main(argv: List[str] | None = None) -> int:
     skipped_exists = 0
     skipped_excluded = 0
     skipped_cached = 0
+    skipped_sparse = 0
+    skipped_generated = 0
     removed = 0
     items_to_process: List[PlanItem] = []
 
     for item in plan:
         if item.action == "skip-excluded":
             skipped_excluded += 1
+            if item.reason == SKIP_WORKTREE_REASON:
+                skipped_sparse += 1
             log.debug(f"SKIP (excluded): {item.rel_posix} [reason: {item.reason or 'default'}]")
         elif item.action == "skip-header-exists":
             skipped_exists += 1
             log.debug(f"SKIP (ok):   {item.rel_posix} [reason: {item.reason or 'header ok'}]")
+        elif item.action == "skip-generated":
+            skipped_generated += 1
+            log.debug(f"SKIP (generated): {item.rel_posix} [reason: {item.reason}]")
         else:
             items_to_process.append(item)
 
+    if args.plan_out:
+        try:
+            count = planfile.write_plan(
+                args.plan_out,
+                ((item, new_cache.get(item.rel_posix, {})) for item in items_to_process),
+            )
+        except (IOError, PermissionError) as e:
+            ui.console.print(f"[red]Failed to write plan: {e}[/red]")
+            return 1
+        log.info(f"Wrote {count} planned actions to {args.plan_out}.")
+
     # --- NEW: Check Mode ---
     if args.check:
         if items_to_process:
@@ -469,62 +803,133 @@ def main(argv: List[str] | None = None) -> int:
         print(report)
         return 1 if items_to_process else 0
 
+    if args.emit_patch:
+        from . import patch
+        try:
+            patched = patch.emit_patch(
+                items_to_process,
+                args.emit_patch,
+                blank_lines_after=args.blank_lines_after,
+                workers=args.workers,
+            )
+        except (IOError, PermissionError) as e:
+            ui.console.print(f"[red]Failed to write patch: {e}[/red]")
+            return 1
+        if str(args.emit_patch) != "-":
+            ui.console.print(
+                f"Wrote a patch for [bold]{len(patched)}[/bold] files to [bold]{args.emit_patch}[/bold]; "
+                "apply it with 'git apply'."
+            )
+        return 0
+
     # 3. EXECUTE (Now in parallel)
     log.info(f"Applying changes to {len(items_to_process)} files using {args.workers} workers...")
 
-    with ThreadPoolExecutor(max_workers=args.workers) as executor:
-        future_to_item = {
-            # --- MODIFIED: Removed prefix, as it's in the PlanItem ---
-            executor.submit(
-                write_with_header,
-                item,
-                backup=args.backup,
-                dry_run=args.dry_run,
-                blank_lines_after=args.blank_lines_after,
-            ): item
-            for item in items_to_process
-        }
-        # --- END MODIFIED ---
+    fsync_policy = filesystem.FsyncPolicy(args.fsync)
+    run_journal = None
+    if not args.dry_run and args.journal and items_to_process:
+        try:
+            run_journal = journal.RunJournal(
+                root, hash_algorithm=args.cache_hash, sync=(args.fsync == "file")
+            )
+        except OSError as e:
+            log.warning(f"Could not open run journal, this run cannot be undone: {e}")
+
+    run_checkpoint = None
+    if not args.dry_run and items_to_process:
+        try:
+            run_checkpoint = checkpoint.Checkpoint(root, run_signature, resume=bool(resume_entries))
+        except OSError as e:
+            log.warning(f"Could not open checkpoint, this run cannot be resumed: {e}")
 
-        for future in as_completed(future_to_item):
-            item = future_to_item[future]
-            rel = item.rel_posix
-            try:
-                # --- MODIFIED: Use Rich Output and configurable timeout ---
-                action_done, new_mtime, new_hash, diff_info = future.result(timeout=args.timeout)
-                new_cache[rel] = {"mtime": new_mtime, "hash": new_hash}
-
-                if action_done == "override":
-                    overridden += 1
-                elif action_done == "add":
-                    added += 1
-                elif action_done == "remove":
-                    removed += 1
-                
-                # Show diff if available (moved from write_with_header to here)
-                if diff_info:
-                     ui.show_header_diff(*diff_info)
-
-                prefix = "DRY " if args.dry_run else ""
-                action_name = f"{prefix}{action_done.upper()}"
-                ui.console.print(ui.format_action(action_name, rel, args.no_emoji, args.dry_run))
-
-            except TimeoutError as e:
-                ui.console.print(ui.format_error(rel, e, args.no_emoji))
-            except Exception as e:
-                ui.console.print(ui.format_error(rel, e, args.no_emoji))
+    completed = False
+    done: Dict[str, str] = {}  # rel_posix -> executed action
+    try:
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            future_to_item = {
+                # --- MODIFIED: Removed prefix, as it's in the PlanItem ---
+                executor.submit(
+                    write_with_header,
+                    item,
+                    backup=args.backup,
+                    dry_run=args.dry_run,
+                    blank_lines_after=args.blank_lines_after,
+                    cache_hash_algorithm=args.cache_hash,
+                    fsync=fsync_policy,
+                    journal=run_journal,
+                ): item
+                for item in items_to_process
+            }
             # --- END MODIFIED ---
 
+            for future in as_completed(future_to_item):
+                item = future_to_item[future]
+                rel = item.rel_posix
+                try:
+                    # --- MODIFIED: Use Rich Output and configurable timeout ---
+                    action_done, new_mtime, new_hash, diff_info = future.result(timeout=args.timeout)
+                    new_cache[rel] = {"mtime": new_mtime, "hash": new_hash}
+                    done[rel] = action_done
+                    if run_checkpoint is not None:
+                        run_checkpoint.record(rel, new_cache[rel])
+
+                    if action_done == "override":
+                        overridden += 1
+                    elif action_done == "add":
+                        added += 1
+                    elif action_done == "remove":
+                        removed += 1
+                
+                    # Show diff if available (moved from write_with_header to here)
+                    if diff_info:
+                         ui.show_header_diff(*diff_info)
+
+                    prefix = "DRY " if args.dry_run else ""
+                    action_name = f"{prefix}{action_done.upper()}"
+                    ui.console.print(ui.format_action(action_name, rel, args.no_emoji, args.dry_run))
+
+                except TimeoutError as e:
+                    done[rel] = "error"
+                    ui.console.print(ui.format_error(rel, e, args.no_emoji))
+                except Exception as e:
+                    done[rel] = "error"
+                    ui.console.print(ui.format_error(rel, e, args.no_emoji))
+                # --- END MODIFIED ---
+        completed = True
+    finally:
+        # An interrupted run keeps its checkpoint for --resume
+        if run_checkpoint is not None:
+            run_checkpoint.close(completed)
+
     if not args.dry_run:
+        fsync_policy.commit(args.workers)
+        if not full_scan:
+            new_cache = {**filesystem.load_cache(root), **new_cache}
         filesystem.save_cache(root, new_cache)
+    journaled = run_journal is not None and run_journal.close()
 
     # 4. REPORT
     # --- MODIFIED: Use Rich Output ---
     ui.console.print(
-        ui.format_summary(added, overridden, removed, skipped_exists, skipped_excluded)
+        ui.format_summary(
+            added, overridden, removed, skipped_exists, skipped_excluded, skipped_sparse, skipped_generated
+        )
     )
+    if ws is not None:
+        for name, counts in ws.summaries(plan, done):
+            ui.console.print(ui.format_package_summary(name, counts))
     if args.dry_run:
         ui.console.print(ui.format_dry_run_note())
+    if journaled:
+        ui.console.print(
+            f"Run [bold]{run_journal.run_id}[/bold] journaled; "
+            f"revert it with [bold]autoheader --undo {run_journal.run_id}[/bold]."
+        )
+    if stale_items:
+        ui.console.print(
+            f"[red]Refused {len(stale_items)} planned files that changed after the plan was made; "
+            "re-plan them.[/red]"
+        )
     # --- END MODIFIED ---
 
     # --- ADD THIS ---
@@ -533,7 +938,7 @@ def main(argv: List[str] | None = None) -> int:
         ui.console.print(f"\n✨ Done in {duration:.2f}s.")
     # --- END ADD ---
 
-    return 0
+    return 1 if stale_items else 0
 
 
 if __name__ == "__main__":
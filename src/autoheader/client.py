@@ -0,0 +1,130 @@
+# src/autoheader/client.py
+
+# Thin client for `autoheader daemon`. Deliberately imports nothing beyond
+# the standard library, so a forwarded `--check` costs little more than
+# interpreter startup plus one round trip.
+
+from __future__ import annotations
+from pathlib import Path
+from typing import List
+import hashlib
+import json
+import os
+import socket
+import stat
+import sys
+import tempfile
+import time
+
+# How long a client waits for the daemon before checking in-process instead
+CONNECT_TIMEOUT = 0.2
+RESPONSE_TIMEOUT = 60.0
+
+
+def socket_path(root: Path) -> Path:
+    """Per-user, per-repo socket path (kept short: AF_UNIX paths are limited)."""
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    digest = hashlib.sha1(str(root).encode("utf-8")).hexdigest()[:16]
+    uid = os.getuid() if hasattr(os, "getuid") else 0
+    return Path(runtime_dir) / f"autoheader-{uid}-{digest}.sock"
+
+
+def is_trusted(path: Path) -> bool:
+    """
+    True if the socket at `path` was made by a daemon of this user: owned by
+    us and not writable by group or others (the daemon binds it with umask
+    0o177). The path is predictable and may be in the shared temp directory,
+    so another local user could otherwise answer "no changes".
+    """
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return False
+    return stat.S_ISSOCK(st.st_mode) and st.st_uid == os.getuid() and not st.st_mode & 0o022
+
+
+def request(root: Path, payload: dict, timeout: float = RESPONSE_TIMEOUT) -> dict | None:
+    """
+    Sends one JSON request to the daemon serving `root` and returns its
+    response, or None if no trusted daemon is reachable.
+    """
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    path = socket_path(root)
+    if not is_trusted(path):
+        return None
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(CONNECT_TIMEOUT)
+            sock.connect(str(path))
+            sock.settimeout(timeout)
+            sock.sendall((json.dumps(payload) + "\n").encode("utf-8"))
+            data = b""
+            while not data.endswith(b"\n"):
+                chunk = sock.recv(65536)
+                if not chunk:
+                    break
+                data += chunk
+        return json.loads(data)
+    except (OSError, ValueError):
+        return None
+
+
+def _parse_check_argv(argv: List[str]) -> tuple[Path, List[str], bool] | None:
+    """
+    Accepts only `--check [-q] [--root DIR] [FILES...]`; anything else
+    needs the full CLI. Returns (root, files, quiet) or None.
+    """
+    root = None
+    files: List[str] = []
+    quiet = False
+    check = False
+    args = iter(argv)
+    for arg in args:
+        if arg == "--check":
+            check = True
+        elif arg in ("-q", "--quiet"):
+            quiet = True
+        elif arg == "--root":
+            root = next(args, None)
+            if root is None:
+                return None
+        elif arg.startswith("--root="):
+            root = arg.split("=", 1)[1]
+        elif arg.startswith("-"):
+            return None
+        else:
+            files.append(arg)
+    if not check:
+        return None
+    return Path(root or os.getcwd()).resolve(), [str(Path(f).resolve()) for f in files], quiet
+
+
+def run_check(argv: List[str]) -> int | None:
+    """
+    Forwards a `--check` invocation to a running daemon and prints the
+    same report the CLI would. Returns the exit code, or None to make the
+    caller check in-process (unsupported flags, or no daemon running).
+    """
+    start_time = time.monotonic()
+    parsed = _parse_check_argv(argv)
+    if parsed is None:
+        return None
+    root, files, quiet = parsed
+    response = request(root, {"cmd": "check", "files": files})
+    if response is None or "changes" not in response:
+        return None
+
+    changes = response["changes"]
+    if quiet:
+        return 1 if changes else 0
+    out = sys.stdout
+    if changes:
+        out.write("autoheader: The following files require header changes:\n")
+        for rel_posix, action in changes:
+            out.write(f"- {rel_posix} (Action: {action})\n")
+        out.write("\nRun 'autoheader --no-dry-run' to fix.\n")
+        return 1
+    duration = time.monotonic() - start_time
+    out.write(f"✅ autoheader: All headers are correct. (checked in {duration:.2f}s)\n")
+    return 0
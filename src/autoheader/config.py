@@ -4,8 +4,6 @@ from __future__ import annotations
 import logging
 from pathlib import Path
 from typing import Any, Dict, List, Tuple
-import urllib.request
-import socket
 import time
 
 # Use tomllib if available (3.11+), else fall back to tomli
@@ -15,7 +13,9 @@ except ImportError:
     import tomli as tomllib
 
 # --- MODIFIED ---
-from .constants import CONFIG_FILE_NAME, HEADER_PREFIX, DEFAULT_EXCLUDES, ROOT_MARKERS
+from .constants import CONFIG_FILE_NAME, HEADER_PREFIX, DEFAULT_EXCLUDES, ROOT_MARKERS, FSYNC_MODES
+from . import hashing
+from .filters import LanguageIndex
 from .models import LanguageConfig
 from .licenses import get_license_text
 
@@ -26,6 +26,11 @@ def fetch_remote_config_safe(
     url: str, timeout: float = 10.0, max_size: int = 1_048_576
 ) -> dict | None:
     """Safely fetches and parses a remote TOML config file with retries."""
+    # Deferred: urllib.request alone costs more than the rest of the CLI's imports
+    import socket
+    import urllib.error
+    import urllib.request
+
     for attempt in range(3):
         try:
             with urllib.request.urlopen(url, timeout=timeout) as response:
@@ -91,6 +96,7 @@ def load_general_config(toml_data: Dict[str, Any]) -> Dict[str, Any]:
     """
     Loads general settings (non-language) from the TOML data
     and flattens it.
+    Raises ValueError for a setting the command line would reject.
     """
     flat_config = {}
 
@@ -98,9 +104,18 @@ def load_general_config(toml_data: Dict[str, Any]) -> Dict[str, Any]:
     if "general" in toml_data and isinstance(toml_data["general"], dict):
         general = toml_data["general"]
         # --- MODIFIED: Added 'timeout' to the list of keys ---
-        for key in ["backup", "workers", "yes", "override", "remove", "timeout"]:
+        for key in [
+            "backup", "workers", "yes", "override", "remove", "timeout",
+            "streaming_threshold", "cache_hash", "header_hash", "fsync",
+            "journal",
+        ]:
             if key in general:
                 flat_config[key] = general[key]
+        for key, choices in (
+            ("cache_hash", sorted(hashing.ALGORITHMS)), ("header_hash", sorted(hashing.ALGORITHMS)), ("fsync", FSYNC_MODES),
+        ):
+            if key in flat_config and flat_config[key] not in choices:
+                raise ValueError(f"general.{key} must be one of {', '.join(choices)}, not {flat_config[key]!r}")
 
     # [detection] section
     if "detection" in toml_data and isinstance(toml_data["detection"], dict):
@@ -109,6 +124,12 @@ def load_general_config(toml_data: Dict[str, Any]) -> Dict[str, Any]:
             flat_config["depth"] = detection["depth"]
         if "markers" in detection:
             flat_config["markers"] = detection["markers"]
+        if "sniff" in detection:
+            flat_config["sniff"] = detection["sniff"]
+        if "generated_markers" in detection:
+            flat_config["generated_markers"] = detection["generated_markers"]
+        if "minified_line_length" in detection:
+            flat_config["minified_line_length"] = detection["minified_line_length"]
 
     # [exclude] section
     if "exclude" in toml_data and isinstance(toml_data["exclude"], dict):
@@ -130,9 +151,10 @@ def load_general_config(toml_data: Dict[str, Any]) -> Dict[str, Any]:
 def load_language_configs(
     toml_data: Dict[str, Any],
     general_config: Dict[str, Any]
-) -> List[LanguageConfig]:
+) -> LanguageIndex:
     """
-    Parses all [language.*] sections from the TOML data.
+    Parses all [language.*] sections from the TOML data, indexed by
+    file glob for fast lookups (see filters.LanguageIndex).
     """
     languages: List[LanguageConfig] = []
     language_section = toml_data.get("language")
@@ -167,6 +189,7 @@ def load_language_configs(
                     analysis_mode=lang_data.get("analysis_mode", "line"),
                     license_spdx=license_spdx,
                     license_owner=lang_data.get("license_owner"),
+                    interpreters=lang_data.get("interpreters", []),
                 )
                 languages.append(lang)
             except KeyError as e:
@@ -191,7 +214,7 @@ def load_language_configs(
         )
 
     log.debug(f"Loaded {len(languages)} language configurations.")
-    return languages
+    return LanguageIndex(languages)
 
 
 # --- ADD THIS FUNCTION ---
@@ -210,14 +233,34 @@ def generate_default_config() -> str:
 
 [general]
 # Create .bak files before modifying. (Default: false)
+# Not needed for rollback: every --no-dry-run run is journaled and can be
+# reverted with `autoheader --undo [run-id]`.
 backup = false
 
+# Record pre-images of modified files in .autoheader_journal/. (Default: true)
+# journal = true
+
 # Number of parallel workers. (Default: 8)
 workers = 8
 
 # Timeout in seconds for processing a single file. (Default: 60.0)
 # timeout = 60.0
 
+# Files are always replaced atomically (temp file + rename). fsync policy:
+# "none", "file" (fsync every file) or "batch" (one group commit at the end).
+# (Default: "none")
+# fsync = "none"
+
+# Files larger than this many bytes are rewritten out-of-core (streamed)
+# instead of being loaded into memory. (Default: 10000000)
+# streaming_threshold = 10000000
+
+# Content-hash algorithms ("sha256" or "blake2b"). The cache only needs a
+# fast change detector; {hash} headers default to SHA-256. Non-SHA-256
+# header hashes are tagged, e.g. "hash:b2:<hex>".
+# cache_hash = "blake2b"
+# header_hash = "sha256"
+
 # auto-confirm all prompts (e.g., for CI). (Default: false)
 # yes = false
 
@@ -225,6 +268,16 @@ workers = 8
 # Max directory depth to scan. (Default: no limit)
 # depth = 10
 
+# Also plan extensionless files (bin/, scripts/) that no file_globs match,
+# by their shebang, modeline or encoding cookie. (Default: false)
+# sniff = false
+
+# Generated and minified files are skipped ("skip-generated") when their
+# first 4 KiB contain one of these markers (case-sensitive; [] disables)
+# or a line this long (0 disables).
+# generated_markers = ["@generated", "DO NOT EDIT", "Generated by"]
+# minified_line_length = 1000
+
 # Files that mark the project root.
 markers = [
 {markers_toml}
@@ -258,9 +311,16 @@ file_globs = [
 prefix = "# "
 
 # The template for the header line. {{path}} is the placeholder.
+# Also available: {{filename}}, {{year}}, {{hash}}, {{license}}, and from git
+# history (one `git log` pass per run): {{year_created}}, {{year_modified}},
+# {{commit}}. Unlike {{year}}, the git years do not change on January 1st.
 template = "# {{path}}"
 
 # Whether to check for shebangs/encoding (Python-specific)
 check_encoding = true
+
+# With `sniff`, extensionless files whose shebang or modeline names this
+# language (or one of these) are managed too, e.g. "#!/usr/bin/env python3".
+# interpreters = ["python"]
 """
 # --- END ADDED FUNCTION ---
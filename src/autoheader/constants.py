@@ -4,6 +4,8 @@ from __future__ import annotations
 import re
 
 HEADER_PREFIX = "# "  # exact header line prefix
+# UTF-8 byte order mark, preserved verbatim by the byte-level rewrite engine
+UTF8_BOM = b"\xef\xbb\xbf"
 # PEP 263 encoding-cookie regex
 ENCODING_RX = re.compile(r"^[ \t]*#.*coding[:=][ \t]*([-\w.]+)")
 
@@ -22,6 +24,7 @@ DEFAULT_EXCLUDES = {
     "dist",
     "build",
     "node_modules",
+    ".autoheader_journal",
 }
 
 ROOT_MARKERS = [
@@ -31,12 +34,70 @@ ROOT_MARKERS = [
     "pyproject.toml",
 ]
 
-# NEW: Add a file size limit to prevent resource exhaustion (10MB)
+# Default streaming threshold (10MB). Files above it are never loaded into
+# memory: they are analyzed from a bounded head read and rewritten out-of-core.
+# Configurable via [general] streaming_threshold / --streaming-threshold.
 MAX_FILE_SIZE_BYTES = 10_000_000
 
+# Bytes read from the start of a streamed file for header analysis
+STREAM_HEAD_BYTES = 64 * 1024
+
+# Chunk size for copies when the kernel copy primitives are unavailable
+COPY_CHUNK_BYTES = 1024 * 1024
+
+# Files at least this large are hashed and scanned through an mmap instead
+# of Python-level read() chunks or decoded strings.
+MMAP_THRESHOLD_BYTES = 1024 * 1024
+
 # NEW: Config file name
 CONFIG_FILE_NAME = "autoheader.toml"
 
 # --- ADD THIS ---
 # NEW: Inline ignore comment
-INLINE_IGNORE_COMMENT = "autoheader: ignore"
\ No newline at end of file
+INLINE_IGNORE_COMMENT = "autoheader: ignore"
+# Run journal (see journal.RunJournal): directory under the root, and how
+# many runs are kept before the oldest are pruned.
+JOURNAL_DIR_NAME = ".autoheader_journal"
+JOURNAL_KEEP_RUNS = 10
+
+# Checkpoint of completed files, for `--resume` (see checkpoint.py). Buffered
+# records are flushed every CHECKPOINT_INTERVAL_FILES files or
+# CHECKPOINT_INTERVAL_SECONDS seconds, whichever comes first.
+CHECKPOINT_FILE_NAME = ".autoheader_checkpoint"
+CHECKPOINT_INTERVAL_FILES = 1000
+CHECKPOINT_INTERVAL_SECONDS = 10.0
+
+# PlanItem.reason of files that git has not checked out (sparse checkout or
+# skip-worktree); counted separately in the run summary
+SKIP_WORKTREE_REASON = "not checked out"
+
+# Generated and minified files are skipped ("skip-generated") from a head
+# read of this many bytes: a comment line of their leading comment block
+# contains one of the markers, or a line is at least MINIFIED_LINE_LENGTH
+# long. Both are configurable in [detection].
+GENERATED_HEAD_BYTES = 4096
+GENERATED_MARKERS = ("@generated", "DO NOT EDIT", "Generated by")
+MINIFIED_LINE_LENGTH = 1000
+
+# Content sniffing of extensionless scripts (see sniff.Sniffer): bytes read
+# from the start of each file, and the verdict cache under the root
+SNIFF_HEAD_BYTES = 512
+SNIFF_CACHE_FILE_NAME = ".autoheader_sniff"
+
+# `autoheader pre-receive` verdicts by blob, kept in the git directory
+VERDICTS_FILE_NAME = "autoheader-verdicts.json"
+
+# Durability policies for atomic writes (see filesystem.FsyncPolicy)
+FSYNC_MODES = ("none", "file", "batch")
+
+# `autoheader watch`: events are batched until the tree has been quiet for
+# WATCH_DEBOUNCE_SECONDS, but a batch never waits longer than
+# WATCH_MAX_DELAY_SECONDS (e.g. during a long codegen run).
+WATCH_DEBOUNCE_SECONDS = 0.2
+WATCH_MAX_DELAY_SECONDS = 2.0
+
+# Template placeholders filled from git history (see git.file_history); a
+# file without history renders the current year and HISTORY_UNCOMMITTED.
+HISTORY_PLACEHOLDERS = ("{year_created}", "{year_modified}", "{commit}")
+HISTORY_UNCOMMITTED = "uncommitted"
+COMMIT_ABBREV = 12
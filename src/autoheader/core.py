@@ -1,7 +1,7 @@
 # src/autoheader/core.py
 
 from __future__ import annotations
-from typing import Tuple
+from typing import List, Sequence, Tuple
 
 # --- MODIFIED ---
 from .models import PlanItem
@@ -12,76 +12,158 @@ from . import filesystem
 # We keep this for backward compatibility if other modules import it,
 # but point them to planner.
 from .planner import plan_files, _analyze_single_file # noqa
+from .constants import STREAM_HEAD_BYTES
+from .hashing import DEFAULT_CACHE_ALGORITHM, CACHE_DIGEST_SIZE
+from .journal import RunJournal
 
-def write_with_header(
+def render_chunks(
     item: PlanItem,
+    data: bytes,
+    lines: List[str],
     *,
-    backup: bool,
-    dry_run: bool,
+    analysis_mode: str,
+    content_hash: str | None,
     blank_lines_after: int,
-) -> Tuple[str, float, str, Tuple[str, str, str] | None]:
+) -> Tuple[Sequence[bytes | memoryview], headerlogic.HeaderAnalysis, str]:
     """
-    Execute the write/remove action for a single PlanItem.
-    Orchestrates reading, logic, and writing.
+    Computes the new content of `data` (a whole file, or the head of a
+    streamed one) for `item`'s action, without touching the disk.
 
     Returns:
-        (action, new_mtime, new_hash, diff_info)
-        diff_info is None if no diff, else (rel_posix, existing_header, expected_header)
+        (chunks, analysis, expected_header); the new content is the chunks
+        written back-to-back.
     """
-    path = item.path
-    rel_posix = item.rel_posix
-    
-    original_lines = filesystem.read_file_lines(path)
-
     # Need to calculate expected header first
     analysis_prelim = headerlogic.analyze_header_state(
-        original_lines, "", item.prefix, item.check_encoding, item.analysis_mode
+        lines, "", item.prefix, item.check_encoding, analysis_mode
     )
 
     expected = headerlogic.header_line_for(
-        rel_posix,
+        item.header_path or item.rel_posix,
         item.template,
-        content="\n".join(original_lines),
         existing_header=analysis_prelim.existing_header_line,
         license_spdx=item.license_spdx,
         license_owner=item.license_owner,
+        content_hash=content_hash,
+        hash_algorithm=item.hash_algorithm,
     )
-    original_content = "\n".join(original_lines) + "\n"
 
     # Now analyze with expected header
     analysis = headerlogic.analyze_header_state(
-        original_lines, expected, item.prefix, item.check_encoding, item.analysis_mode
+        lines, expected, item.prefix, item.check_encoding, analysis_mode
     )
 
     if item.action == "remove":
-        new_lines = headerlogic.build_removed_lines(
-            original_lines,
-            analysis,
-        )
+        chunks = headerlogic.build_removed_bytes(data, analysis)
     else:  # "add" or "override"
-        new_lines = headerlogic.build_new_lines(
-            original_lines,
+        chunks = headerlogic.build_new_bytes(
+            data,
             expected,
             analysis,
             override=(item.action == "override"),
             blank_lines_after=blank_lines_after,
         )
+    return chunks, analysis, expected
+
+
+def read_for_rewrite(item: PlanItem) -> Tuple[bytes, List[str], str, str | None]:
+    """
+    Reads what `render_chunks` needs for `item`: the whole file, or for a
+    streamed file only a bounded head (analyzed in line mode).
+
+    Returns:
+        (data, lines, analysis_mode, content_hash)
+    """
+    if item.streaming:
+        data = headerlogic.complete_lines(filesystem.read_file_head(item.path, STREAM_HEAD_BYTES))
+        lines = headerlogic.decode_lines(data)
+        analysis_mode = "line"
+        content_hash = None
+        if "{hash}" in item.template:
+            with filesystem.map_file(item.path) as buf:
+                content_hash = headerlogic.content_hash_from_line(buf, 0, item.hash_algorithm)
+        return data, lines, analysis_mode, content_hash
+
+    # Byte-preserving engine: decode only for analysis, never for writing.
+    data = filesystem.read_file_bytes(item.path)
+    lines = headerlogic.decode_lines(data, headerlogic.detect_newline(data))
+    content_hash = None
+    if "{hash}" in item.template:
+        content_hash = headerlogic.content_hash_from_line(data, 0, item.hash_algorithm)
+    return data, lines, item.analysis_mode, content_hash
+
+
+def write_with_header(
+    item: PlanItem,
+    *,
+    backup: bool,
+    dry_run: bool,
+    blank_lines_after: int,
+    cache_hash_algorithm: str = DEFAULT_CACHE_ALGORITHM,
+    fsync: filesystem.FsyncPolicy | None = None,
+    journal: RunJournal | None = None,
+) -> Tuple[str, float, str, Tuple[str, str, str] | None]:
+    """
+    Execute the write/remove action for a single PlanItem.
+    Orchestrates reading, logic, and writing.
+    `new_hash` is made with `cache_hash_algorithm`, for the cache.
+    Writes are atomic; `fsync` selects how durable they are.
+    With a `journal`, the pre-image is recorded before the file is replaced.
+
+    Returns:
+        (action, new_mtime, new_hash, diff_info)
+        diff_info is None if no diff, else (rel_posix, existing_header, expected_header)
+    """
+    path = item.path
+    rel_posix = item.rel_posix
 
-    new_text = "\n".join(new_lines) + "\n"
+    data, lines, analysis_mode, content_hash = read_for_rewrite(item)
+    new_chunks, analysis, expected = render_chunks(
+        item,
+        data,
+        lines,
+        analysis_mode=analysis_mode,
+        content_hash=content_hash,
+        blank_lines_after=blank_lines_after,
+    )
 
     diff_info = None
     if dry_run and item.action in ("add", "override"):
         diff_info = (rel_posix, analysis.existing_header_line, expected)
 
-    filesystem.write_file_content(
-        path,
-        new_text,
-        original_content,
-        backup=backup,
-        dry_run=dry_run,
-    )
+    if item.streaming:
+        # Out-of-core: only the head is rewritten; the rest of the file is
+        # copied by the kernel (or in fixed-size chunks) after it.
+        if journal is not None and not dry_run:
+            journal.capture_file(rel_posix, path)
+        filesystem.stream_rewrite(
+            path,
+            new_chunks,
+            tail_offset=len(data),
+            backup=backup,
+            dry_run=dry_run,
+            fsync=fsync,
+        )
+        new_mtime = path.stat().st_mtime
+        new_hash = filesystem.get_file_hash(path, cache_hash_algorithm, CACHE_DIGEST_SIZE)
+    else:
+        if journal is not None and not dry_run:
+            journal.capture(rel_posix, data)
+        filesystem.write_file_bytes(
+            path,
+            new_chunks,
+            data,
+            backup=backup,
+            dry_run=dry_run,
+            fsync=fsync,
+        )
+        new_mtime = path.stat().st_mtime
+        # Hash what is on disk now without re-reading it
+        new_hash = filesystem.hash_bytes(
+            (data,) if dry_run else new_chunks, cache_hash_algorithm, CACHE_DIGEST_SIZE
+        )
 
-    new_mtime = path.stat().st_mtime
-    new_hash = filesystem.get_file_hash(path)
+    if journal is not None and not dry_run:
+        journal.record_post(rel_posix, new_hash)
 
     return item.action, new_mtime, new_hash, diff_info
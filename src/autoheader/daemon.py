@@ -0,0 +1,199 @@
+# src/autoheader/daemon.py
+
+from __future__ import annotations
+from pathlib import Path
+from typing import List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import json
+import logging
+import os
+import signal
+import socketserver
+import threading
+
+from . import client
+from . import config
+from . import filesystem
+from . import hashing
+from .constants import CONFIG_FILE_NAME, DEFAULT_EXCLUDES, GENERATED_MARKERS, MAX_FILE_SIZE_BYTES, MINIFIED_LINE_LENGTH
+from .models import RuntimeContext
+from .planner import plan_files
+
+log = logging.getLogger(__name__)
+
+# Files whose change invalidates the daemon's loaded state (the reflog
+# changes on every commit and checkout, which moves git history)
+_WATCHED_FILES = (CONFIG_FILE_NAME, ".gitignore", ".autoheader_cache", ".git/logs/HEAD")
+
+
+class DaemonState:
+    """
+    Everything `--check` needs before it can look at a file, loaded once:
+    config, language matchers, excludes, the cache and a warm thread pool.
+    Reloaded whenever the config, `.gitignore` or cache file changes (by mtime).
+    """
+
+    def __init__(self, root: Path, workers: int = 8):
+        self.root = root
+        self.workers = workers
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self._lock = threading.Lock()
+        self._stamps: Tuple[int | None, ...] | None = None
+        self.reload_if_changed()
+
+    def _current_stamps(self) -> Tuple[int | None, ...]:
+        stamps = []
+        for name in _WATCHED_FILES:
+            try:
+                stamps.append((self.root / name).stat().st_mtime_ns)
+            except OSError:
+                stamps.append(None)
+        return tuple(stamps)
+
+    def reload_if_changed(self) -> bool:
+        stamps = self._current_stamps()
+        if stamps == self._stamps:
+            return False
+        toml_data, _ = config.load_config_data(self.root, None, 60.0)
+        self.general = config.load_general_config(toml_data)
+        self.languages = config.load_language_configs(toml_data, self.general)
+        self.excludes = (
+            list(DEFAULT_EXCLUDES)
+            + filesystem.load_gitignore_patterns(self.root)
+            + list(self.general.get("exclude", []))
+        )
+        self.cache = filesystem.load_cache(self.root)
+        self.history = None  # Loaded by plan_files() if a template needs it
+        self._stamps = stamps
+        log.info(f"Loaded configuration for {self.root}.")
+        return True
+
+    def context(self, override: bool = False, remove: bool = False) -> RuntimeContext:
+        """A RuntimeContext for the loaded configuration."""
+        return RuntimeContext(
+            root=self.root,
+            excludes=self.excludes,
+            depth=self.general.get("depth"),
+            override=override,
+            remove=remove,
+            check_hash=False,
+            timeout=self.general.get("timeout", 60.0),
+            streaming_threshold=self.general.get("streaming_threshold", MAX_FILE_SIZE_BYTES),
+            cache_hash_algorithm=self.general.get("cache_hash", hashing.DEFAULT_CACHE_ALGORITHM),
+            header_hash_algorithm=self.general.get("header_hash", hashing.DEFAULT_HEADER_ALGORITHM),
+            history=self.history,
+            sniff=self.general.get("sniff", False),
+            generated_markers=self.general.get("generated_markers", GENERATED_MARKERS),
+            minified_line_length=self.general.get("minified_line_length", MINIFIED_LINE_LENGTH),
+        )
+
+    def check(self, files: List[str]) -> dict:
+        """Same decision as `autoheader --check [FILES]`, from warm state."""
+        with self._lock:
+            self.reload_if_changed()
+            context = self.context()
+            plan_generator, _ = plan_files(
+                context,
+                files=[Path(f) for f in files] or None,
+                languages=self.languages,
+                workers=self.workers,
+                cache=self.cache,
+                executor=self.executor,
+            )
+            self.history = context.history
+            changes = []
+            for item, cache_info in plan_generator:
+                if item.action in ("skip-excluded", "skip-header-exists", "skip-generated"):
+                    # Only files known to be fine may short-circuit the next check
+                    if cache_info and item.action == "skip-header-exists":
+                        rel_posix, entry = cache_info
+                        self.cache[rel_posix] = entry
+                else:
+                    changes.append((item.rel_posix, item.action))
+        return {"changes": sorted(changes)}
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=False)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        try:
+            request = json.loads(self.rfile.readline())
+        except ValueError:
+            return
+        cmd = request.get("cmd")
+        try:
+            if cmd == "check":
+                response = self.server.state.check(request.get("files", []))
+            elif cmd == "ping":
+                response = {"ok": True, "pid": os.getpid()}
+            elif cmd == "stop":
+                response = {"ok": True}
+                threading.Thread(target=self.server.shutdown, daemon=True).start()
+            else:
+                response = {"error": f"Unknown command: {cmd}"}
+        except Exception as e:
+            log.error(f"Request {cmd} failed: {e}")
+            response = {"error": str(e)}
+        self.wfile.write((json.dumps(response) + "\n").encode("utf-8"))
+
+
+class DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, root: Path, workers: int = 8):
+        self.path = client.socket_path(root)
+        if self.path.exists():
+            if client.request(root, {"cmd": "ping"}, timeout=1.0) is not None:
+                raise RuntimeError(f"A daemon is already serving {root}.")
+            self.path.unlink()  # Left behind by a daemon that died
+        old_umask = os.umask(0o177)  # Socket is private to this user
+        try:
+            super().__init__(str(self.path), _Handler)
+        finally:
+            os.umask(old_umask)
+        self.state = DaemonState(root, workers)
+
+    def server_close(self) -> None:
+        super().server_close()
+        self.state.close()
+        try:
+            self.path.unlink()
+        except OSError:
+            pass
+
+
+def main(argv: List[str]) -> int:
+    """Entry point for `autoheader daemon [--root DIR] [--workers N] [--stop | --status]`."""
+    p = argparse.ArgumentParser(prog="autoheader daemon", description="Serve --check requests from memory.")
+    p.add_argument("--root", type=Path, default=Path.cwd(), help="Root directory (default: cwd).")
+    p.add_argument("--workers", type=int, default=8, help="Size of the warm worker pool.")
+    g = p.add_mutually_exclusive_group()
+    g.add_argument("--stop", action="store_true", help="Stop the daemon serving --root.")
+    g.add_argument("--status", action="store_true", help="Exit 0 if a daemon is serving --root.")
+    args = p.parse_args(argv)
+    root = args.root.resolve()
+
+    if args.stop or args.status:
+        response = client.request(root, {"cmd": "stop" if args.stop else "ping"}, timeout=5.0)
+        state = "not running" if response is None else ("stopped" if args.stop else "running")
+        print(f"autoheader daemon: {state} for {root}")
+        return 0 if response else 1
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    try:
+        server = DaemonServer(root, args.workers)
+    except (RuntimeError, OSError) as e:
+        log.error(f"Cannot start daemon: {e}")
+        return 1
+    log.info(f"autoheader daemon listening on {server.path}")
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown).start())
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
@@ -2,17 +2,39 @@
 
 from __future__ import annotations
 from pathlib import Path
-from typing import List, Iterable, Tuple
+from typing import Callable, List, Iterable, Iterator, Sequence, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 import logging
+import errno
 import json
-import hashlib
+import mmap
+import os
+import shutil
+import stat
+import tempfile
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None  # type: ignore
 
 # --- ADD THIS ---
 from .models import LanguageConfig
+from . import hashing
+from .constants import COPY_CHUNK_BYTES, MMAP_THRESHOLD_BYTES, FSYNC_MODES
 
 # Use logging instead of print
 log = logging.getLogger(__name__)
 
+# Linux FICLONE ioctl, _IOW(0x94, 9, int): share all extents of one file
+# with another (btrfs, XFS with reflink=1, bcachefs, OCFS2, ...).
+FICLONE = 0x40049409
+
+# Devices where FICLONE has already failed; no point asking again.
+_NO_REFLINK_DEVICES: set[int] = set()
+
 
 def read_file_lines(path: Path) -> List[str]:
     """
@@ -20,7 +42,9 @@ def read_file_lines(path: Path) -> List[str]:
     (File size check is now done in core.plan_files before calling this)
     """
     try:
-        with path.open("r", encoding="utf-8", errors="replace") as f:
+        # utf-8-sig strips a leading BOM so shebang/header detection
+        # sees the same first line as the byte-level rewrite engine.
+        with path.open("r", encoding="utf-8-sig", errors="replace") as f:
             return f.read().splitlines(keepends=False)
     # Use specific, expected exceptions
     except (IOError, PermissionError, UnicodeDecodeError) as e:
@@ -31,51 +55,443 @@ def read_file_lines(path: Path) -> List[str]:
         return []
 
 
+def read_file_bytes(path: Path) -> bytes:
+    """
+    Safely reads the raw bytes of a file, without decoding.
+    Used by the write phase so untouched content is never re-encoded.
+    """
+    try:
+        with path.open("rb") as f:
+            return f.read()
+    except (IOError, PermissionError) as e:
+        log.warning(f"Failed to read {path}: {e}")
+        return b""
+    except Exception as e:
+        log.error(f"An unexpected error occurred while reading {path}: {e}")
+        return b""
+
+
+def read_file_head(path: Path, size: int) -> bytes:
+    """Reads at most `size` bytes from the start of a file."""
+    try:
+        with path.open("rb") as f:
+            return f.read(size)
+    except (IOError, PermissionError) as e:
+        log.warning(f"Failed to read {path}: {e}")
+        return b""
+
+
+@contextmanager
+def map_file(path: Path) -> Iterator[bytes]:
+    """
+    Yields a read-only buffer over the whole file: an mmap when possible,
+    so callers can hash, `find()` and slice multi-MB files without copying
+    them into Python objects. Empty files, and filesystems that cannot be
+    mapped, fall back to a plain read. Raises OSError if the file can't be
+    opened.
+    """
+    with path.open("rb") as f:
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            # Empty file or unmappable (e.g. special/virtual filesystems)
+            yield f.read()
+            return
+        try:
+            yield mapped
+        finally:
+            mapped.close()
+
+
+def file_contains(path: Path, needle: bytes) -> bool:
+    """
+    Scans a file for `needle` in constant memory, via `find()` on an mmap.
+    """
+    try:
+        with map_file(path) as buf:
+            return buf.find(needle) != -1
+    except (IOError, PermissionError) as e:
+        log.warning(f"Failed to scan {path}: {e}")
+        return False
+
+
+class FsyncPolicy:
+    """
+    Durability policy for atomic writes.
+
+    - "none":  rely on the OS to flush eventually (atomic, not durable).
+    - "file":  fsync each file before its rename, and its directory after.
+    - "batch": group commit; renamed files and their directories are
+               recorded and fsynced together by `commit()` at the end of
+               the run, so a 50k-file run does not serialize 50k fsyncs.
+    """
+
+    def __init__(self, mode: str = "none"):
+        if mode not in FSYNC_MODES:
+            raise ValueError(f"Unknown fsync policy: {mode}")
+        self.mode = mode
+        self._files: set[Path] = set()
+        self._dirs: set[Path] = set()
+        self._lock = threading.Lock()
+
+    def before_replace(self, fd: int) -> None:
+        if self.mode == "file":
+            os.fsync(fd)
+
+    def after_replace(self, path: Path) -> None:
+        if self.mode == "file":
+            _fsync_dir(path.parent)
+        elif self.mode == "batch":
+            with self._lock:
+                self._files.add(path)
+                self._dirs.add(path.parent)
+
+    def commit(self, workers: int = 8) -> None:
+        """Flushes every file recorded in batch mode, then each directory once."""
+        with self._lock:
+            files, self._files = self._files, set()
+            dirs, self._dirs = self._dirs, set()
+        if not files:
+            return
+        # Concurrent fsyncs let the filesystem fold them into few journal commits
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(_fsync_path, files))
+        for directory in dirs:
+            _fsync_dir(directory)
+        log.debug(f"Group commit: synced {len(files)} files in {len(dirs)} directories.")
+
+
+def _fsync_path(path: Path) -> None:
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError as e:
+        log.warning(f"Failed to sync {path}: {e}")
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _fsync_dir(directory: Path) -> None:
+    """fsync a directory so a rename inside it is durable (no-op where unsupported)."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _atomic_replace(
+    path: Path,
+    write: Callable[[int], None],
+    original_stat: os.stat_result | None,
+    fsync: FsyncPolicy | None,
+) -> None:
+    """
+    Atomically replaces `path` with the bytes `write(fd)` puts into a sibling
+    temp file. Mode and (where permitted) ownership of the original are
+    preserved; without an original (`original_stat` None) the file is
+    created with mode 0644. A crash or Ctrl-C leaves either the old or the new file,
+    never a truncated one; the temp file is removed on any failure.
+
+    (O_TMPFILE + linkat is not used: linkat cannot replace an existing
+    path, so it would still need a named temp file plus rename.)
+    """
+    target = Path(os.path.realpath(path))  # write through symlinks, as before
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{target.name}.", suffix=".tmp", dir=target.parent)
+    try:
+        write(fd)
+        mode = stat.S_IMODE(original_stat.st_mode) if original_stat is not None else 0o644
+        # fchmod/fchown/getuid do not exist on Windows (before 3.13)
+        if hasattr(os, "fchmod"):
+            os.fchmod(fd, mode)
+        else:
+            os.chmod(tmp_name, mode)
+        if original_stat is not None and hasattr(os, "fchown") and (original_stat.st_uid, original_stat.st_gid) != (os.getuid(), os.getgid()):
+            try:
+                os.fchown(fd, original_stat.st_uid, original_stat.st_gid)
+            except PermissionError:
+                log.debug(f"Could not preserve ownership of {path}.")
+        if fsync is not None:
+            fsync.before_replace(fd)
+        os.close(fd)
+        fd = -1
+        os.replace(tmp_name, target)
+    except BaseException:
+        if fd != -1:
+            os.close(fd)
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+    if fsync is not None:
+        fsync.after_replace(target)
+
+
+def write_state_file(path: Path, data: bytes) -> None:
+    """
+    Atomically writes one of autoheader's own state files, creating it if
+    needed, so a crash or a concurrent reader never sees a truncated one.
+    Raises OSError on failure.
+    """
+    try:
+        original_stat = path.stat()
+    except FileNotFoundError:
+        original_stat = None
+    _atomic_replace(path, lambda fd: _write_all(fd, data), original_stat, None)
+
+
+def reflink(src: Path, dst: Path) -> bool:
+    """
+    Creates `dst` as a copy-on-write clone of `src` (FICLONE). The clone
+    shares `src`'s extents, so it costs no data I/O or space until one of
+    the two is modified. Returns False, leaving no `dst` behind, where the
+    filesystem or platform does not support it.
+    """
+    if fcntl is None:
+        return False
+    try:
+        src_fd = os.open(src, os.O_RDONLY)
+    except OSError:
+        return False
+    try:
+        src_stat = os.fstat(src_fd)
+        if src_stat.st_dev in _NO_REFLINK_DEVICES:
+            return False
+        dst_fd = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        try:
+            fcntl.ioctl(dst_fd, FICLONE, src_fd)
+            cloned = os.fstat(dst_fd).st_size == src_stat.st_size
+        except OSError as e:
+            if e.errno in (errno.EOPNOTSUPP, errno.ENOTTY, errno.EINVAL, errno.EXDEV, errno.ENOSYS):
+                _NO_REFLINK_DEVICES.add(src_stat.st_dev)
+            log.debug(f"FICLONE unavailable for {src} ({e}).")
+            cloned = False
+        finally:
+            os.close(dst_fd)
+        if not cloned:
+            os.unlink(dst)
+        return cloned
+    finally:
+        os.close(src_fd)
+
+
+def supports_reflink(directory: Path) -> bool:
+    """Probes whether files in `directory` can be cloned with FICLONE."""
+    try:
+        with tempfile.TemporaryDirectory(dir=directory, prefix=".autoheader-probe-") as tmp:
+            probe = Path(tmp) / "src"
+            probe.write_bytes(b"autoheader")
+            return reflink(probe, Path(tmp) / "dst")
+    except OSError:
+        return False
+
+
+def _write_backup(path: Path, original_content: bytes | None, original_mode: int) -> None:
+    """
+    Creates `<path>.bak` with the original permissions, before `path` is
+    replaced. Uses a reflink clone of `path` where the filesystem supports
+    it, else writes `original_content` (or copies `path` if that is None).
+    """
+    bak = path.with_suffix(path.suffix + ".bak")
+    try:
+        if not reflink(path, bak):
+            if original_content is None:
+                shutil.copyfile(path, bak)
+            else:
+                bak.write_bytes(original_content)
+        bak.chmod(original_mode)
+    except (IOError, PermissionError) as e:
+        log.error(f"Failed to create backup {bak}: {e}")
+        raise
+
+
 def write_file_content(
     path: Path,
     new_content: str,
     original_content: str,
     backup: bool,
     dry_run: bool,
+    fsync: FsyncPolicy | None = None,
 ) -> None:
     """
     Safely writes new content to a file, with backup logic.
-    Preserves original file permissions.
+    Text wrapper around `write_file_bytes`.
+    """
+    write_file_bytes(
+        path,
+        (new_content.encode("utf-8"),),
+        original_content.encode("utf-8"),
+        backup=backup,
+        dry_run=dry_run,
+        fsync=fsync,
+    )
+
+
+def write_file_bytes(
+    path: Path,
+    chunks: Sequence[bytes | memoryview],
+    original_content: bytes,
+    backup: bool,
+    dry_run: bool,
+    fsync: FsyncPolicy | None = None,
+) -> None:
+    """
+    Atomically replaces a file with `chunks` written back-to-back
+    (memoryviews are written without copying), with optional backup.
+    Preserves original file permissions and ownership.
     """
     if dry_run:
         return
 
     try:
-        # 1. Get original permissions
-        original_mode = path.stat().st_mode
+        original_stat = path.stat()
     except (IOError, PermissionError) as e:
         log.error(f"Failed to read permissions for {path}: {e}")
         # Re-raise to be caught by the thread pool
         raise
 
-    # Optional backup
     if backup:
-        bak = path.with_suffix(path.suffix + ".bak")
-        try:
-            bak.write_text(original_content, encoding="utf-8")
-            # 2. Copy permissions to backup file
-            bak.chmod(original_mode)
-        except (IOError, PermissionError) as e:
-            log.error(f"Failed to create backup {bak}: {e}")
-            # Re-raise to be caught by the thread pool
-            raise
-
-    # Write result
-    try:
-        path.write_text(new_content, encoding="utf-8")
-        # 3. Restore original permissions
-        path.chmod(original_mode)
+        _write_backup(path, original_content, original_stat.st_mode)
+
+    def write(fd: int) -> None:
+        for chunk in chunks:
+            _write_all(fd, chunk)
+
+    try:
+        _atomic_replace(path, write, original_stat, fsync)
     except (IOError, PermissionError) as e:
         log.error(f"Failed to write file {path}: {e}")
         # Re-raise to be caught by the thread pool
         raise
 
 
+def _write_all(fd: int, data: bytes | memoryview) -> None:
+    """os.write() until every byte of `data` has been written."""
+    view = memoryview(data)
+    while view:
+        written = os.write(fd, view)
+        view = view[written:]
+
+
+def _copy_range(src_fd: int, dst_fd: int, offset: int, count: int) -> None:
+    """
+    Appends `count` bytes of `src_fd` starting at `offset` to `dst_fd`.
+    Prefers in-kernel copies (copy_file_range, then sendfile) and falls
+    back to a chunked pread/write loop, so memory use stays constant.
+    """
+    copy_file_range = getattr(os, "copy_file_range", None)
+    if copy_file_range is not None:
+        try:
+            while count > 0:
+                copied = copy_file_range(src_fd, dst_fd, count, offset)
+                if copied == 0:
+                    break
+                offset += copied
+                count -= copied
+            if count <= 0:
+                return
+        except OSError as e:
+            log.debug(f"copy_file_range unavailable ({e}), falling back.")
+
+    sendfile = getattr(os, "sendfile", None)
+    if sendfile is not None:
+        try:
+            while count > 0:
+                sent = sendfile(dst_fd, src_fd, offset, count)
+                if sent == 0:
+                    break
+                offset += sent
+                count -= sent
+            if count <= 0:
+                return
+        except OSError as e:
+            log.debug(f"sendfile unavailable ({e}), falling back.")
+
+    while count > 0:
+        data = os.pread(src_fd, min(COPY_CHUNK_BYTES, count), offset)
+        if not data:
+            break
+        _write_all(dst_fd, data)
+        offset += len(data)
+        count -= len(data)
+
+
+def stream_rewrite(
+    path: Path,
+    head_chunks: Sequence[bytes | memoryview],
+    tail_offset: int,
+    backup: bool,
+    dry_run: bool,
+    fsync: FsyncPolicy | None = None,
+) -> None:
+    """
+    Out-of-core rewrite for files above the streaming threshold.
+    Writes `head_chunks` into a sibling temp file, copies the original file
+    from `tail_offset` to EOF after it, then atomically replaces `path`.
+    Memory use is independent of the file size.
+    """
+    if dry_run:
+        return
+
+    try:
+        original_stat = path.stat()
+    except (IOError, PermissionError) as e:
+        log.error(f"Failed to read permissions for {path}: {e}")
+        raise
+
+    if backup:
+        _write_backup(path, None, original_stat.st_mode)
+
+    try:
+        with path.open("rb") as src:
+            size = os.fstat(src.fileno()).st_size
+
+            def write(fd: int) -> None:
+                for chunk in head_chunks:
+                    _write_all(fd, chunk)
+                _copy_range(src.fileno(), fd, tail_offset, size - tail_offset)
+
+            _atomic_replace(path, write, original_stat, fsync)
+    except (IOError, PermissionError) as e:
+        log.error(f"Failed to write file {path}: {e}")
+        raise
+
+
+def replace_from_range(
+    path: Path,
+    src_fd: int,
+    offset: int,
+    size: int,
+    fsync: FsyncPolicy | None = None,
+) -> None:
+    """
+    Atomically replaces `path` with `size` bytes of `src_fd` starting at
+    `offset` (used to restore pre-images from the run journal's pack).
+    """
+    try:
+        original_stat = path.stat()
+    except (IOError, PermissionError) as e:
+        log.error(f"Failed to read permissions for {path}: {e}")
+        raise
+
+    def write(fd: int) -> None:
+        _copy_range(src_fd, fd, offset, size)
+
+    try:
+        _atomic_replace(path, write, original_stat, fsync)
+    except (IOError, PermissionError) as e:
+        log.error(f"Failed to write file {path}: {e}")
+        raise
+
+
 def load_gitignore_patterns(root: Path) -> List[str]:
     """
     Loads and parses .gitignore patterns from the project root.
@@ -103,20 +519,49 @@ def load_gitignore_patterns(root: Path) -> List[str]:
         return []
 
 
-def get_file_hash(path: Path) -> str:
-    """Calculates the SHA256 hash of a file by reading in chunks."""
-    sha256 = hashlib.sha256()
+def get_file_hash(
+    path: Path,
+    algorithm: str = hashing.DEFAULT_HEADER_ALGORITHM,
+    digest_size: int | None = None,
+) -> str:
+    """
+    Calculates the hash of a file as a self-describing digest
+    (`<hex>` for SHA-256, `b2:<hex>` for BLAKE2b).
+    Files above MMAP_THRESHOLD_BYTES are hashed straight from an mmap (one
+    C-level update, no Python-level chunk loop); smaller ones in chunks.
+    """
+    hasher = hashing.new(algorithm, digest_size)
     try:
         with path.open("rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size >= MMAP_THRESHOLD_BYTES:
+                try:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                        hasher.update(mapped)
+                    return hashing.format_digest(algorithm, hasher.hexdigest())
+                except (OSError, ValueError):
+                    pass  # Not mappable; hash in chunks below
             while True:
                 data = f.read(65536)  # 64KB chunks
                 if not data:
                     break
-                sha256.update(data)
+                hasher.update(data)
     except (IOError, PermissionError) as e:
         log.warning(f"Failed to hash {path}: {e}")
         return ""
-    return sha256.hexdigest()
+    return hashing.format_digest(algorithm, hasher.hexdigest())
+
+
+def hash_bytes(
+    chunks: Iterable[bytes | memoryview],
+    algorithm: str = hashing.DEFAULT_HEADER_ALGORITHM,
+    digest_size: int | None = None,
+) -> str:
+    """Like `get_file_hash`, for in-memory content given as chunks."""
+    hasher = hashing.new(algorithm, digest_size)
+    for chunk in chunks:
+        hasher.update(chunk)
+    return hashing.format_digest(algorithm, hasher.hexdigest())
 
 
 def load_cache(root: Path) -> dict:
@@ -2,23 +2,23 @@
 
 from __future__ import annotations
 import fnmatch
-from pathlib import Path
-from typing import List
+import re
+from pathlib import Path, PurePath, PurePosixPath, PureWindowsPath
+from typing import Dict, Iterable, List, Pattern, Set, Tuple
 
 from .constants import DEFAULT_EXCLUDES
+from .models import LanguageConfig
 
+_MAGIC = frozenset("*?[")
 
-def is_excluded(path: Path, root: Path, extra_patterns: List[str]) -> bool:
-    rel = path.relative_to(root)
-    parts = rel.parts
 
-    # --- FIX START ---
+def _split_patterns(extra_patterns: List[str]) -> Tuple[Set[str], List[str]]:
+    """Splits exclude patterns into (folder names, globs)."""
     # We need to combine default folder excludes with folder excludes
     # from extra_patterns (e.g., "docs/").
-    
     all_folder_excludes = set(DEFAULT_EXCLUDES)
     glob_patterns = []
-    
+
     for pat in extra_patterns:
         pat_clean = pat.strip('/')
         if "*" not in pat and pat_clean:
@@ -27,6 +27,15 @@ def is_excluded(path: Path, root: Path, extra_patterns: List[str]) -> bool:
         else:
             # Otherwise, treat it as a glob.
             glob_patterns.append(pat)
+    return all_folder_excludes, glob_patterns
+
+
+def is_excluded(path: Path, root: Path, extra_patterns: List[str]) -> bool:
+    rel = path.relative_to(root)
+    parts = rel.parts
+
+    # --- FIX START ---
+    all_folder_excludes, glob_patterns = _split_patterns(extra_patterns)
 
     # folder name exclusions
     for part in parts[:-1]:
@@ -43,6 +52,15 @@ def is_excluded(path: Path, root: Path, extra_patterns: List[str]) -> bool:
     return False
 
 
+def is_excluded_dir(path: Path, root: Path, extra_patterns: List[str]) -> bool:
+    """
+    True if directory `path` is excluded by folder name, so nothing
+    beneath it needs to be walked or watched.
+    """
+    all_folder_excludes, _ = _split_patterns(extra_patterns)
+    return any(part in all_folder_excludes for part in path.relative_to(root).parts)
+
+
 def within_depth(path: Path, root: Path, max_depth: int | None) -> bool:
     if max_depth is None:
         return True
@@ -50,3 +68,74 @@ def within_depth(path: Path, root: Path, max_depth: int | None) -> bool:
     rel = path.relative_to(root)
     dirs = len(rel.parts) - 1
     return dirs <= max_depth
+
+
+def _glob_regex(glob: str) -> Tuple[int, Pattern[str]]:
+    """
+    (number of path parts, compiled regex) for a relative glob, matching
+    the way Path.match does: against the last parts of a path, one part
+    per pattern part.
+    """
+    parts = PurePosixPath(glob).parts
+    rx = []
+    for part in parts:
+        translated = fnmatch.translate(part)
+        rx.append(translated[:-2] if translated.endswith("\\Z") else translated)
+    return len(parts), re.compile("/".join(rx) + r"\Z", re.DOTALL)
+
+
+class LanguageIndex(list):
+    """
+    Language configs in precedence order, plus a dispatch index that finds
+    a path's language without calling Path.match for every glob: "*.ext"
+    globs and plain file names are dict lookups, and other globs are
+    compiled once. The first matching glob in config order still wins.
+    Build a new index instead of mutating one.
+    """
+
+    def __init__(self, languages: Iterable[LanguageConfig] = ()):
+        super().__init__(languages)
+        self._names: Dict[str, Tuple[int, LanguageConfig]] = {}
+        self._suffixes: Dict[str, Tuple[int, LanguageConfig]] = {}
+        # (rank, parts, regex or None for absolute globs, glob, lang), in rank order
+        self._globs: List[Tuple[int, int, Pattern[str] | None, str, LanguageConfig]] = []
+        rank = 0
+        for lang in self:
+            for glob in lang.file_globs:
+                rest = glob[1:]
+                if PurePosixPath(glob).is_absolute():
+                    self._globs.append((rank, 0, None, glob, lang))
+                elif "/" not in glob and not _MAGIC.intersection(glob):
+                    self._names.setdefault(glob, (rank, lang))
+                elif glob.startswith("*.") and "/" not in rest and not _MAGIC.intersection(rest):
+                    self._suffixes.setdefault(rest, (rank, lang))
+                else:
+                    self._globs.append((rank, *_glob_regex(glob), glob, lang))
+                rank += 1
+
+    def lookup(self, path: PurePath) -> LanguageConfig | None:
+        """The first language with a glob that `path.match()`es, or None."""
+        if isinstance(path, PureWindowsPath):
+            # Case-insensitive matching: not worth indexing
+            return next((lang for lang in self for glob in lang.file_globs if path.match(glob)), None)
+        name = path.name
+        best = self._names.get(name)
+        dot = name.find(".")
+        while dot != -1:
+            hit = self._suffixes.get(name[dot:])
+            if hit is not None and (best is None or hit[0] < best[0]):
+                best = hit
+            dot = name.find(".", dot + 1)
+        if self._globs:
+            parts = path.parts
+            for rank, count, rx, glob, lang in self._globs:
+                if best is not None and rank > best[0]:
+                    break
+                if rx is None:
+                    matched = path.match(glob)
+                else:
+                    matched = len(parts) >= count and rx.match("/".join(parts[-count:])) is not None
+                if matched:
+                    best = (rank, lang)
+                    break
+        return best[1] if best is not None else None
@@ -0,0 +1,49 @@
+# src/autoheader/generated.py
+
+from __future__ import annotations
+from typing import List, Sequence
+
+
+def leading_comments(head: bytes, prefix: str) -> List[bytes]:
+    """
+    The comment lines (starting with `prefix`, less its trailing space) at
+    the top of `head`, after an optional BOM and shebang; blank lines
+    between them are allowed. Ends at the first line of anything else.
+    """
+    marker = prefix.strip().encode("utf-8")
+    if not marker:
+        return []
+    if head.startswith(b"\xef\xbb\xbf"):
+        head = head[3:]
+    lines = head.split(b"\n")
+    if lines and lines[0].startswith(b"#!"):
+        lines = lines[1:]
+    comments = []
+    for line in lines:
+        stripped = line.strip()
+        if not stripped:
+            continue
+        if not stripped.startswith(marker):
+            break
+        comments.append(stripped)
+    return comments
+
+
+def detect_generated(head: bytes, markers: Sequence[str], minified_line_length: int, prefix: str) -> str | None:
+    """
+    The reason a file is generated, judged from the `head` of its content
+    alone: one of the generator `markers` (case-sensitive) in a comment
+    line of the leading comment block (see `leading_comments`), or a line
+    at least `minified_line_length` long (0 disables this check), which
+    the trailing partial line of a head read also counts as. None otherwise.
+    A marker mentioned in code, a string or a later comment does not count.
+    """
+    if markers:
+        comments = leading_comments(head, prefix)
+        for marker in markers:
+            needle = marker.encode("utf-8")
+            if any(needle in line for line in comments):
+                return f"generated ({marker})"
+    if minified_line_length and any(len(line) >= minified_line_length for line in head.split(b"\n")):
+        return "minified"
+    return None
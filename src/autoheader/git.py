@@ -0,0 +1,362 @@
+# src/autoheader/git.py
+
+from __future__ import annotations
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Set, Tuple
+import logging
+import os
+import subprocess
+import threading
+
+log = logging.getLogger(__name__)
+
+# Separates commits in `git log` output; cannot occur in the -z fields
+_RECORD = b"\x1e"
+
+# ls-tree modes of regular files; symlinks (120000) and submodules are skipped
+_FILE_MODES = ("100644", "100755")
+
+
+class FileHistory(NamedTuple):
+    year_created: int
+    year_modified: int
+    commit: str  # Full SHA of the last commit that touched the file
+
+
+def run_git(root: Path, *args: str) -> bytes:
+    """
+    Runs `git -C root ARGS...` and returns its stdout.
+    Raises RuntimeError if git is missing or the command fails.
+    """
+    try:
+        result = subprocess.run(["git", "-C", str(root), *args], capture_output=True)
+    except FileNotFoundError as e:
+        raise RuntimeError("git is not installed or not on PATH.") from e
+    if result.returncode != 0:
+        message = result.stderr.decode("utf-8", "replace").strip()
+        raise RuntimeError(f"git {args[0]} failed: {message}")
+    return result.stdout
+
+
+def split_z(output: bytes) -> List[str]:
+    """Splits NUL-terminated (`-z`) git output into paths."""
+    return [os.fsdecode(p) for p in output.split(b"\0") if p]
+
+
+def _pathspecs(paths: List[str] | None) -> List[str]:
+    """Pathspecs matching exactly `paths` (no glob magic), or everything under the cwd."""
+    return [f":(literal){p}" for p in paths] if paths else ["."]
+
+
+def merge_base(root: Path, ref: str) -> str:
+    return run_git(root, "merge-base", ref, "HEAD").decode("ascii").strip()
+
+
+def skip_worktree_paths(root: Path) -> Set[str]:
+    """
+    Tracked paths under `root` (posix, relative to it) that are not checked
+    out: outside the sparse-checkout patterns, or marked skip-worktree.
+    Read from the index in one `git ls-files` call; nothing is fetched.
+    """
+    output = run_git(root, "ls-files", "-z", "-t")
+    # Each entry is "<tag> <path>"; "S" is the skip-worktree tag
+    return {os.fsdecode(entry[2:]) for entry in output.split(b"\0") if entry[:2] == b"S "}
+
+
+def is_partial_clone(root: Path) -> bool:
+    """True if missing objects may be fetched on demand (`git clone --filter=...`)."""
+    try:
+        return bool(run_git(root, "config", "--get", "extensions.partialClone").strip())
+    except RuntimeError:
+        return False
+
+
+def changed_files(
+    root: Path, since: str | None = None, staged: bool = False, untracked: bool = False
+) -> List[Path]:
+    """
+    Files under `root` that differ from the merge base of `since` and HEAD
+    (committed, staged or not), or that are staged in the index if `staged`.
+    Renamed and copied files are reported under their new path; deleted
+    files are left out. `untracked` adds files git does not ignore.
+    """
+    # --relative: only paths under root (the cwd of `git -C`), relative to it.
+    # --no-renames: a moved file is still listed under its new path (as added),
+    # without the blob reads rename detection needs (lazy fetches in a partial clone).
+    diff = ["diff", "--name-only", "-z", "--relative", "--no-ext-diff", "--diff-filter=d", "--no-renames"]
+    if staged:
+        diff.append("--cached")
+    else:
+        diff.append(merge_base(root, since or "HEAD"))
+    paths = set(split_z(run_git(root, *diff)))
+    if untracked:
+        paths.update(split_z(run_git(root, "ls-files", "-z", "--others", "--exclude-standard")))
+    log.debug(f"git reports {len(paths)} changed paths.")
+    return [root / p for p in sorted(paths)]
+
+
+def renamed_files(root: Path, spec: str = "HEAD") -> List[Tuple[Path, Path]]:
+    """
+    (old, new) pairs for files under `root` renamed in `spec`, all from one
+    `git diff -M` call. `spec` is what `git diff` takes: "A..B" compares two
+    commits, a single commit compares it with the working tree (moves must
+    be staged, e.g. with `git mv`, for git to pair them up).
+    """
+    output = run_git(
+        root, "diff", "--name-status", "-z", "--relative", "--no-ext-diff", "-M", "--diff-filter=R", spec, "--"
+    )
+    fields = split_z(output)
+    # Each record is "R<score>", old path, new path
+    return [(root / fields[i + 1], root / fields[i + 2]) for i in range(0, len(fields) - 2, 3)]
+
+
+def tree_files(root: Path, rev: str, paths: List[str] | None = None) -> List[Tuple[str, str, int]]:
+    """
+    (posix path relative to `root`, blob SHA, size) for each regular file
+    under `root` in commit `rev`, optionally limited to `paths`, from one
+    `git ls-tree` call. Nothing is checked out.
+    """
+    output = run_git(root, "ls-tree", "-r", "-z", "--long", rev, "--", *_pathspecs(paths))
+    entries = []
+    for record in output.split(b"\0"):
+        if not record:
+            continue
+        meta, _, name = record.partition(b"\t")
+        mode, kind, sha, size = meta.split()
+        if kind == b"blob" and mode.decode("ascii") in _FILE_MODES:
+            entries.append((os.fsdecode(name), sha.decode("ascii"), int(size)))
+    return entries
+
+
+def changed_blobs(root: Path, old: str, new: str) -> List[Tuple[str, str]]:
+    """
+    (posix path, blob SHA) for each regular file added or modified between
+    commits `old` and `new`, from one `git diff-tree` call. Deleted files
+    and symlinks are left out. Paths are relative to the repository top.
+    """
+    return _raw_blobs(run_git(root, "diff-tree", "-r", "-z", "--no-renames", "--diff-filter=AMT", old, new, "--"))
+
+
+def staged_blobs(root: Path, paths: List[str] | None = None) -> List[Tuple[str, str]]:
+    """
+    (posix path relative to `root`, blob SHA) for each regular file staged
+    in the index, optionally limited to `paths`. The SHA names the staged
+    content, which may differ from the working tree.
+    """
+    output = run_git(
+        root, "diff", "--cached", "--raw", "-z", "--no-renames", "--relative", "--no-ext-diff",
+        "--diff-filter=AMT", "--", *_pathspecs(paths),
+    )
+    return _raw_blobs(output)
+
+
+def _raw_blobs(output: bytes) -> List[Tuple[str, str]]:
+    """(path, new blob SHA) for the regular files in `--raw -z --no-renames` output."""
+    fields = output.split(b"\0")
+    entries = []
+    # Raw records are ":<old mode> <new mode> <old sha> <new sha> <status>", then the path
+    for meta, name in zip(fields[::2], fields[1::2]):
+        _, mode, _, sha, _ = meta.split()
+        if mode.decode("ascii") in _FILE_MODES:
+            entries.append((os.fsdecode(name), sha.decode("ascii")))
+    return entries
+
+
+class BlobReader:
+    """
+    One `git cat-file --batch` process serving any number of `read` calls
+    (every ref of a push), started on the first. Requests are written from
+    a separate thread, so git never waits for the caller between objects.
+    """
+
+    def __init__(self, root: Path):
+        self.root = root
+        self._proc: subprocess.Popen | None = None
+
+    def _start(self) -> subprocess.Popen:
+        if self._proc is None:
+            try:
+                self._proc = subprocess.Popen(
+                    ["git", "-C", str(self.root), "cat-file", "--batch"],
+                    stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                )
+            except FileNotFoundError as e:
+                raise RuntimeError("git is not installed or not on PATH.") from e
+        return self._proc
+
+    def read(self, shas: List[str], limit: int | None = None, head: int = 0) -> Iterator[Tuple[bytes, int]]:
+        """
+        Yields (content, size) for each blob in `shas`, in order. A blob
+        larger than `limit` bytes yields only its first `head` bytes; the
+        rest is skipped without being kept in memory.
+        """
+        proc = self._start()
+
+        def feed() -> None:
+            try:
+                for sha in shas:
+                    proc.stdin.write(sha.encode("ascii") + b"\n")
+                proc.stdin.flush()
+            except (BrokenPipeError, ValueError):
+                pass  # The reader stopped early
+
+        writer = threading.Thread(target=feed, daemon=True)
+        writer.start()
+        answered = 0
+        try:
+            # Each answer is "<sha> <type> <size>\n<content>\n", or "<sha> missing\n"
+            while answered < len(shas):
+                header = proc.stdout.readline()
+                fields = header.split()
+                if len(fields) != 3:
+                    message = header.decode("utf-8", "replace").strip() or "unexpected end of output"
+                    raise RuntimeError(f"git cat-file: {message}")
+                size = int(fields[2])
+                if limit is not None and size > limit:
+                    data = proc.stdout.read(min(head, size))
+                    _skip(proc.stdout, size - len(data))
+                else:
+                    data = proc.stdout.read(size)
+                proc.stdout.read(1)
+                answered += 1
+                yield data, size
+        finally:
+            stopped_early = answered < len(shas)
+            if stopped_early:
+                proc.kill()
+            writer.join()
+            if stopped_early:
+                # Unread answers would be taken for the next call's
+                self.close()
+
+    def close(self) -> None:
+        if self._proc is not None:
+            proc, self._proc = self._proc, None
+            proc.kill()
+            proc.wait()
+            try:
+                proc.stdin.close()
+            except OSError:
+                pass  # Requests git never read
+            proc.stdout.close()
+
+    def __enter__(self) -> BlobReader:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def read_blobs(root: Path, shas: Iterable[str]) -> Iterator[bytes]:
+    """
+    Yields the content of each blob in `shas`, in order, from a single
+    `git cat-file --batch` process (see `BlobReader`).
+    """
+    with BlobReader(root) as reader:
+        for data, _ in reader.read(list(shas)):
+            yield data
+
+
+def _skip(stream, count: int) -> None:
+    """Reads and drops `count` bytes of `stream`, a bounded chunk at a time."""
+    while count > 0:
+        chunk = stream.read(min(count, 1 << 20))
+        if not chunk:
+            raise RuntimeError("git cat-file: unexpected end of output")
+        count -= len(chunk)
+
+
+def new_objects(root: Path, rev: str) -> Set[str]:
+    """
+    SHAs of the objects reachable from `rev` but from no existing ref, from
+    one `git rev-list --objects` call: what a push of a new ref brings in.
+    """
+    output = run_git(root, "rev-list", "--objects", rev, "--not", "--all")
+    return {line.split(b" ", 1)[0].decode("ascii") for line in output.splitlines() if line}
+
+
+def _log_records(root: Path, rev: str = "HEAD", renames: bool = True) -> Iterator[Tuple[str, int, List[str]]]:
+    """
+    Streams (sha, author year, name-status fields) per commit reachable
+    from `rev`, newest first, from one `git log` process, parsing output as
+    it arrives.
+    """
+    cmd = [
+        # --date-order: never a parent before its children, even with skewed clocks
+        "git", "-C", str(root), "log", "--date-order", "-z", "--name-status", "-M" if renames else "--no-renames",
+        "--relative", "--format=%x1e%H %as", rev, "--", ".",
+    ]
+    try:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except FileNotFoundError as e:
+        raise RuntimeError("git is not installed or not on PATH.") from e
+
+    def parse(record: bytes) -> Tuple[str, int, List[str]]:
+        header, _, body = record.partition(b"\0")
+        sha, _, date = header.decode("ascii").partition(" ")
+        return sha, int(date[:4]), split_z(body.lstrip(b"\n"))
+
+    buffer = b""
+    with proc:
+        for chunk in iter(lambda: proc.stdout.read(65536), b""):
+            buffer += chunk
+            *records, buffer = buffer.split(_RECORD)
+            for record in records:
+                if record:
+                    yield parse(record)
+        if buffer:
+            yield parse(buffer)
+        stderr = proc.stderr.read()
+    if proc.returncode != 0:
+        message = stderr.decode("utf-8", "replace").strip()
+        raise RuntimeError(f"git log failed: {message}")
+
+
+def file_history(root: Path, rev: str = "HEAD") -> Dict[str, FileHistory]:
+    """
+    Maps each file under `root` (posix path relative to it) to the years of
+    its first and last commit and the last commit's SHA, from a single
+    `git log` pass. History is followed across renames; a path that was
+    deleted and re-added starts over. Only commits reachable from `rev`
+    count. In a partial clone, renames are not followed: detecting them
+    would fetch the content of every file ever renamed.
+    """
+    history: Dict[str, FileHistory] = {}
+    alias: Dict[str, str] = {}  # Older name -> current name, from renames
+    closed = set()  # Names whose older entries belong to an earlier, deleted file
+
+    def record(name: str, sha: str, year: int) -> None:
+        if name in closed:
+            return
+        current = alias.get(name, name)
+        known = history.get(current)
+        if known is None:
+            history[current] = FileHistory(year, year, sha)
+        else:
+            history[current] = known._replace(year_created=year)
+
+    for sha, year, fields in _log_records(root, rev, renames=not is_partial_clone(root)):
+        i = 0
+        while i < len(fields):
+            status = fields[i]
+            if status[:1] in ("R", "C"):
+                old, new = fields[i + 1], fields[i + 2]
+                i += 3
+                record(new, sha, year)
+                if status[:1] == "R":
+                    if new in closed:
+                        closed.add(old)  # Renamed into a file that was since deleted
+                    else:
+                        # Older entries for `old` are this file's history
+                        alias[old] = alias.get(new, new)
+                        closed.discard(old)
+                closed.add(new)
+                continue
+            name = fields[i + 1]
+            i += 2
+            if status != "D":
+                record(name, sha, year)
+            if status in ("A", "D"):
+                closed.add(name)
+    log.debug(f"Loaded git history for {len(history)} files.")
+    return history
@@ -0,0 +1,68 @@
+# src/autoheader/hashing.py
+
+from __future__ import annotations
+import hashlib
+import re
+from typing import Tuple
+
+# Supported content-hash algorithms: name -> (token tag, default digest size).
+# SHA-256 is untagged so existing `hash:<hex>` headers and cache entries keep
+# their meaning; every other algorithm is written as `<tag>:<hex>`.
+ALGORITHMS = {
+    "sha256": ("", 32),
+    "blake2b": ("b2", 32),
+}
+
+# The cache only needs a fast change detector, headers need tamper evidence.
+DEFAULT_CACHE_ALGORITHM = "blake2b"
+DEFAULT_HEADER_ALGORITHM = "sha256"
+CACHE_DIGEST_SIZE = 16
+
+_TAGS = {tag: name for name, (tag, _) in ALGORITHMS.items() if tag}
+
+# `hash:` token inside a header line, e.g. `hash:<hex>` or `hash:b2:<hex>`
+TOKEN_RX = re.compile(r"hash:(?:([a-z0-9]+):)?([a-f0-9]{16,128})\b")
+
+
+def new(algorithm: str = DEFAULT_HEADER_ALGORITHM, digest_size: int | None = None):
+    """Returns a fresh hashlib object for `algorithm`."""
+    if algorithm == "sha256":
+        return hashlib.sha256()
+    if algorithm == "blake2b":
+        return hashlib.blake2b(digest_size=digest_size or ALGORITHMS["blake2b"][1])
+    raise ValueError(f"Unsupported hash algorithm: {algorithm}")
+
+
+def format_digest(algorithm: str, hexdigest: str) -> str:
+    """Formats a digest as a self-describing token value (`b2:<hex>`)."""
+    tag = ALGORITHMS[algorithm][0]
+    return f"{tag}:{hexdigest}" if tag else hexdigest
+
+
+def parse_digest(value: str) -> Tuple[str, str]:
+    """
+    Inverse of `format_digest`: returns (algorithm, hexdigest).
+    Untagged values are SHA-256, for backward compatibility.
+    """
+    tag, sep, hexdigest = value.partition(":")
+    if not sep:
+        return "sha256", value
+    if tag not in _TAGS:
+        raise ValueError(f"Unknown hash tag: {tag}")
+    return _TAGS[tag], hexdigest
+
+
+def find_token(header: str) -> Tuple[str, str] | None:
+    """
+    Finds a `hash:` token in a header line and returns (algorithm, hexdigest),
+    or None if there is no token or its algorithm is unknown.
+    """
+    match = TOKEN_RX.search(header)
+    if not match:
+        return None
+    tag, hexdigest = match.groups()
+    if tag is None:
+        return ("sha256", hexdigest) if len(hexdigest) == 64 else None
+    if tag not in _TAGS:
+        return None
+    return _TAGS[tag], hexdigest
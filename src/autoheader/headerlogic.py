@@ -2,16 +2,14 @@
 
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import List
+from typing import Callable, List, Sequence, Tuple
+import codecs
 import datetime
 from pathlib import Path
 import ast
 
-from .constants import ENCODING_RX
-
-
-# --- MODIFIED ---
-import hashlib
+from .constants import ENCODING_RX, UTF8_BOM, HISTORY_PLACEHOLDERS, HISTORY_UNCOMMITTED, COMMIT_ABBREV
+from . import hashing
 
 
 def header_line_for(
@@ -21,8 +19,16 @@ def header_line_for(
     existing_header: str | None = None,
     license_spdx: str | None = None,
     license_owner: str | None = None,
+    content_hash: str | None = None,
+    hash_algorithm: str = hashing.DEFAULT_HEADER_ALGORITHM,
 ) -> str:
-    """Creates the header line from a template, with smart year updating."""
+    """
+    Creates the header line from a template, with smart year updating.
+    `content_hash` (a hex digest made with `hash_algorithm`) may be passed
+    instead of `content` when the caller has already hashed the file (see
+    `content_hash_from_line`). `{hash}` renders as a self-describing token
+    value, e.g. `<hex>` for SHA-256 or `b2:<hex>` for BLAKE2b.
+    """
     import re
     from . import licenses
 
@@ -37,8 +43,12 @@ def header_line_for(
                 year_to_insert = f"{existing_year}-{current_year}"
 
     # Handle hash replacement before other formatting to avoid KeyErrors
-    if "{hash}" in template and content is not None:
-        file_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
+    if "{hash}" in template and (content is not None or content_hash is not None):
+        if content_hash is None:
+            hasher = hashing.new(hash_algorithm)
+            hasher.update(content.encode("utf-8"))
+            content_hash = hasher.hexdigest()
+        file_hash = hashing.format_digest(hash_algorithm, content_hash)
         template = template.replace("{hash}", file_hash)
 
     # Handle license replacement
@@ -92,10 +102,35 @@ def header_line_for(
         path=rel_posix,
         filename=Path(rel_posix).name,
         year=year_to_insert,
-        license=license_text
+        license=license_text,
+        # Normally filled in from git history by `fill_history` first
+        year_created=current_year,
+        year_modified=current_year,
+        commit=HISTORY_UNCOMMITTED,
     )
 
 
+def fill_history(template: str, history: Tuple[int, int, str] | None) -> str:
+    """
+    Substitutes the git history placeholders ({year_created},
+    {year_modified}, {commit}) in `template`; others are left for
+    `header_line_for`. `history` is a git.FileHistory, or None for a file
+    git has no commits for.
+    """
+    if history is None:
+        year = str(datetime.datetime.now().year)
+        values = (year, year, HISTORY_UNCOMMITTED)
+    else:
+        values = (str(history[0]), str(history[1]), history[2][:COMMIT_ABBREV])
+    for placeholder, value in zip(HISTORY_PLACEHOLDERS, values):
+        template = template.replace(placeholder, value)
+    return template
+
+
+def uses_history(template: str) -> bool:
+    return any(placeholder in template for placeholder in HISTORY_PLACEHOLDERS)
+
+
 @dataclass
 class HeaderAnalysis:
     """Result of analyzing file content for header state."""
@@ -114,19 +149,26 @@ def analyze_header_state(
     check_encoding: bool,  # <-- ADD THIS
     analysis_mode: str = "line",
     check_hash: bool = False,
+    content_hasher: Callable[[int, str, int], str] | None = None,
 ) -> HeaderAnalysis:
     """
     Pure, testable logic to find header insertion point and check existing state.
     This replaces compute_insert_index, has_correct_header, and has_any_header.
+
+    `content_hasher(line_index, algorithm, digest_size)` returns the hex
+    digest of the content starting at that line; when omitted it is computed
+    from `lines`. The algorithm is taken from the header's own `hash:` token.
     """
     if not lines:
         return HeaderAnalysis(0, None, False)
 
     i = 0
-    # --- MAKE PYTHON-SPECIFIC LOGIC CONDITIONAL ---
-    if check_encoding and lines[0].startswith("#!"):
+    # A shebang only works on the first line, whatever the language (a sniffed
+    # shell script too); Rust's `#![attr]` is not one
+    if lines[0].startswith("#!") and not lines[0].startswith("#!["):
         i = 1  # Insert after shebang
 
+    # --- MAKE PYTHON-SPECIFIC LOGIC CONDITIONAL ---
     # Check for encoding cookie on line 1 or 2
     if check_encoding:
         if i == 0 and ENCODING_RX.match(lines[0]):
@@ -191,14 +233,17 @@ def analyze_header_state(
         existing_header = lines[insert_index].strip()
 
         if check_hash and "hash:" in existing_header:
-            import re
-            match = re.search(r"hash:([a-f0-9]{64})", existing_header)
-            if match:
-                existing_hash = match.group(1)
-                content_without_header = "\n".join(lines[insert_index + 1 :])
-                current_hash = hashlib.sha256(
-                    content_without_header.encode("utf-8")
-                ).hexdigest()
+            token = hashing.find_token(existing_header)
+            if token:
+                algorithm, existing_hash = token
+                digest_size = len(existing_hash) // 2
+                if content_hasher is not None:
+                    current_hash = content_hasher(insert_index + 1, algorithm, digest_size)
+                else:
+                    content_without_header = "\n".join(lines[insert_index + 1 :])
+                    hasher = hashing.new(algorithm, digest_size)
+                    hasher.update(content_without_header.encode("utf-8"))
+                    current_hash = hasher.hexdigest()
                 if existing_hash != current_hash:
                     return HeaderAnalysis(insert_index, existing_header, False, has_tampered_header=True)
 
@@ -257,3 +302,184 @@ def build_removed_lines(
             del new_lines[insert_at]
 
     return new_lines
+
+
+# --- Byte-preserving rewrite engine ---
+# These helpers operate on the raw file bytes so that the write phase never
+# decodes/re-encodes the body of a file. Only the header block is encoded;
+# everything before the insertion point and everything after it is passed
+# through untouched (as memoryview slices of the original buffer).
+
+
+def detect_newline(data: bytes) -> bytes:
+    """Returns the newline sequence used by the first line ending in `data`."""
+    lf = data.find(b"\n")
+    if lf == -1:
+        return b"\r" if data.find(b"\r") != -1 else b"\n"
+    if lf > 0 and data[lf - 1 : lf] == b"\r":
+        return b"\r\n"
+    return b"\n"
+
+
+def body_start(data: bytes) -> int:
+    """Returns the offset of the first byte after an optional UTF-8 BOM."""
+    return len(UTF8_BOM) if data[: len(UTF8_BOM)] == UTF8_BOM else 0
+
+
+def decode_lines(data: bytes, newline: bytes | None = None) -> List[str]:
+    """
+    Decodes `data` for analysis only, splitting on the file's own newline.
+    Line N of the result always corresponds to line N of the raw bytes, so
+    indices computed by `analyze_header_state` can be mapped back with
+    `line_offset`.
+    """
+    if newline is None:
+        newline = detect_newline(data)
+    text = data[body_start(data) :].decode("utf-8", errors="replace")
+    if not text:
+        return []
+    sep = "\r" if newline == b"\r" else "\n"
+    lines = text.split(sep)
+    if lines[-1] == "":
+        lines.pop()
+    if sep == "\n":
+        lines = [line[:-1] if line.endswith("\r") else line for line in lines]
+    return lines
+
+
+def complete_lines(head: bytes) -> bytes:
+    """
+    Trims a bounded head read back to its last full line, so a line cut by
+    the read window is never mistaken for the file's unterminated last line.
+    """
+    cut = head.rfind(detect_newline(head)[-1:])
+    return head[: cut + 1] if cut != -1 else head
+
+
+def line_offset(data: bytes, index: int, start: int = 0, newline: bytes = b"\n") -> int:
+    """Returns the byte offset of line `index`, counting lines from `start`."""
+    sep = newline[-1:]
+    pos = start
+    for _ in range(index):
+        nl = data.find(sep, pos)
+        if nl == -1:
+            return len(data)
+        pos = nl + 1
+    return pos
+
+
+def build_new_bytes(
+    data: bytes,
+    expected_header: str,
+    analysis: HeaderAnalysis,
+    override: bool,
+    blank_lines_after: int,
+) -> Sequence[bytes | memoryview]:
+    """
+    Byte-level equivalent of `build_new_lines`.
+    Returns the chunks `(prefix, header_block, tail)`; prefix and tail are
+    zero-copy views of `data`, so newline style, BOM and any non-UTF-8 bytes
+    outside the header are preserved exactly.
+    """
+    newline = detect_newline(data)
+    view = memoryview(data)
+    insert_at = line_offset(data, analysis.insert_index, body_start(data), newline)
+    tail_at = insert_at
+    if override and analysis.existing_header_line is not None:
+        tail_at = line_offset(data, 1, insert_at, newline)
+
+    block = b""
+    # Inserting after a final line that has no terminator (e.g. a lone shebang)
+    if insert_at == len(data) and insert_at > body_start(data) and not data.endswith(newline[-1:]):
+        block += newline
+    for line in expected_header.splitlines():
+        block += line.encode("utf-8") + newline
+    block += newline * blank_lines_after
+
+    return (view[:insert_at], block, view[tail_at:])
+
+
+def build_removed_bytes(
+    data: bytes,
+    analysis: HeaderAnalysis,
+) -> Sequence[bytes | memoryview]:
+    """
+    Byte-level equivalent of `build_removed_lines`.
+    Returns the chunks `(prefix, tail)` as zero-copy views of `data`.
+    """
+    view = memoryview(data)
+    if analysis.existing_header_line is None:
+        return (view,)
+
+    newline = detect_newline(data)
+    start = line_offset(data, analysis.insert_index, body_start(data), newline)
+    num_existing_lines = len(analysis.existing_header_line.splitlines())
+    end = line_offset(data, num_existing_lines, start, newline)
+
+    # If the next line is a blank line, remove it too
+    next_end = line_offset(data, 1, end, newline)
+    if end < len(data) and not data[end:next_end].strip():
+        end = next_end
+
+    return (view[:start], view[end:])
+
+
+# Separators other than "\n" that str.splitlines() also breaks on. Content
+# containing any of them cannot be hashed straight from the raw bytes.
+_SPLITLINES_EXTRA = (
+    b"\r", b"\x0b", b"\x0c", b"\x1c", b"\x1d", b"\x1e",
+    b"\xc2\x85", b"\xe2\x80\xa8", b"\xe2\x80\xa9",
+)
+_HASH_CHUNK = 1024 * 1024
+
+
+def content_hash(
+    data: bytes,
+    offset: int = 0,
+    algorithm: str = hashing.DEFAULT_HEADER_ALGORITHM,
+    digest_size: int | None = None,
+) -> str:
+    """
+    Hex digest of the content of `data` from byte `offset`, defined exactly
+    as `hash("\\n".join(text.splitlines()).encode())` of the decoded text,
+    so existing `hash:` headers keep verifying.
+
+    `data` may be any buffer (bytes, mmap). Canonical content - valid UTF-8
+    with plain LF line endings - is hashed straight from a memoryview slice
+    without allocating a file-sized string; anything else falls back to the
+    decode/split/join definition.
+    """
+    view = memoryview(data)[offset:]
+    canonical = all(data.find(sep, offset) == -1 for sep in _SPLITLINES_EXTRA)
+    if canonical:
+        decoder = codecs.getincrementaldecoder("utf-8")("strict")
+        try:
+            for start in range(0, len(view), _HASH_CHUNK):
+                decoder.decode(view[start : start + _HASH_CHUNK])
+            decoder.decode(b"", final=True)
+        except UnicodeDecodeError:
+            canonical = False
+
+    hasher = hashing.new(algorithm, digest_size)
+    if not canonical:
+        text = bytes(view).decode("utf-8", errors="replace")
+        hasher.update("\n".join(text.splitlines()).encode("utf-8"))
+        return hasher.hexdigest()
+
+    end = len(view)
+    if end and view[end - 1] == 0x0A:
+        end -= 1  # splitlines() drops the final line terminator
+    hasher.update(view[:end])
+    return hasher.hexdigest()
+
+
+def content_hash_from_line(
+    data: bytes,
+    line_index: int,
+    algorithm: str = hashing.DEFAULT_HEADER_ALGORITHM,
+    digest_size: int | None = None,
+) -> str:
+    """`content_hash` of `data` starting at line `line_index` (after any BOM)."""
+    newline = detect_newline(data)
+    offset = line_offset(data, line_index, body_start(data), newline)
+    return content_hash(data, offset, algorithm, digest_size)
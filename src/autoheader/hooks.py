@@ -5,7 +5,8 @@ from . import ui
 
 def install_native_hook(root: Path):
     """
-    Installs a native git pre-commit hook that runs 'autoheader --check'.
+    Installs a native git pre-commit hook that runs 'autoheader --check --staged'
+    on the staged files.
     """
     git_dir = root / ".git"
     if not git_dir.exists():
@@ -21,10 +22,13 @@ def install_native_hook(root: Path):
         ui.console.print(f"[yellow]Hook already exists at {hook_path}. Skipping.[/yellow]")
         return
 
+    # Only the staged files are checked, and their staged content (read from
+    # the index), so a commit costs in proportion to its size. xargs -r skips
+    # the run entirely when nothing is staged (e.g. a deletion-only commit).
     hook_content = (
         "#!/bin/sh\n"
         "# Auto-generated by autoheader\n"
-        "autoheader --check\n"
+        "git diff --cached --name-only -z --diff-filter=d | xargs -0 -r autoheader --check --staged --\n"
     )
 
     try:
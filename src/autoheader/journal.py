@@ -0,0 +1,249 @@
+# src/autoheader/journal.py
+
+from __future__ import annotations
+from pathlib import Path
+from typing import Dict, List, NamedTuple
+from concurrent.futures import ThreadPoolExecutor
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+
+from . import filesystem
+from . import hashing
+from .constants import JOURNAL_DIR_NAME, JOURNAL_KEEP_RUNS
+
+log = logging.getLogger(__name__)
+
+
+class UndoResult(NamedTuple):
+    run_id: str
+    restored: List[str]
+    unchanged: List[str]
+    conflicts: List[str]
+
+
+class RunJournal:
+    """
+    Rollback journal for one `--no-dry-run` execution.
+
+    Two files per run live in `<root>/.autoheader_journal/`:
+
+    - `<run-id>.pack`:    pre-images of every modified file, appended
+                          back-to-back (sequential writes only).
+    - `<run-id>.journal`: one JSON record per line. A `pre` record
+                          (path, pack offset/size, pre-image hash) is
+                          written *before* a file is replaced, a `post`
+                          record (post-image hash) after it.
+
+    `undo()` replays the records to restore every file of a run.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        run_id: str | None = None,
+        hash_algorithm: str = hashing.DEFAULT_CACHE_ALGORITHM,
+        sync: bool = False,
+    ):
+        self.root = root
+        self.run_id = run_id or new_run_id()
+        self.hash_algorithm = hash_algorithm
+        self.sync = sync
+        self.directory = root / JOURNAL_DIR_NAME
+        self.directory.mkdir(exist_ok=True)
+        _prune(self.directory, JOURNAL_KEEP_RUNS - 1)
+
+        self.pack_path = self.directory / f"{self.run_id}.pack"
+        self.journal_path = self.directory / f"{self.run_id}.journal"
+        self._pack_fd = os.open(self.pack_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        self._journal_fd = os.open(
+            self.journal_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND | os.O_EXCL, 0o600
+        )
+        self._offset = 0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def capture(self, rel_posix: str, original_content: bytes) -> None:
+        """Stores the pre-image of `rel_posix`; call before replacing it."""
+        pre_hash = filesystem.hash_bytes(
+            (original_content,), self.hash_algorithm, hashing.CACHE_DIGEST_SIZE
+        )
+        with self._lock:
+            offset = self._offset
+            filesystem._write_all(self._pack_fd, original_content)
+            self._offset += len(original_content)
+            self._append_locked(
+                {"op": "pre", "path": rel_posix, "offset": offset,
+                 "size": len(original_content), "hash": pre_hash}
+            )
+
+    def capture_file(self, rel_posix: str, path: Path) -> None:
+        """Like `capture`, copying the pre-image straight from `path`."""
+        pre_hash = filesystem.get_file_hash(path, self.hash_algorithm, hashing.CACHE_DIGEST_SIZE)
+        with path.open("rb") as src:
+            size = os.fstat(src.fileno()).st_size
+            with self._lock:
+                offset = self._offset
+                filesystem._copy_range(src.fileno(), self._pack_fd, 0, size)
+                self._offset += size
+                self._append_locked(
+                    {"op": "pre", "path": rel_posix, "offset": offset,
+                     "size": size, "hash": pre_hash}
+                )
+
+    def record_post(self, rel_posix: str, new_hash: str) -> None:
+        """Records the post-image hash of `rel_posix` after it was replaced."""
+        with self._lock:
+            self._append_locked({"op": "post", "path": rel_posix, "hash": new_hash})
+
+    def _append_locked(self, record: dict) -> None:
+        if record["op"] == "pre":
+            self._count += 1
+            if self.sync:
+                # The pre-image must be durable before the file is replaced
+                os.fsync(self._pack_fd)
+        filesystem._write_all(self._journal_fd, (json.dumps(record) + "\n").encode("utf-8"))
+        if self.sync:
+            os.fsync(self._journal_fd)
+
+    def close(self) -> bool:
+        """
+        Flushes and closes the journal. Returns True if the run was recorded;
+        a run that modified nothing leaves no files behind.
+        """
+        for fd in (self._pack_fd, self._journal_fd):
+            try:
+                if self._count:
+                    os.fsync(fd)
+            finally:
+                os.close(fd)
+        if not self._count:
+            self.pack_path.unlink()
+            self.journal_path.unlink()
+            return False
+        return True
+
+
+def new_run_id() -> str:
+    """Sortable, collision-resistant run id, e.g. `20250101-120000-1a2b3c`."""
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{secrets.token_hex(3)}"
+
+
+def list_runs(root: Path) -> List[str]:
+    """Returns the recorded run ids, oldest first."""
+    directory = root / JOURNAL_DIR_NAME
+    if not directory.is_dir():
+        return []
+    return sorted(p.stem for p in directory.glob("*.journal"))
+
+
+def _prune(directory: Path, keep: int) -> None:
+    """Deletes all but the newest `keep` runs."""
+    runs = sorted(p.stem for p in directory.glob("*.journal"))
+    for run_id in runs[: max(len(runs) - keep, 0)]:
+        for suffix in (".journal", ".pack"):
+            try:
+                (directory / f"{run_id}{suffix}").unlink()
+            except OSError as e:
+                log.debug(f"Could not prune journal file {run_id}{suffix}: {e}")
+
+
+def _read_records(journal_path: Path) -> List[dict]:
+    records = []
+    with journal_path.open("r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                # A crash can leave a torn last line; everything before it is valid
+                log.warning(f"Ignoring damaged record in {journal_path.name}.")
+    return records
+
+
+def _is_undone(records: List[dict]) -> bool:
+    return any(r.get("op") == "undo" for r in records)
+
+
+def resolve_run(root: Path, run_id: str = "latest") -> str | None:
+    """
+    Maps `latest` to the newest run that has not been undone yet, so
+    repeated `--undo` calls step back one run at a time.
+    """
+    runs = list_runs(root)
+    if run_id != "latest":
+        return run_id if run_id in runs else None
+    directory = root / JOURNAL_DIR_NAME
+    for candidate in reversed(runs):
+        if not _is_undone(_read_records(directory / f"{candidate}.journal")):
+            return candidate
+    return None
+
+
+def undo(root: Path, run_id: str, workers: int = 8) -> UndoResult:
+    """
+    Restores every file modified by `run_id` from its pre-image, in parallel.
+
+    A file is restored only if it still matches the post-image the run
+    wrote. Files edited since are reported as conflicts and left alone;
+    files that were never replaced (no `post` record and still equal to
+    the pre-image) are reported as unchanged.
+    """
+    directory = root / JOURNAL_DIR_NAME
+    journal_path = directory / f"{run_id}.journal"
+    records = _read_records(journal_path)
+    if _is_undone(records):
+        raise ValueError(f"Run {run_id} has already been undone.")
+
+    entries: Dict[str, dict] = {}
+    for record in records:
+        if record.get("op") == "pre":
+            entries[record["path"]] = dict(record, post=None)
+        elif record.get("op") == "post" and record["path"] in entries:
+            entries[record["path"]]["post"] = record["hash"]
+
+    restored: List[str] = []
+    unchanged: List[str] = []
+    conflicts: List[str] = []
+
+    with (directory / f"{run_id}.pack").open("rb") as pack:
+
+        def restore(entry: dict) -> str:
+            path = root / entry["path"]
+            if not path.is_file():
+                return "conflict"
+            current = _hash_like(path, entry["post"] or entry["hash"])
+            if entry["post"] is None:
+                if current == entry["hash"]:
+                    return "unchanged"
+            elif current != entry["post"]:
+                return "conflict"
+            try:
+                filesystem.replace_from_range(path, pack.fileno(), entry["offset"], entry["size"])
+            except (IOError, PermissionError):
+                return "conflict"
+            return "restored"
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            outcomes = executor.map(restore, entries.values())
+            for rel_posix, outcome in zip(entries, outcomes):
+                if outcome == "restored":
+                    restored.append(rel_posix)
+                elif outcome == "unchanged":
+                    unchanged.append(rel_posix)
+                else:
+                    log.warning(f"Not restoring {rel_posix}: modified since run {run_id}.")
+                    conflicts.append(rel_posix)
+
+    with journal_path.open("a", encoding="utf-8") as f:
+        f.write(json.dumps({"op": "undo", "restored": len(restored)}) + "\n")
+
+    return UndoResult(run_id, restored, unchanged, conflicts)
+
+
+def _hash_like(path: Path, reference: str) -> str:
+    """Hashes `path` with the algorithm and digest size `reference` was made with."""
+    algorithm, hexdigest = hashing.parse_digest(reference)
+    return filesystem.get_file_hash(path, algorithm, len(hexdigest) // 2)
@@ -0,0 +1,35 @@
+# src/autoheader/launcher.py
+
+# The `autoheader` console script. Subcommands and a `--check` that a running
+# daemon answers (see client.py) return from here, before the CLI module, and
+# with it argparse, logging and the planner, is imported at all.
+
+from __future__ import annotations
+from typing import List
+import sys
+
+
+def dispatch(args: List[str]) -> int | None:
+    """Runs a subcommand, or a `--check` the daemon answers; None leaves `args` to the CLI."""
+    if args[:1] == ["daemon"]:
+        from . import daemon
+        return daemon.main(args[1:])
+    if args[:1] == ["watch"]:
+        from . import watch
+        return watch.main(args[1:])
+    if args[:1] == ["pre-receive"]:
+        from . import prereceive
+        return prereceive.main(args[1:])
+    if "--check" in args:
+        # A running `autoheader daemon` answers from memory; else check in-process
+        from . import client
+        return client.run_check(args)
+    return None
+
+
+def main(argv: List[str] | None = None) -> int:
+    exit_code = dispatch(argv if argv is not None else sys.argv[1:])
+    if exit_code is not None:
+        return exit_code
+    from . import cli
+    return cli.run(argv)
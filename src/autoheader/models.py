@@ -1,9 +1,12 @@
 # src/autoheader/models.py
 
 from __future__ import annotations
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List
+from typing import Dict, List, Sequence
+
+from .constants import GENERATED_MARKERS, MAX_FILE_SIZE_BYTES, MINIFIED_LINE_LENGTH
+from .hashing import DEFAULT_CACHE_ALGORITHM, DEFAULT_HEADER_ALGORITHM
 
 
 # --- ADD THIS ---
@@ -18,13 +21,16 @@ class LanguageConfig:
     analysis_mode: str = "line"
     license_spdx: str | None = None
     license_owner: str | None = None
+    # Shebang interpreters and modeline names that also select this language
+    # for extensionless files (see sniff.Sniffer), besides its own name
+    interpreters: List[str] = field(default_factory=list)
 
 
 @dataclass
 class PlanItem:
     path: Path
     rel_posix: str
-    action: str  # "skip-excluded" | "skip-header-exists" | "add" | "override" | "remove" | "skip-cached"
+    action: str  # "skip-excluded" | "skip-header-exists" | "skip-generated" | "add" | "override" | "remove" | "skip-cached"
     
     # --- ADD THESE ---
     # Config needed by the execution (write) phase
@@ -37,6 +43,14 @@ class PlanItem:
     # --- END ADD ---
 
     reason: str = ""
+    # True when the file exceeds the streaming threshold and must be
+    # rewritten out-of-core by the execution phase.
+    streaming: bool = False
+    # Algorithm used to render/verify the {hash} placeholder
+    hash_algorithm: str = DEFAULT_HEADER_ALGORITHM
+    # Path rendered as {path} when it differs from rel_posix: in workspace
+    # mode, headers name the path within the file's package.
+    header_path: str | None = None
 
 
 @dataclass
@@ -59,3 +73,17 @@ class RuntimeContext:
     remove: bool
     check_hash: bool
     timeout: float
+    streaming_threshold: int = MAX_FILE_SIZE_BYTES
+    cache_hash_algorithm: str = DEFAULT_CACHE_ALGORITHM
+    header_hash_algorithm: str = DEFAULT_HEADER_ALGORITHM
+    # rel_posix -> cache entry of files completed by an interrupted run
+    # (`--resume`); these are skipped unless they changed since.
+    resume: Dict[str, dict] = field(default_factory=dict)
+    # rel_posix -> git.FileHistory, for the {year_created}/{year_modified}/
+    # {commit} placeholders; loaded by plan_files() when a template uses them.
+    history: Dict[str, tuple] | None = None
+    # Sniff the language of extensionless files no glob matches (`--sniff`)
+    sniff: bool = False
+    # Generated/minified file detection (see generated.detect_generated)
+    generated_markers: Sequence[str] = GENERATED_MARKERS
+    minified_line_length: int = MINIFIED_LINE_LENGTH
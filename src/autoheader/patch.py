@@ -0,0 +1,134 @@
+# src/autoheader/patch.py
+
+from __future__ import annotations
+from pathlib import Path
+from typing import BinaryIO, Iterable, List
+from concurrent.futures import ThreadPoolExecutor
+import difflib
+import logging
+import re
+import sys
+
+from .models import PlanItem
+from . import core
+
+log = logging.getLogger(__name__)
+
+# Lines as git sees them: LF-terminated, CR stays part of the line
+_LINE_RX = re.compile(rb"[^\n]*\n|[^\n]+\Z")
+_NO_EOL = b"\n\\ No newline at end of file\n"
+# Context lines per hunk, and how far past a streamed head they are looked for
+_CONTEXT_LINES = 3
+_CONTEXT_BYTES = 64 * 1024
+
+
+def _split_lines(data: bytes) -> List[bytes]:
+    return _LINE_RX.findall(data)
+
+
+def _lines_after(path: Path, offset: int) -> bytes:
+    """The (at most `_CONTEXT_LINES`) whole lines of `path` that follow `offset`."""
+    with path.open("rb") as f:
+        f.seek(offset)
+        window = f.read(_CONTEXT_BYTES)
+        at_eof = not f.read(1)
+    lines = _split_lines(window)[:_CONTEXT_LINES]
+    if lines and not lines[-1].endswith(b"\n") and not at_eof:
+        lines.pop()  # Cut by the window, not the file's last line
+    return b"".join(lines)
+
+
+def file_patch(item: PlanItem, blank_lines_after: int) -> bytes:
+    """
+    Returns a git-apply compatible unified diff for one PlanItem, or b""
+    if it would not change the file. Bytes are diffed as-is, so newline
+    style, BOM and encoding survive `git apply` unchanged. Streamed files
+    only have their head diffed: the tail is never touched.
+    """
+    data, lines, analysis_mode, content_hash = core.read_for_rewrite(item)
+    chunks, _, _ = core.render_chunks(
+        item,
+        data,
+        lines,
+        analysis_mode=analysis_mode,
+        content_hash=content_hash,
+        blank_lines_after=blank_lines_after,
+    )
+    new_data = b"".join(chunks)
+    if new_data == data:
+        return b""
+    if item.streaming:
+        # git anchors a hunk without trailing context to the end of the
+        # file, so a header inserted at the end of the head needs the lines
+        # after it
+        tail = _lines_after(item.path, len(data))
+        data += tail
+        new_data += tail
+
+    rel = item.rel_posix.encode("utf-8")
+    out = [b"diff --git a/" + rel + b" b/" + rel + b"\n"]
+    diff = difflib.diff_bytes(
+        difflib.unified_diff,
+        _split_lines(data),
+        _split_lines(new_data),
+        fromfile=b"a/" + rel,
+        tofile=b"b/" + rel,
+        n=3,
+    )
+    for line in diff:
+        if line.startswith((b"---", b"+++")):
+            out.append(line.rstrip(b"\n") + b"\n")
+        elif line.endswith(b"\n"):
+            out.append(line)
+        else:
+            out.append(line + _NO_EOL)
+    return b"".join(out)
+
+
+def write_patch(
+    items: Iterable[PlanItem],
+    out: BinaryIO,
+    *,
+    blank_lines_after: int,
+    workers: int = 8,
+) -> List[PlanItem]:
+    """
+    Streams one unified diff covering all `items` into `out`. Per-file
+    diffs are generated in parallel and written in path order, so the
+    patch is deterministic. Returns the items that appear in the patch.
+    """
+    ordered = sorted(items, key=lambda item: item.rel_posix)
+    patched: List[PlanItem] = []
+
+    def diff_one(item: PlanItem) -> bytes:
+        try:
+            return file_patch(item, blank_lines_after)
+        except Exception as e:
+            log.error(f"Failed to diff {item.rel_posix}: {e}")
+            return b""
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # map() yields in submission order while later files are still diffing
+        for item, diff in zip(ordered, executor.map(diff_one, ordered)):
+            if diff:
+                out.write(diff)
+                patched.append(item)
+    return patched
+
+
+def emit_patch(
+    items: Iterable[PlanItem],
+    path: Path,
+    *,
+    blank_lines_after: int,
+    workers: int = 8,
+) -> List[PlanItem]:
+    """`write_patch` into the file at `path` (`-` for stdout)."""
+    if str(path) == "-":
+        return write_patch(items, sys.stdout.buffer, blank_lines_after=blank_lines_after, workers=workers)
+    try:
+        with path.open("wb") as out:
+            return write_patch(items, out, blank_lines_after=blank_lines_after, workers=workers)
+    except (IOError, PermissionError) as e:
+        log.error(f"Failed to write patch {path}: {e}")
+        raise
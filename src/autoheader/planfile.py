@@ -0,0 +1,126 @@
+# src/autoheader/planfile.py
+
+from __future__ import annotations
+from pathlib import Path
+from typing import Iterable, List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+import json
+import logging
+
+from .models import PlanItem
+from . import filesystem
+from . import hashing
+
+log = logging.getLogger(__name__)
+
+PLAN_FORMAT = "autoheader-plan"
+PLAN_VERSION = 1
+
+# PlanItem fields stored per record (path is stored relative, as "path")
+_ITEM_FIELDS = (
+    "action", "prefix", "check_encoding", "template", "analysis_mode",
+    "license_spdx", "license_owner", "reason", "streaming", "hash_algorithm", "header_path",
+)
+# Fields a record must carry (the rest have PlanItem defaults), and the
+# JSON types each field may hold
+_REQUIRED_FIELDS = ("path", "fingerprint", "action", "prefix", "check_encoding", "template", "analysis_mode")
+_FIELD_TYPES = {
+    "path": (str,), "fingerprint": (dict,), "action": (str,), "prefix": (str,),
+    "check_encoding": (bool,), "template": (str,), "analysis_mode": (str,),
+    "license_spdx": (str, type(None)), "license_owner": (str, type(None)), "reason": (str,),
+    "streaming": (bool,), "hash_algorithm": (str,), "header_path": (str, type(None)),
+}
+
+
+def write_plan(path: Path, items: Iterable[Tuple[PlanItem, dict]]) -> int:
+    """
+    Writes (PlanItem, fingerprint) pairs as NDJSON: a header line, then one
+    record per item. The fingerprint is the planner's cache entry
+    (mtime + content hash) of the file the action was computed from.
+    Returns the number of items written.
+    """
+    count = 0
+    try:
+        with path.open("w", encoding="utf-8") as f:
+            f.write(json.dumps({"format": PLAN_FORMAT, "version": PLAN_VERSION}) + "\n")
+            for item, fingerprint in items:
+                record = {"path": item.rel_posix}
+                record.update((name, getattr(item, name)) for name in _ITEM_FIELDS)
+                record["fingerprint"] = fingerprint
+                f.write(json.dumps(record) + "\n")
+                count += 1
+    except (IOError, PermissionError) as e:
+        log.error(f"Failed to write plan {path}: {e}")
+        raise
+    return count
+
+
+def read_plan(path: Path, root: Path) -> List[Tuple[PlanItem, dict]]:
+    """
+    Reads a plan written by `write_plan`, resolving paths against `root`
+    (which may differ from the root the plan was made in).
+    Raises ValueError if the file is not a plan this version understands,
+    or if any record in it is malformed.
+    """
+    with path.open("r", encoding="utf-8") as f:
+        try:
+            header = json.loads(f.readline() or "{}")
+        except ValueError:
+            header = None
+        if not isinstance(header, dict) or header.get("format") != PLAN_FORMAT or header.get("version") != PLAN_VERSION:
+            raise ValueError(f"{path} is not an autoheader plan (version {PLAN_VERSION}).")
+        items = []
+        for lineno, line in enumerate(f, start=2):
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"{path}:{lineno}: malformed plan record: {e}") from e
+            problem = _check_record(record)
+            if problem:
+                raise ValueError(f"{path}:{lineno}: malformed plan record: {problem}")
+            rel_posix = record.pop("path")
+            fingerprint = record.pop("fingerprint")
+            items.append((PlanItem(path=root / rel_posix, rel_posix=rel_posix, **record), fingerprint))
+    return items
+
+
+def _check_record(record: object) -> str | None:
+    """Returns what is wrong with a plan record, or None if it is usable."""
+    if not isinstance(record, dict):
+        return "not a JSON object"
+    missing = [name for name in _REQUIRED_FIELDS if name not in record]
+    if missing:
+        return f"missing {', '.join(missing)}"
+    for name, value in record.items():
+        if name not in _FIELD_TYPES:
+            return f"unknown field {name!r}"
+        if not isinstance(value, _FIELD_TYPES[name]):
+            return f"{name} has the wrong type ({type(value).__name__})"
+    return None
+
+
+def matches(item: PlanItem, fingerprint: dict) -> bool:
+    """
+    True if `item.path` still has the content the plan was computed from.
+    Content is compared by hash, not mtime, so a fresh checkout of the
+    same commit in a later job still matches.
+    """
+    expected = fingerprint.get("hash")
+    if not expected:
+        return False
+    try:
+        algorithm, hexdigest = hashing.parse_digest(expected)
+    except ValueError:
+        return False
+    return filesystem.get_file_hash(item.path, algorithm, len(hexdigest) // 2) == expected
+
+
+def verify_plan(
+    items: List[Tuple[PlanItem, dict]], workers: int = 8
+) -> Tuple[List[PlanItem], List[PlanItem]]:
+    """Splits plan items into (still valid, stale), checking in parallel."""
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(lambda pair: matches(*pair), items))
+    valid = [pair[0] for pair, ok in zip(items, results) if ok]
+    stale = [pair[0] for pair, ok in zip(items, results) if not ok]
+    return valid, stale
@@ -1,17 +1,44 @@
 from __future__ import annotations
-from pathlib import Path
-from typing import List, Tuple, Iterator
+from pathlib import Path, PurePath
+from typing import Callable, List, Tuple, Iterator
+from collections import deque
+import itertools
 import logging
-from concurrent.futures import ThreadPoolExecutor
+import re
+from concurrent.futures import Executor, ThreadPoolExecutor
 
 from .models import PlanItem, LanguageConfig, RuntimeContext
-from .constants import MAX_FILE_SIZE_BYTES, INLINE_IGNORE_COMMENT
+from .constants import INLINE_IGNORE_COMMENT, STREAM_HEAD_BYTES, MMAP_THRESHOLD_BYTES, SKIP_WORKTREE_REASON, GENERATED_HEAD_BYTES
 from . import filters
 from . import headerlogic
 from . import filesystem
+from . import generated
+from . import git
+from . import sniff
+from .hashing import CACHE_DIGEST_SIZE
 
 log = logging.getLogger(__name__)
 
+def _mapped_content_hasher(path: Path) -> Callable[[int, str, int | None], str]:
+    """
+    Returns a `content_hasher` for analyze_header_state that hashes the
+    content after a given line straight from an mmap of the file, instead
+    of re-joining and re-encoding the decoded lines.
+    """
+    def hasher(line_index: int, algorithm: str, digest_size: int | None = None) -> str:
+        with filesystem.map_file(path) as buf:
+            return headerlogic.content_hash_from_line(buf, line_index, algorithm, digest_size)
+    return hasher
+
+
+def _generated_head_size(context: RuntimeContext) -> int:
+    return max(GENERATED_HEAD_BYTES, context.minified_line_length)
+
+
+def _generated_reason(head: bytes, context: RuntimeContext, lang: LanguageConfig) -> str | None:
+    return generated.detect_generated(head, context.generated_markers, context.minified_line_length, lang.prefix)
+
+
 def _analyze_single_file(
     args: Tuple[Path, LanguageConfig, RuntimeContext],
     cache: dict,
@@ -22,128 +49,344 @@ def _analyze_single_file(
     """
     path, lang, context = args
     rel_posix = path.relative_to(context.root).as_posix()
+    template = lang.template
+    # History can change without the file changing (a new commit), so
+    # such headers are never answered from the cache.
+    uses_history = headerlogic.uses_history(template)
+    if uses_history:
+        template = headerlogic.fill_history(template, (context.history or {}).get(rel_posix))
 
     if filters.is_excluded(path, context.root, context.excludes):
-        return PlanItem(path, rel_posix, "skip-excluded", prefix=lang.prefix, check_encoding=lang.check_encoding, template=lang.template, analysis_mode=lang.analysis_mode, license_spdx=lang.license_spdx), None
+        return PlanItem(path, rel_posix, "skip-excluded", prefix=lang.prefix, check_encoding=lang.check_encoding, template=template, analysis_mode=lang.analysis_mode, license_spdx=lang.license_spdx), None
 
     if not filters.within_depth(path, context.root, context.depth):
-        return PlanItem(path, rel_posix, "skip-excluded", reason="depth", prefix=lang.prefix, check_encoding=lang.check_encoding, template=lang.template, analysis_mode=lang.analysis_mode, license_spdx=lang.license_spdx), None
+        return PlanItem(path, rel_posix, "skip-excluded", reason="depth", prefix=lang.prefix, check_encoding=lang.check_encoding, template=template, analysis_mode=lang.analysis_mode, license_spdx=lang.license_spdx), None
 
     try:
         stat = path.stat()
         mtime = stat.st_mtime
         file_size = stat.st_size
-        if file_size > MAX_FILE_SIZE_BYTES:
-            reason = f"file size ({file_size}b) exceeds limit"
-            return PlanItem(path, rel_posix, "skip-excluded", reason=reason, prefix=lang.prefix, check_encoding=lang.check_encoding, template=lang.template, analysis_mode=lang.analysis_mode, license_spdx=lang.license_spdx), None
+        # Above the threshold we never load the whole file: analysis uses a
+        # bounded head read and the writer streams the remainder.
+        streaming = file_size > context.streaming_threshold
     except (IOError, PermissionError) as e:
         log.warning(f"Could not stat file {path}: {e}")
-        return PlanItem(path, rel_posix, "skip-excluded", reason=f"stat failed: {e}", prefix=lang.prefix, check_encoding=lang.check_encoding, template=lang.template, analysis_mode=lang.analysis_mode, license_spdx=lang.license_spdx), None
+        return PlanItem(path, rel_posix, "skip-excluded", reason=f"stat failed: {e}", prefix=lang.prefix, check_encoding=lang.check_encoding, template=template, analysis_mode=lang.analysis_mode, license_spdx=lang.license_spdx), None
+
+    done = context.resume.get(rel_posix)
+    if done is not None:
+        # Completed before the interruption; re-verify only if it changed since
+        if done["mtime"] == mtime or filesystem.get_file_hash(
+            path, context.cache_hash_algorithm, CACHE_DIGEST_SIZE
+        ) == done["hash"]:
+            return PlanItem(path, rel_posix, "skip-header-exists", reason="checkpoint", prefix=lang.prefix, check_encoding=lang.check_encoding, template=template, analysis_mode=lang.analysis_mode, license_spdx=lang.license_spdx), (rel_posix, done)
+        log.debug(f"{rel_posix} changed since the checkpoint; re-verifying.")
+
+    if rel_posix in cache and cache[rel_posix]["mtime"] == mtime and not uses_history:
+        return PlanItem(path, rel_posix, "skip-header-exists", reason="cached", prefix=lang.prefix, check_encoding=lang.check_encoding, template=template, analysis_mode=lang.analysis_mode, license_spdx=lang.license_spdx), (rel_posix, cache[rel_posix])
 
-    if rel_posix in cache and cache[rel_posix]["mtime"] == mtime:
-        return PlanItem(path, rel_posix, "skip-header-exists", reason="cached", prefix=lang.prefix, check_encoding=lang.check_encoding, template=lang.template, analysis_mode=lang.analysis_mode, license_spdx=lang.license_spdx), (rel_posix, cache[rel_posix])
+    # Generated files are judged from a head read alone: never hashed, read
+    # in full or parsed. They are not cached, so a regenerated file is
+    # judged again. Streamed files reuse the head for analysis.
+    window = _generated_head_size(context)
+    head = filesystem.read_file_head(path, max(STREAM_HEAD_BYTES, window) if streaming else window)
+    reason = _generated_reason(head[:window], context, lang)
+    if reason is not None:
+        return PlanItem(path, rel_posix, "skip-generated", reason=reason, prefix=lang.prefix, check_encoding=lang.check_encoding, template=template, analysis_mode=lang.analysis_mode, license_spdx=lang.license_spdx), None
 
-    file_hash = filesystem.get_file_hash(path)
+    file_hash = filesystem.get_file_hash(path, context.cache_hash_algorithm, CACHE_DIGEST_SIZE)
     if not file_hash:  # Hashing failed
-        return PlanItem(path, rel_posix, "skip-excluded", reason="hash failed", prefix=lang.prefix, check_encoding=lang.check_encoding, template=lang.template, analysis_mode=lang.analysis_mode, license_spdx=lang.license_spdx), None
+        return PlanItem(path, rel_posix, "skip-excluded", reason="hash failed", prefix=lang.prefix, check_encoding=lang.check_encoding, template=template, analysis_mode=lang.analysis_mode, license_spdx=lang.license_spdx), None
 
     cache_entry = {"mtime": mtime, "hash": file_hash}
-    lines = filesystem.read_file_lines(path)
+
+    if streaming:
+        lines = headerlogic.decode_lines(headerlogic.complete_lines(head[:STREAM_HEAD_BYTES]))
+        # AST analysis needs the whole module; streamed files use line mode.
+        analysis_mode = "line"
+    else:
+        lines = filesystem.read_file_lines(path)
+        analysis_mode = lang.analysis_mode
 
     if not lines:
-        return PlanItem(path, rel_posix, "skip-empty", prefix=lang.prefix, check_encoding=lang.check_encoding, template=lang.template, analysis_mode=lang.analysis_mode, license_spdx=lang.license_spdx), (rel_posix, cache_entry)
+        return PlanItem(path, rel_posix, "skip-empty", prefix=lang.prefix, check_encoding=lang.check_encoding, template=template, analysis_mode=lang.analysis_mode, license_spdx=lang.license_spdx), (rel_posix, cache_entry)
 
-    is_ignored = False
-    for line in lines:
-        if INLINE_IGNORE_COMMENT in line:
-            is_ignored = True
-            break
+    if streaming:
+        is_ignored = filesystem.file_contains(path, INLINE_IGNORE_COMMENT.encode("utf-8"))
+    else:
+        is_ignored = False
+        for line in lines:
+            if INLINE_IGNORE_COMMENT in line:
+                is_ignored = True
+                break
 
     if is_ignored:
-        return PlanItem(path, rel_posix, "skip-excluded", reason="inline ignore", prefix=lang.prefix, check_encoding=lang.check_encoding, template=lang.template, analysis_mode=lang.analysis_mode, license_spdx=lang.license_spdx), (rel_posix, cache_entry)
+        return PlanItem(path, rel_posix, "skip-excluded", reason="inline ignore", prefix=lang.prefix, check_encoding=lang.check_encoding, template=template, analysis_mode=lang.analysis_mode, license_spdx=lang.license_spdx), (rel_posix, cache_entry)
+
+    # Large files are hashed from an mmap rather than from joined strings
+    content_hasher = None
+    content = None
+    content_hash = None
+    if streaming or file_size >= MMAP_THRESHOLD_BYTES:
+        content_hasher = _mapped_content_hasher(path)
+        if "{hash}" in template:
+            content_hash = content_hasher(0, context.header_hash_algorithm, None)
+    else:
+        content = "\n".join(lines)
 
-    content = "\n".join(lines)
-    # First, get a preliminary analysis to find the existing header
+    item = _decide_action(
+        path, rel_posix, lang, context, template, lines, analysis_mode, streaming, content, content_hasher, content_hash
+    )
+    return item, (rel_posix, cache_entry)
+
+
+def _decide_action(
+    path: Path,
+    rel_posix: str,
+    lang: LanguageConfig,
+    context: RuntimeContext,
+    template: str,
+    lines: List[str],
+    analysis_mode: str,
+    streaming: bool,
+    content: str | None,
+    content_hasher: Callable[[int, str, int | None], str] | None,
+    content_hash: str | None,
+) -> PlanItem:
+    """
+    The action for a non-empty, non-ignored file, given its decoded `lines`
+    and either its `content` or a `content_hasher`. Shared by working-tree
+    and `--rev` planning, which differ only in where the bytes come from.
+    """
+    # First, get a preliminary analysis to find the existing header. Only the
+    # final analysis verifies a hash token, so content is hashed once.
     prelim_analysis = headerlogic.analyze_header_state(
-        lines, "", lang.prefix, lang.check_encoding, lang.analysis_mode, context.check_hash
+        lines, "", lang.prefix, lang.check_encoding, analysis_mode
     )
 
     expected = headerlogic.header_line_for(
         rel_posix,
-        lang.template,
+        template,
         content,
         prelim_analysis.existing_header_line,
         license_spdx=lang.license_spdx,
         license_owner=lang.license_owner,
+        content_hash=content_hash,
+        hash_algorithm=context.header_hash_algorithm,
     )
     analysis = headerlogic.analyze_header_state(
-        lines, expected, lang.prefix, lang.check_encoding, lang.analysis_mode, context.check_hash
+        lines, expected, lang.prefix, lang.check_encoding, analysis_mode, context.check_hash, content_hasher
     )
 
     if analysis.has_tampered_header:
-        return PlanItem(path, rel_posix, "override", reason="hash mismatch", prefix=lang.prefix, check_encoding=lang.check_encoding, template=lang.template, analysis_mode=lang.analysis_mode, license_spdx=lang.license_spdx), (rel_posix, cache_entry)
+        return PlanItem(path, rel_posix, "override", reason="hash mismatch", prefix=lang.prefix, check_encoding=lang.check_encoding, template=template, analysis_mode=lang.analysis_mode, license_spdx=lang.license_spdx, license_owner=lang.license_owner, streaming=streaming, hash_algorithm=context.header_hash_algorithm)
 
     if context.remove:
         if analysis.existing_header_line is not None:
-            return PlanItem(path, rel_posix, "remove", prefix=lang.prefix, check_encoding=lang.check_encoding, template=lang.template, analysis_mode=lang.analysis_mode, license_spdx=lang.license_spdx), (rel_posix, cache_entry)
+            return PlanItem(path, rel_posix, "remove", prefix=lang.prefix, check_encoding=lang.check_encoding, template=template, analysis_mode=lang.analysis_mode, license_spdx=lang.license_spdx, streaming=streaming, hash_algorithm=context.header_hash_algorithm)
         else:
-            return PlanItem(path, rel_posix, "skip-header-exists", reason="no-header-to-remove", prefix=lang.prefix, check_encoding=lang.check_encoding, template=lang.template, analysis_mode=lang.analysis_mode, license_spdx=lang.license_spdx), (rel_posix, cache_entry)
+            return PlanItem(path, rel_posix, "skip-header-exists", reason="no-header-to-remove", prefix=lang.prefix, check_encoding=lang.check_encoding, template=template, analysis_mode=lang.analysis_mode, license_spdx=lang.license_spdx)
 
     if analysis.has_correct_header:
-        return PlanItem(path, rel_posix, "skip-header-exists", prefix=lang.prefix, check_encoding=lang.check_encoding, template=lang.template, analysis_mode=lang.analysis_mode, license_spdx=lang.license_spdx), (rel_posix, cache_entry)
+        return PlanItem(path, rel_posix, "skip-header-exists", prefix=lang.prefix, check_encoding=lang.check_encoding, template=template, analysis_mode=lang.analysis_mode, license_spdx=lang.license_spdx)
 
     if analysis.existing_header_line is None:
-        return PlanItem(path, rel_posix, "add", prefix=lang.prefix, check_encoding=lang.check_encoding, template=lang.template, analysis_mode=lang.analysis_mode, license_spdx=lang.license_spdx, license_owner=lang.license_owner), (rel_posix, cache_entry)
+        return PlanItem(path, rel_posix, "add", prefix=lang.prefix, check_encoding=lang.check_encoding, template=template, analysis_mode=lang.analysis_mode, license_spdx=lang.license_spdx, license_owner=lang.license_owner, streaming=streaming, hash_algorithm=context.header_hash_algorithm)
 
     if context.override:
-        return PlanItem(path, rel_posix, "override", prefix=lang.prefix, check_encoding=lang.check_encoding, template=lang.template, analysis_mode=lang.analysis_mode, license_spdx=lang.license_spdx, license_owner=lang.license_owner), (rel_posix, cache_entry)
+        return PlanItem(path, rel_posix, "override", prefix=lang.prefix, check_encoding=lang.check_encoding, template=template, analysis_mode=lang.analysis_mode, license_spdx=lang.license_spdx, license_owner=lang.license_owner, streaming=streaming, hash_algorithm=context.header_hash_algorithm)
+    else:
+        return PlanItem(path, rel_posix, "skip-header-exists", reason="incorrect-header-no-override", prefix=lang.prefix, check_encoding=lang.check_encoding, template=template, analysis_mode=lang.analysis_mode, license_spdx=lang.license_spdx, license_owner=lang.license_owner)
+
+
+def _analyze_blob(
+    rel_posix: str, data: bytes, lang: LanguageConfig, context: RuntimeContext, size: int | None = None
+) -> PlanItem:
+    """
+    Same decision as `_analyze_single_file`, for content held in memory (a
+    git blob, an archive member) rather than a file on disk. Exclusion is
+    checked by the caller. `size` is the full size when `data` is only a
+    head read of content above the streaming threshold; the head is then
+    all that is analysed.
+    """
+    path = context.root / rel_posix
+    template = lang.template
+    if headerlogic.uses_history(template):
+        template = headerlogic.fill_history(template, (context.history or {}).get(rel_posix))
+
+    reason = _generated_reason(data[:_generated_head_size(context)], context, lang)
+    if reason is not None:
+        return PlanItem(path, rel_posix, "skip-generated", reason=reason, prefix=lang.prefix, check_encoding=lang.check_encoding, template=template, analysis_mode=lang.analysis_mode, license_spdx=lang.license_spdx)
+
+    streaming = (len(data) if size is None else size) > context.streaming_threshold
+    if streaming:
+        lines = headerlogic.decode_lines(headerlogic.complete_lines(data[:STREAM_HEAD_BYTES]))
+        analysis_mode = "line"
     else:
-        return PlanItem(path, rel_posix, "skip-header-exists", reason="incorrect-header-no-override", prefix=lang.prefix, check_encoding=lang.check_encoding, template=lang.template, analysis_mode=lang.analysis_mode, license_spdx=lang.license_spdx, license_owner=lang.license_owner), (rel_posix, cache_entry)
+        lines = headerlogic.decode_lines(data)
+        analysis_mode = lang.analysis_mode
 
+    if not lines:
+        return PlanItem(path, rel_posix, "skip-empty", prefix=lang.prefix, check_encoding=lang.check_encoding, template=template, analysis_mode=lang.analysis_mode, license_spdx=lang.license_spdx)
 
-def _get_language_for_file(path: Path, languages: List[LanguageConfig]) -> LanguageConfig | None:
+    if INLINE_IGNORE_COMMENT.encode("utf-8") in data:
+        return PlanItem(path, rel_posix, "skip-excluded", reason="inline ignore", prefix=lang.prefix, check_encoding=lang.check_encoding, template=template, analysis_mode=lang.analysis_mode, license_spdx=lang.license_spdx)
+
+    content_hasher = None
+    content = None
+    content_hash = None
+    if streaming or len(data) >= MMAP_THRESHOLD_BYTES:
+        def content_hasher(line_index: int, algorithm: str, digest_size: int | None = None) -> str:
+            return headerlogic.content_hash_from_line(data, line_index, algorithm, digest_size)
+        if "{hash}" in template:
+            content_hash = content_hasher(0, context.header_hash_algorithm)
+    else:
+        content = "\n".join(lines)
+
+    return _decide_action(
+        path, rel_posix, lang, context, template, lines, analysis_mode, streaming, content, content_hasher, content_hash
+    )
+
+
+def _get_language_for_file(path: PurePath, languages: List[LanguageConfig]) -> LanguageConfig | None:
     """Finds the first language config that matches the file path."""
-    for lang in languages:
-        for glob in lang.file_globs:
-            if path.match(glob):
-                return lang
-    return None
+    # Configs from config.load_language_configs() come indexed; others are indexed per call
+    if not isinstance(languages, filters.LanguageIndex):
+        languages = filters.LanguageIndex(languages)
+    return languages.lookup(path)
+
+def configured_files(paths: List[Path], languages: List[LanguageConfig]) -> List[Path]:
+    """The existing files among `paths` that some language manages; others are dropped silently."""
+    return [
+        path for path in paths
+        if _get_language_for_file(path, languages) is not None and path.is_file() and not path.is_symlink()
+    ]
+
+
+def _names_path(header_line: str, rel_posix: str) -> bool:
+    return re.search(rf"(?<![\w./-]){re.escape(rel_posix)}(?![\w./-])", header_line) is not None
+
+
+def select_renamed(
+    renames: List[Tuple[Path, Path]],
+    context: RuntimeContext,
+    languages: List[LanguageConfig],
+    workers: int,
+) -> List[Path]:
+    """
+    The new paths among (old, new) `renames` whose header still names the
+    old path, i.e. went stale only because the file moved. Files whose
+    header was customised, or that have none, are left alone. Checked in
+    one parallel batch.
+    """
+    def stale_after_move(pair: Tuple[Path, Path]) -> Path | None:
+        old, new = pair
+        lang = _get_language_for_file(new, languages)
+        if lang is None or not new.is_file() or filters.is_excluded(new, context.root, context.excludes):
+            return None
+        try:
+            if new.stat().st_size > context.streaming_threshold:
+                lines = headerlogic.decode_lines(
+                    headerlogic.complete_lines(filesystem.read_file_head(new, STREAM_HEAD_BYTES))
+                )
+                analysis_mode = "line"
+            else:
+                lines = filesystem.read_file_lines(new)
+                analysis_mode = lang.analysis_mode
+        except (IOError, PermissionError) as e:
+            log.warning(f"Could not read {new}: {e}")
+            return None
+        analysis = headerlogic.analyze_header_state(
+            lines, "", lang.prefix, lang.check_encoding, analysis_mode, False
+        )
+        existing = analysis.existing_header_line
+        old_rel = old.relative_to(context.root).as_posix()
+        return new if existing is not None and _names_path(existing, old_rel) else None
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return [path for path in pool.map(stale_after_move, renames) if path is not None]
+
+
+def _load_history(context: RuntimeContext, languages: List[LanguageConfig], rev: str = "HEAD") -> None:
+    """Loads `context.history` (once) if some template uses history placeholders."""
+    if context.history is None and any(headerlogic.uses_history(lang.template) for lang in languages):
+        try:
+            context.history = git.file_history(context.root, rev)
+        except RuntimeError as e:
+            log.warning(f"No git history ({e}); history placeholders use the current year.")
+            context.history = {}
+
 
 def plan_files(
     context: RuntimeContext,
     files: List[Path] | None,
     languages: List[LanguageConfig],
     workers: int,
+    cache: dict | None = None,
+    executor: Executor | None = None,
 ) -> Tuple[Iterator[Tuple[PlanItem, dict | None]], int]:
     """
     Plan all actions to be taken. Returns an iterator of (PlanItem, cache_info).
     Does NOT handle UI/Progress.
+    `files=None` discovers files under the root; a list (even an empty one)
+    plans exactly those files.
+    A long-lived caller (the daemon) can pass its in-memory `cache` and a
+    warm `executor` instead of loading the cache file and starting threads.
     Returns: (iterator, total_files)
     """
+    _load_history(context, languages)
+
     use_cache = not context.override and not context.remove
-    cache = filesystem.load_cache(context.root) if use_cache else {}
+    if not use_cache:
+        cache = {}
+    elif cache is None:
+        cache = filesystem.load_cache(context.root)
 
     file_iterator_data = []
-    if files:
+    not_checked_out = []
+    sniffer = sniff.Sniffer(context.root, languages) if context.sniff else None
+    if files is not None:
         for path in files:
             lang = _get_language_for_file(path, languages)
+            if lang is None and sniffer is not None:
+                lang = sniffer.language_for(path)
             if lang:
                 file_iterator_data.append((path, lang, context))
             else:
                 log.warning(f"No language configuration found for file: {path}")
     else:
-        file_iterator_data = [
-            (path, lang, context)
-            for path, lang in filesystem.find_configured_files(context.root, languages)
-        ]
+        # Files git has not checked out are never stat'ed or read: in a
+        # partial clone, reading one could fetch it.
+        try:
+            sparse = git.skip_worktree_paths(context.root)
+        except RuntimeError:
+            sparse = set()  # Not a git work tree
+        discovered = filesystem.find_configured_files(context.root, languages)
+        if sniffer is not None:
+            discovered = itertools.chain(discovered, sniffer.find_scripts(context.excludes))
+        for path, lang in discovered:
+            rel_posix = path.relative_to(context.root).as_posix()
+            if rel_posix in sparse:
+                not_checked_out.append(PlanItem(path, rel_posix, "skip-excluded", reason=SKIP_WORKTREE_REASON, prefix=lang.prefix, check_encoding=lang.check_encoding, template=lang.template, analysis_mode=lang.analysis_mode, license_spdx=lang.license_spdx))
+            else:
+                file_iterator_data.append((path, lang, context))
+        if not_checked_out:
+            log.info(f"Skipping {len(not_checked_out)} files that are not checked out (sparse checkout).")
+    if sniffer is not None:
+        sniffer.save()
 
-    total_files = len(file_iterator_data)
+    total_files = len(file_iterator_data) + len(not_checked_out)
 
     # We return a generator so the caller can wrap it in progress bar
     def generator():
-        with ThreadPoolExecutor(max_workers=workers) as executor:
+        for item in not_checked_out:
+            yield item, None
+        if executor is not None:
+            yield from executor.map(lambda args: _analyze_single_file(args, cache), file_iterator_data)
+            return
+        with ThreadPoolExecutor(max_workers=workers) as pool:
             # map returns an iterator
-            results = executor.map(
+            results = pool.map(
                 lambda args: _analyze_single_file(args, cache),
                 file_iterator_data,
             )
@@ -151,3 +394,84 @@ def plan_files(
                 yield result
 
     return generator(), total_files
+
+
+def plan_blobs(
+    context: RuntimeContext,
+    entries: List[Tuple[str, str]],
+    languages: List[LanguageConfig],
+    workers: int,
+    executor: Executor | None = None,
+    reader: git.BlobReader | None = None,
+) -> Tuple[Iterator[Tuple[PlanItem, dict | None]], int]:
+    """
+    Plans (posix path, blob SHA) `entries` from git's object store instead
+    of the working tree. Blobs are read in order from one `git cat-file
+    --batch` process (the caller's `reader`, if given) and analysed on a
+    thread pool, with a bounded number in flight. Of a blob above the
+    streaming threshold only the head analysis needs is kept, unless the
+    whole content is hashed (`check_hash`, a "{hash}" template). Unmanaged paths are dropped; excluded ones are skipped
+    without being read. History placeholders use HEAD's history unless the
+    caller loaded `context.history` already.
+    Returns: (iterator, total_files)
+    """
+    _load_history(context, languages)
+    skipped = []
+    wanted = []
+    for rel_posix, sha in entries:
+        path = context.root / rel_posix
+        lang = _get_language_for_file(path, languages)
+        if lang is None:
+            continue
+        if filters.is_excluded(path, context.root, context.excludes) or not filters.within_depth(path, context.root, context.depth):
+            skipped.append(PlanItem(path, rel_posix, "skip-excluded", prefix=lang.prefix, check_encoding=lang.check_encoding, template=lang.template, analysis_mode=lang.analysis_mode, license_spdx=lang.license_spdx))
+        else:
+            wanted.append((rel_posix, sha, lang))
+
+    def generator():
+        for item in skipped:
+            yield item, None
+        if not wanted:
+            return
+        pool = executor or ThreadPoolExecutor(max_workers=workers)
+        blob_reader = reader or git.BlobReader(context.root)
+        whole = context.check_hash or any("{hash}" in lang.template for _, _, lang in wanted)
+        try:
+            pending = deque()
+            blobs = blob_reader.read(
+                [sha for _, sha, _ in wanted],
+                limit=None if whole else context.streaming_threshold,
+                head=max(STREAM_HEAD_BYTES, _generated_head_size(context)),
+            )
+            for (rel_posix, _, lang), (data, size) in zip(wanted, blobs):
+                pending.append(pool.submit(_analyze_blob, rel_posix, data, lang, context, size))
+                if len(pending) >= workers * 4:
+                    yield pending.popleft().result(), None
+            while pending:
+                yield pending.popleft().result(), None
+        finally:
+            if reader is None:
+                blob_reader.close()
+            if executor is None:
+                pool.shutdown()
+
+    return generator(), len(skipped) + len(wanted)
+
+
+def plan_revision(
+    context: RuntimeContext,
+    rev: str,
+    languages: List[LanguageConfig],
+    workers: int,
+    paths: List[str] | None = None,
+) -> Tuple[Iterator[Tuple[PlanItem, dict | None]], int]:
+    """
+    Like `plan_files`, but for the tree of commit `rev` instead of the
+    working tree: files are listed with `git ls-tree` and planned with
+    `plan_blobs`, never checked out. The items describe the revision, so
+    they can be reported but not applied.
+    Raises RuntimeError if `rev` cannot be read.
+    """
+    _load_history(context, languages, rev)
+    entries = [(rel_posix, sha) for rel_posix, sha, _ in git.tree_files(context.root, rev, paths)]
+    return plan_blobs(context, entries, languages, workers)
@@ -0,0 +1,185 @@
+# src/autoheader/prereceive.py
+
+from __future__ import annotations
+from pathlib import Path
+from typing import Dict, List, TextIO, Tuple
+import argparse
+import hashlib
+import json
+import logging
+import sys
+
+from . import filesystem
+from . import git
+from . import headerlogic
+from .constants import VERDICTS_FILE_NAME
+from .daemon import DaemonState
+from .models import PlanItem
+from .planner import plan_blobs
+
+log = logging.getLogger(__name__)
+
+_PASSING = ("skip-excluded", "skip-header-exists", "skip-empty", "skip-generated")
+
+
+def parse_updates(stream: TextIO) -> List[Tuple[str, str, str]]:
+    """(old, new, ref) per line of pre-receive input; ref deletions are dropped."""
+    updates = []
+    for line in stream:
+        fields = line.split()
+        if len(fields) != 3:
+            continue
+        old, new, ref = fields
+        if set(new) != {"0"}:
+            updates.append((old, new, ref))
+    return updates
+
+
+def pushed_blobs(root: Path, old: str, new: str) -> List[Tuple[str, str]]:
+    """
+    (path, blob SHA) for the files a ref update adds or changes. A new ref
+    has no old tip to compare with; the files of its tree whose blobs no
+    existing ref reaches are the pushed ones.
+    """
+    if set(old) == {"0"}:
+        objects = git.new_objects(root, new)
+        return [(rel_posix, sha) for rel_posix, sha, _ in git.tree_files(root, new) if sha in objects]
+    return git.changed_blobs(root, old, new)
+
+
+class VerdictStore:
+    """
+    Verdicts of past checks, keyed by blob SHA and path (the expected
+    header depends on the path), kept in the git directory. A verdict is
+    only valid for the configuration it was made under, so the file is
+    discarded when the configuration fingerprint changes.
+    """
+
+    def __init__(self, path: Path, fingerprint: str):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.verdicts: Dict[str, List[str]] = {}
+        try:
+            with path.open("r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict) and data.get("config") == fingerprint and isinstance(data.get("verdicts"), dict):
+                self.verdicts = data["verdicts"]
+        except (OSError, ValueError) as e:
+            if path.exists():
+                log.warning(f"Could not load verdicts: {e}")
+
+    @staticmethod
+    def key(rel_posix: str, sha: str) -> str:
+        return f"{sha}:{rel_posix}"
+
+    def save(self) -> None:
+        # Concurrent pushes run hooks side by side: never leave a torn file
+        data = json.dumps({"config": self.fingerprint, "verdicts": self.verdicts})
+        try:
+            filesystem.write_state_file(self.path, data.encode("utf-8"))
+        except OSError as e:
+            log.warning(f"Could not save verdicts: {e}")
+
+
+def _fingerprint(state: DaemonState) -> str:
+    config = repr((state.languages, sorted(state.excludes), sorted(state.general.items())))
+    return hashlib.sha256(config.encode("utf-8")).hexdigest()
+
+
+def check_updates(
+    state: DaemonState, updates: List[Tuple[str, str, str]], store: VerdictStore | None
+) -> List[Tuple[str, PlanItem]]:
+    """
+    (ref, item) for every pushed file that needs a header change. Each
+    (path, blob) is checked once across all refs, and all blobs are read
+    from one `git cat-file` process; known verdicts are not read at all.
+    Templates with git history placeholders depend on the
+    pushed commit, so they are checked per ref and never cached.
+    """
+    uses_history = any(headerlogic.uses_history(lang.template) for lang in state.languages)
+    failures: List[Tuple[str, PlanItem]] = []
+    seen: Dict[str, PlanItem | None] = {}
+
+    with git.BlobReader(state.root) as reader:
+        for old, new, ref in updates:
+            context = state.context()
+            if uses_history:
+                context.history = git.file_history(state.root, new)
+                seen = {}
+            entries = pushed_blobs(state.root, old, new)
+            todo = []
+            for rel_posix, sha in entries:
+                key = VerdictStore.key(rel_posix, sha)
+                if key in seen:
+                    continue
+                cached = store.verdicts.get(key) if store is not None and not uses_history else None
+                if cached is not None:
+                    action, reason = cached
+                    # Enough to report a failure; pushed files are never rewritten
+                    seen[key] = None if action in _PASSING else PlanItem(
+                        state.root / rel_posix, rel_posix, action, reason=reason, prefix="", check_encoding=False, template="", analysis_mode="line"
+                    )
+                else:
+                    todo.append((rel_posix, sha))
+            log.info(f"{ref}: {len(entries)} pushed files, {len(todo)} not checked before.")
+
+            # Items come back reordered and without unmanaged paths; paths are unique per tree
+            shas = dict(todo)
+            plan_generator, _ = plan_blobs(context, todo, state.languages, state.workers, state.executor, reader)
+            for item, _ in plan_generator:
+                key = VerdictStore.key(item.rel_posix, shas[item.rel_posix])
+                seen[key] = None if item.action in _PASSING else item
+                if store is not None and not uses_history:
+                    store.verdicts[key] = [item.action, item.reason]
+
+            for rel_posix, sha in entries:
+                item = seen.get(VerdictStore.key(rel_posix, sha))
+                if item is not None:
+                    failures.append((ref, item))
+    return failures
+
+
+def main(argv: List[str]) -> int:
+    """Entry point for `autoheader pre-receive [--root DIR] [--format sarif] [--workers N] [--no-cache]`."""
+    p = argparse.ArgumentParser(
+        prog="autoheader pre-receive",
+        description="Git pre-receive hook: reject pushes whose new or changed files need header changes. "
+        "Reads '<old> <new> <ref>' lines from stdin.",
+    )
+    p.add_argument("--root", type=Path, default=Path.cwd(), help="Repository (default: cwd, as git runs hooks).")
+    p.add_argument("--format", choices=["text", "sarif"], default="text", help="Rejection report format.")
+    p.add_argument("--workers", type=int, default=8, help="Threads analysing pushed files.")
+    p.add_argument("--no-cache", action="store_true", help=f"Neither read nor write {VERDICTS_FILE_NAME}.")
+    args = p.parse_args(argv)
+    root = args.root.resolve()
+    logging.basicConfig(level=logging.WARNING, format="%(message)s")
+
+    updates = parse_updates(sys.stdin)
+    if not updates:
+        return 0
+    store = None
+    try:
+        state = DaemonState(root, args.workers)
+        try:
+            if not args.no_cache:
+                git_dir = Path(git.run_git(root, "rev-parse", "--absolute-git-dir").decode("utf-8").strip())
+                store = VerdictStore(git_dir / VERDICTS_FILE_NAME, _fingerprint(state))
+            failures = check_updates(state, updates, store)
+        finally:
+            state.close()
+    except RuntimeError as e:
+        # Fail closed: a push that could not be checked is not accepted
+        print(f"autoheader: {e}", file=sys.stderr)
+        return 1
+    if store is not None:
+        store.save()
+
+    if args.format == "sarif":
+        from . import sarif
+        print(sarif.generate_sarif_report([item for _, item in failures], str(root)))
+    elif failures:
+        print("autoheader: push rejected, the following files require header changes:")
+        for ref, item in failures:
+            print(f"- {ref}: {item.rel_posix} (Action: {item.action})")
+        print("\nRun 'autoheader --no-dry-run' on these commits and push again.")
+    return 1 if failures else 0
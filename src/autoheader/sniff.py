@@ -0,0 +1,169 @@
+# src/autoheader/sniff.py
+
+from __future__ import annotations
+from pathlib import Path
+from typing import Dict, Iterator, List, Set, Tuple
+import hashlib
+import json
+import logging
+import os
+import re
+
+from . import filesystem
+from . import filters
+from .constants import CHECKPOINT_FILE_NAME, SNIFF_CACHE_FILE_NAME, SNIFF_HEAD_BYTES
+from .models import LanguageConfig
+
+log = logging.getLogger(__name__)
+
+# Shebangs and modelines are only looked for in the first few lines
+_HEAD_LINES = 5
+_VERSION_RX = re.compile(r"[\d.]+$")
+_EMACS_RX = re.compile(r"-\*-(.*?)-\*-")
+_VIM_RX = re.compile(r"\b(?:vi|vim|ex):.*?\b(?:ft|filetype|syntax)=([\w+-]+)")
+# PEP 263, on the first or second line
+_CODING_RX = re.compile(r"^[ \t\f]*#.*?coding[:=][ \t]*[-\w.]+")
+# autoheader's own state files are extensionless too
+_OWN_FILES = frozenset({SNIFF_CACHE_FILE_NAME, CHECKPOINT_FILE_NAME, ".autoheader_cache"})
+
+
+def shebang_interpreter(line: str) -> str | None:
+    """The interpreter a shebang runs ("python3" for "#!/usr/bin/env -S python3 -u"), else None."""
+    if not line.startswith("#!"):
+        return None
+    words = line[2:].split()
+    if words and os.path.basename(words[0]) == "env":
+        # Skip env's options and VAR=value assignments
+        words = [word for word in words[1:] if not word.startswith("-") and "=" not in word]
+    return os.path.basename(words[0]) if words else None
+
+
+def modeline_mode(line: str) -> str | None:
+    """The mode of an Emacs ("-*- mode: python -*-") or Vim ("vim: ft=sh") modeline, else None."""
+    match = _EMACS_RX.search(line)
+    if match:
+        body = match.group(1).strip()
+        if ":" not in body:
+            return body.lower() or None
+        for setting in body.split(";"):
+            key, _, value = setting.partition(":")
+            if key.strip().lower() == "mode":
+                return value.strip().lower() or None
+    match = _VIM_RX.search(line)
+    return match.group(1).lower() if match else None
+
+
+def is_candidate(path: Path) -> bool:
+    """Only extensionless files are sniffed ("bin/tool", ".bashrc"; not "notes.txt")."""
+    return not path.suffix
+
+
+class Sniffer:
+    """
+    Finds the language of extensionless files that no glob matches from
+    their first SNIFF_HEAD_BYTES: a shebang or modeline naming a language
+    (or one of its `interpreters`, version suffixes ignored), else a PEP 263
+    encoding cookie for the first check_encoding language. Verdicts are
+    kept in SNIFF_CACHE_FILE_NAME by (mtime, size), so later runs only
+    stat() the files sniffed before; they are discarded when the languages
+    change.
+    """
+
+    def __init__(self, root: Path, languages: List[LanguageConfig]):
+        self.root = root
+        self.index = languages if isinstance(languages, filters.LanguageIndex) else filters.LanguageIndex(languages)
+        self.by_alias: Dict[str, LanguageConfig] = {}
+        for lang in languages:
+            for alias in [lang.name, *lang.interpreters]:
+                self.by_alias.setdefault(alias.lower(), lang)
+        self.by_name = {lang.name: lang for lang in languages}
+        self.cookie_lang = next((lang for lang in languages if lang.check_encoding), None)
+        rules = repr((sorted((alias, lang.name) for alias, lang in self.by_alias.items()), self.cookie_lang and self.cookie_lang.name))
+        self.fingerprint = hashlib.sha256(rules.encode("utf-8")).hexdigest()
+        self.path = root / SNIFF_CACHE_FILE_NAME
+        self.verdicts: Dict[str, list] = {}  # rel_posix -> [mtime_ns, size, language name or None]
+        self._dirty = False
+        try:
+            with self.path.open("r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("rules") == self.fingerprint:
+                self.verdicts = data["files"]
+        except (OSError, ValueError, KeyError) as e:
+            if self.path.exists():
+                log.warning(f"Could not load sniff cache: {e}")
+
+    def _lookup(self, name: str) -> LanguageConfig | None:
+        name = name.lower()
+        return self.by_alias.get(name) or self.by_alias.get(_VERSION_RX.sub("", name))
+
+    def classify(self, head: bytes) -> LanguageConfig | None:
+        """The language `head` (the start of a file) declares, or None."""
+        if b"\0" in head:
+            return None  # Binary
+        lines = head.decode("utf-8", "replace").splitlines()[:_HEAD_LINES]
+        if not lines:
+            return None
+        names = [shebang_interpreter(lines[0])] + [modeline_mode(line) for line in lines]
+        for name in names:
+            lang = self._lookup(name) if name is not None else None
+            if lang is not None:
+                return lang
+        if self.cookie_lang is not None and any(_CODING_RX.match(line) for line in lines[:2]):
+            return self.cookie_lang
+        return None
+
+    def language_for(self, path: Path) -> LanguageConfig | None:
+        """The sniffed language of an extensionless file, from the cache while it is unchanged."""
+        if not is_candidate(path) or path.name in _OWN_FILES:
+            return None
+        try:
+            rel_posix = path.relative_to(self.root).as_posix()
+            st = path.stat()
+        except (OSError, ValueError):
+            return None
+        fingerprint = [st.st_mtime_ns, st.st_size]
+        cached = self.verdicts.get(rel_posix)
+        if cached is not None and cached[:2] == fingerprint:
+            return self.by_name.get(cached[2]) if cached[2] else None
+        lang = self.classify(filesystem.read_file_head(path, SNIFF_HEAD_BYTES))
+        self.verdicts[rel_posix] = [*fingerprint, lang.name if lang else None]
+        self._dirty = True
+        return lang
+
+    def find_scripts(self, excludes: List[str]) -> Iterator[Tuple[Path, LanguageConfig]]:
+        """
+        (path, language) for every extensionless file below the root that no
+        glob matches and that sniffs as a language. Excluded directories
+        are not walked; verdicts of files that are gone are dropped.
+        """
+        seen: Set[str] = set()
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            current = Path(dirpath)
+            dirnames[:] = [
+                d for d in dirnames
+                if not filters.is_excluded_dir(current / d, self.root, excludes) and not (current / d).is_symlink()
+            ]
+            for name in filenames:
+                path = current / name
+                if not is_candidate(path) or name in _OWN_FILES or path.is_symlink() or self.index.lookup(path) is not None:
+                    continue
+                seen.add(path.relative_to(self.root).as_posix())
+                lang = self.language_for(path)
+                if lang is not None:
+                    yield path, lang
+        gone = self.verdicts.keys() - seen
+        if gone:
+            for rel_posix in gone:
+                del self.verdicts[rel_posix]
+            self._dirty = True
+
+    def save(self) -> None:
+        """Writes the verdicts back if any changed."""
+        if not self._dirty:
+            return
+        try:
+            with self.path.open("w", encoding="utf-8") as f:
+                json.dump({"rules": self.fingerprint, "files": self.verdicts}, f)
+            self._dirty = False
+        except OSError as e:
+            log.warning(f"Could not save sniff cache: {e}")
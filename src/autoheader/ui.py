@@ -1,13 +1,90 @@
 # src/autoheader/ui.py
 
 from __future__ import annotations
+from contextlib import nullcontext
+from typing import Iterable, List, Mapping, TypeVar
 import logging
-from rich.console import Console
+import re
+import sys
 
 log = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+# Rich markup tags ("[green]", "[/bold red]"); a backslash escapes one
+_MARKUP_TAG = re.compile(r"(\\)?\[([a-z#/@][^\[]*?)\]")
+
+
+def strip_markup(text: str) -> str:
+    """Returns `text` as rich would display it, without styles."""
+    return _MARKUP_TAG.sub(lambda m: f"[{m.group(2)}]" if m.group(1) else "", text)
+
+
+class CliConsole:
+    """
+    The console all CLI output goes through. Renders with rich on an
+    interactive terminal; when `plain` (non-TTY stdout, or set by cli.py for
+    --quiet/--check/SARIF), it strips markup and writes text directly, so
+    hooks and CI runs never import rich.
+    """
+
+    def __init__(self) -> None:
+        self.quiet = False
+        self.no_color = False
+        # None: decide by whether stdout is a terminal, at print time
+        self.plain: bool | None = None
+        self._rich = None
+
+    @property
+    def is_plain(self) -> bool:
+        if self.plain is not None:
+            return self.plain
+        return not sys.stdout.isatty()
+
+    @property
+    def rich(self):
+        """The rich Console, created on first use."""
+        if self._rich is None:
+            from rich.console import Console
+            self._rich = Console(force_terminal=True)
+        self._rich.quiet = self.quiet
+        self._rich.no_color = self.no_color
+        return self._rich
+
+    def print(self, *objects, file=None, **kwargs) -> None:
+        if not self.is_plain:
+            if file is not None:
+                kwargs["file"] = file  # Only rich renders to another stream
+            self.rich.print(*objects, **kwargs)
+            return
+        if self.quiet:
+            return
+        text = " ".join(strip_markup(o) if isinstance(o, str) else str(o) for o in objects)
+        (file or sys.stdout).write(text + "\n")
+
+    def input(self, prompt: str = "") -> str:
+        if not self.is_plain:
+            return self.rich.input(prompt)
+        return input(strip_markup(prompt))
+
+    def status(self, message: str):
+        if self.is_plain or self.quiet:
+            return nullcontext()
+        return self.rich.status(message)
+
+
 # This console will be reconfigured by cli.py after args are parsed
-console = Console(force_terminal=True)
+console = CliConsole()
+
+
+def track(sequence: Iterable[T], description: str, total: int | None = None) -> Iterable[T]:
+    """Wraps `sequence` in a transient progress bar on interactive output."""
+    if console.is_plain or console.quiet:
+        return sequence
+    from rich.progress import track as rich_track
+    return rich_track(
+        sequence, description=description, console=console.rich, transient=True, total=total
+    )
 
 # --- NEW: Rich Formatting ---
 
@@ -18,6 +95,7 @@ EMOJI_MAP = {
     "SKIP": "🔵",
     "SKIP_EXCLUDED": "⚫",
     "SKIP_CACHED": "⚡️",
+    "RESTORE": "↩️",
     "ERROR": "🔥",
 }
 
@@ -28,6 +106,7 @@ STYLE_MAP = {
     "SKIP": "cyan",
     "SKIP_EXCLUDED": "bright_black",
     "SKIP_CACHED": "blue",
+    "RESTORE": "magenta",
     "ERROR": "bold red",
     "DRY_RUN": "bright_black",
 }
@@ -60,21 +139,48 @@ def format_error(rel_path: str, err: Exception, no_emoji: bool) -> str:
     return f"{prefix}{action_styled} Failed to process {rel_path}: {err}"
 
 
-def format_summary(
-    added: int, overridden: int, removed: int,
-    skipped_ok: int, skipped_excluded: int
-) -> str:
-    """Formats the final summary line."""
-    parts = [
+def _summary_parts(
+    added: int, overridden: int, removed: int, skipped_ok: int, skipped_excluded: int
+) -> List[str]:
+    return [
         f"[{STYLE_MAP['ADD']}]added={added}[/{STYLE_MAP['ADD']}]",
         f"[{STYLE_MAP['OVERRIDE']}]overridden={overridden}[/{STYLE_MAP['OVERRIDE']}]",
         f"[{STYLE_MAP['REMOVE']}]removed={removed}[/{STYLE_MAP['REMOVE']}]",
         f"[{STYLE_MAP['SKIP']}]skipped_ok={skipped_ok}[/{STYLE_MAP['SKIP']}]",
         f"[{STYLE_MAP['SKIP_EXCLUDED']}]skipped_excluded={skipped_excluded}[/{STYLE_MAP['SKIP_EXCLUDED']}]",
     ]
+
+
+def format_summary(
+    added: int, overridden: int, removed: int,
+    skipped_ok: int, skipped_excluded: int, skipped_sparse: int = 0, skipped_generated: int = 0
+) -> str:
+    """Formats the final summary line."""
+    parts = _summary_parts(added, overridden, removed, skipped_ok, skipped_excluded)
+    if skipped_sparse:
+        # Files a sparse checkout leaves out; also counted in skipped_excluded
+        parts.append(f"[{STYLE_MAP['SKIP_EXCLUDED']}]not_checked_out={skipped_sparse}[/{STYLE_MAP['SKIP_EXCLUDED']}]")
+    if skipped_generated:
+        parts.append(f"[{STYLE_MAP['SKIP_EXCLUDED']}]skipped_generated={skipped_generated}[/{STYLE_MAP['SKIP_EXCLUDED']}]")
     return f"\nSummary: {', '.join(parts)}."
 
 
+def format_package_summary(name: str, counts: Mapping[str, int]) -> str:
+    """Formats one package's line of a workspace run, from counts per action."""
+    parts = _summary_parts(
+        counts.get("add", 0),
+        counts.get("override", 0),
+        counts.get("remove", 0),
+        counts.get("skip-header-exists", 0),
+        counts.get("skip-excluded", 0),
+    )
+    if counts.get("skip-generated"):
+        parts.append(f"[{STYLE_MAP['SKIP_EXCLUDED']}]skipped_generated={counts['skip-generated']}[/{STYLE_MAP['SKIP_EXCLUDED']}]")
+    if counts.get("error"):
+        parts.append(f"[{STYLE_MAP['ERROR']}]errors={counts['error']}[/{STYLE_MAP['ERROR']}]")
+    return f"  [bold]{name}[/bold]: {', '.join(parts)}"
+
+
 def format_dry_run_note() -> str:
     """Formats the dry-run note."""
     return f"[{STYLE_MAP['DRY_RUN']}]NOTE: this was a dry run. Use --no-dry-run to apply changes.[/{STYLE_MAP['DRY_RUN']}]"
@@ -95,7 +201,7 @@ def confirm_continue(auto_yes: bool = False) -> bool:
             resp = (
                 console.input(
                     "[yellow]autoheader: Could not confidently detect project root.\n"
-                    "Are you sure you want to continue? [/yellow][white][y/N]: [/white]"
+                    "Are you sure you want to continue? [/yellow][white]\\[y/N]: [/white]"
                 )
                 .strip()
                 .lower()
@@ -114,33 +220,37 @@ def confirm_continue(auto_yes: bool = False) -> bool:
 
 def show_header_diff(path: str, old_header: str | None, new_header: str) -> None:
     """Displays a rich diff for header changes."""
-    from rich.panel import Panel
-    from rich.text import Text
-
     if old_header:
         title = f"Header diff for [bold]{path}[/bold]"
-        content = Text.from_markup(f"- [red]{old_header}[/red]\n+ [green]{new_header}[/green]")
+        markup = f"- [red]{old_header}[/red]\n+ [green]{new_header}[/green]"
     else:
         title = f"Header to be added to [bold]{path}[/bold]"
-        content = Text.from_markup(f"+ [green]{new_header}[/green]")
+        markup = f"+ [green]{new_header}[/green]"
+
+    if console.is_plain:
+        console.print(f"{title}\n{markup}")
+        return
+
+    from rich.panel import Panel
+    from rich.text import Text
 
-    console.print(Panel(content, title=title, border_style="dim"))
+    console.print(Panel(Text.from_markup(markup), title=title, border_style="dim"))
 
 
 def confirm_no_dry_run(needs_backup_warning: bool) -> bool:
     """
     Ask user to confirm a --no-dry-run operation.
-    Warns if --backup is not present.
+    Warns if the run can be neither undone nor restored from backups.
     """
     prompt = (
         "[yellow]autoheader: You are about to apply changes directly to files (--no-dry-run).\n"
     )
     if needs_backup_warning:
         prompt += (
-            "WARNING: For safety, running with --backup is recommended, but it is not enabled.\n"
+            "WARNING: For safety, keep the undo journal or use --backup; neither is enabled.\n"
         )
 
-    prompt += "[/yellow][white]Are you sure you want to continue? [y/N]: [/white]"
+    prompt += "[/yellow][white]Are you sure you want to continue? \\[y/N]: [/white]"
 
     while True:
         try:
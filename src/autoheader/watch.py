@@ -0,0 +1,387 @@
+# src/autoheader/watch.py
+
+from __future__ import annotations
+from pathlib import Path
+from typing import Dict, Iterator, List, Set, Tuple
+import argparse
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import select
+import struct
+import threading
+import time
+
+from . import filesystem
+from . import filters
+from . import journal
+from . import ui
+from .constants import WATCH_DEBOUNCE_SECONDS, WATCH_MAX_DELAY_SECONDS
+from .core import write_with_header
+from .daemon import DaemonState
+from .models import PlanItem
+from .planner import configured_files, plan_files, select_renamed, _get_language_for_file
+
+log = logging.getLogger(__name__)
+
+# <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+# Files are picked up once closed after writing or moved in; IN_CREATE is
+# only needed to start watching new directories.
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_ONLYDIR
+
+_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len; then the name
+
+
+class Inotify:
+    """Minimal inotify(7) binding over libc, via ctypes."""
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError(errno.ENOSYS, "inotify is not available on this platform")
+        self._libc = libc
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+    def add_watch(self, path: Path, mask: int = WATCH_MASK) -> int:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), ctypes.c_uint32(mask))
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), str(path))
+        return wd
+
+    def rm_watch(self, wd: int) -> None:
+        self._libc.inotify_rm_watch(self.fd, wd)  # Fails harmlessly if already gone
+
+    def read(self, timeout: float | None) -> Iterator[Tuple[int, int, int, str]]:
+        """Yields (wd, mask, cookie, name) for events arriving within `timeout`."""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                return
+            offset = 0
+            while offset < len(data):
+                wd, mask, cookie, length = _EVENT.unpack_from(data, offset)
+                offset += _EVENT.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+                offset += length
+                yield wd, mask, cookie, name
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class Watcher:
+    """
+    Keeps headers correct as files change. Every non-excluded directory
+    under the root is watched; touched paths are collected until the tree
+    is quiet for `debounce` seconds, then only those paths are re-planned
+    and written. Renamed files (and files under renamed directories) whose
+    header still names the old path are planned with override, so it
+    follows the move; a customised header is left alone.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        workers: int = 8,
+        debounce: float = WATCH_DEBOUNCE_SECONDS,
+        dry_run: bool = False,
+    ):
+        self.root = root
+        self.debounce = debounce
+        self.dry_run = dry_run
+        self.state = DaemonState(root, workers)
+        self.inotify = Inotify()
+        self._dirs: Dict[int, Path] = {}
+        self._pending: Set[Path] = set()
+        self._renamed: Dict[Path, Path] = {}  # new path -> old path
+        self._moved_from: Dict[int, Tuple[Path, bool]] = {}
+        self._first_pending: float | None = None
+        self._rescan = False
+        # path -> mtime of our own last write, so its events are ignored
+        self._written: Dict[Path, float] = {}
+        # One journal for the whole session, opened on the first write: a
+        # journal per batch would prune the journals of real runs away
+        self._journal: journal.RunJournal | None = None
+        self._watch_tree(root)
+
+    # --- Watches ---
+
+    def _watch_tree(self, top: Path) -> List[Path]:
+        """Watches `top` and its non-excluded subdirectories; returns the files found."""
+        found = []
+        for dirpath, dirnames, filenames in os.walk(top):
+            directory = Path(dirpath)
+            try:
+                self._dirs[self.inotify.add_watch(directory)] = directory
+            except OSError as e:
+                log.warning(f"Cannot watch {directory}: {e}")
+            dirnames[:] = [d for d in dirnames if self._is_watched_dir(directory / d)]
+            found.extend(directory / name for name in filenames)
+        return found
+
+    def _is_watched_dir(self, directory: Path) -> bool:
+        return not directory.is_symlink() and not filters.is_excluded_dir(directory, self.root, self.state.excludes)
+
+    def _move_watches(self, old: Path, new: Path) -> None:
+        for wd, directory in list(self._dirs.items()):
+            if directory == old or old in directory.parents:
+                self._dirs[wd] = new / directory.relative_to(old)
+
+    def _unwatch_tree(self, top: Path) -> None:
+        for wd, directory in list(self._dirs.items()):
+            if directory == top or top in directory.parents:
+                self.inotify.rm_watch(wd)
+                del self._dirs[wd]
+
+    # --- Events ---
+
+    def _touch(self, path: Path, renamed_from: Path | None = None) -> None:
+        if renamed_from is not None:
+            self._renamed[path] = renamed_from
+        else:
+            self._pending.add(path)
+        if self._first_pending is None:
+            self._first_pending = time.monotonic()
+
+    def _is_managed(self, path: Path) -> bool:
+        return (
+            _get_language_for_file(path, self.state.languages) is not None
+            and not filters.is_excluded(path, self.root, self.state.excludes)
+        )
+
+    def handle_event(self, wd: int, mask: int, cookie: int, name: str) -> None:
+        if mask & IN_Q_OVERFLOW:
+            log.warning("Event queue overflowed; rescanning the whole tree.")
+            self._rescan = True
+            self._touch(self.root)
+            return
+        if mask & IN_IGNORED:
+            self._dirs.pop(wd, None)
+            return
+        directory = self._dirs.get(wd)
+        if directory is None or not name:
+            return
+        path = directory / name
+        is_dir = bool(mask & IN_ISDIR)
+
+        if mask & IN_MOVED_FROM:
+            self._moved_from[cookie] = (path, is_dir)
+        elif mask & IN_MOVED_TO:
+            source = self._moved_from.pop(cookie, None)
+            if is_dir:
+                if source is not None and not self._is_watched_dir(path):
+                    self._unwatch_tree(source[0])  # Renamed to an excluded name
+                elif source is not None:
+                    self._move_watches(source[0], path)
+                    for file in self._files_under(path):
+                        self._touch(file, renamed_from=source[0] / file.relative_to(path))
+                elif self._is_watched_dir(path):  # Moved in from outside the tree
+                    for file in self._watch_tree(path):
+                        self._touch(file)
+            else:
+                # Only a managed file moving counts as a rename; editors
+                # saving through a temp file look like a move too.
+                renamed = source is not None and self._is_managed(source[0])
+                self._touch(path, renamed_from=source[0] if renamed else None)
+        elif is_dir and mask & IN_CREATE:
+            if self._is_watched_dir(path):
+                # Files may land before the watch does; pick them up now
+                for file in self._watch_tree(path):
+                    self._touch(file)
+        elif mask & IN_CLOSE_WRITE and not is_dir:
+            self._touch(path)
+
+    def _files_under(self, top: Path) -> List[Path]:
+        found = []
+        for dirpath, dirnames, filenames in os.walk(top):
+            dirnames[:] = [d for d in dirnames if self._is_watched_dir(Path(dirpath) / d)]
+            found.extend(Path(dirpath) / name for name in filenames)
+        return found
+
+    def _end_of_burst(self) -> None:
+        # A move whose other half never came went out of the tree
+        for path, is_dir in self._moved_from.values():
+            if is_dir:
+                self._unwatch_tree(path)
+        self._moved_from.clear()
+
+    @property
+    def has_pending(self) -> bool:
+        return self._first_pending is not None
+
+    # --- Planning and writing ---
+
+    def _is_own_write(self, path: Path) -> bool:
+        written = self._written.get(path)
+        if written is None:
+            return False
+        try:
+            return path.stat().st_mtime == written
+        except OSError:
+            return False
+
+    def _candidates(self, paths: Set[Path]) -> List[Path]:
+        return [
+            path for path in configured_files(sorted(paths), self.state.languages)
+            if not self._is_own_write(path)
+        ]
+
+    def flush(self) -> List[Tuple[str, str]]:
+        """Plans and writes everything touched since the last flush; returns (rel, action) pairs."""
+        self._end_of_burst()
+        self.state.reload_if_changed()
+        moves = dict(self._renamed)
+        renamed = self._candidates(set(moves))
+        pending = self._candidates(self._pending - set(moves))
+        rescan = self._rescan
+        self._pending.clear()
+        self._renamed.clear()
+        self._first_pending = None
+        self._rescan = False
+
+        general = self.state.general
+        remove = general.get("remove", False)
+        stale: Set[Path] = set()
+        if renamed and not remove:
+            # Only headers that still name the old path are rewritten, as
+            # with --renames; the rest are planned like any other change
+            pairs = [(moves[path], path) for path in renamed]
+            stale = set(select_renamed(pairs, self.state.context(), self.state.languages, self.state.workers))
+        pending += [path for path in renamed if path not in stale]
+        items: List[PlanItem] = []
+        batches = [(None if rescan else pending, general.get("override", False)), (sorted(stale), not remove)]
+        for files, override in batches:
+            context = self.state.context(override=override, remove=remove)
+            plan_generator, _ = plan_files(
+                context,
+                files=files,
+                languages=self.state.languages,
+                workers=self.state.workers,
+                cache=self.state.cache,
+                executor=self.state.executor,
+            )
+            for item, cache_info in plan_generator:
+                if cache_info and item.action == "skip-header-exists":
+                    rel_posix, entry = cache_info
+                    self.state.cache[rel_posix] = entry
+                elif item.action not in ("skip-excluded", "skip-header-exists", "skip-empty", "skip-generated"):
+                    items.append(item)
+            self.state.history = context.history
+        return self._apply(items)
+
+    def _apply(self, items: List[PlanItem]) -> List[Tuple[str, str]]:
+        if not items:
+            return []
+        general = self.state.general
+        cache_hash = self.state.context().cache_hash_algorithm
+        if self._journal is None and not self.dry_run and general.get("journal", True):
+            try:
+                self._journal = journal.RunJournal(self.root, hash_algorithm=cache_hash)
+            except OSError as e:
+                log.warning(f"Could not open run journal, these changes cannot be undone: {e}")
+        fsync_policy = filesystem.FsyncPolicy(general.get("fsync", "none"))
+
+        futures = [
+            (item, self.state.executor.submit(
+                write_with_header,
+                item,
+                backup=general.get("backup", False),
+                dry_run=self.dry_run,
+                blank_lines_after=general.get("blank_lines_after", 1),
+                cache_hash_algorithm=cache_hash,
+                fsync=fsync_policy,
+                journal=self._journal,
+            ))
+            for item in items
+        ]
+        done = []
+        for item, future in futures:
+            try:
+                action, new_mtime, new_hash, _ = future.result()
+            except Exception as e:
+                ui.console.print(ui.format_error(item.rel_posix, e, False))
+                continue
+            self._written[item.path] = new_mtime
+            self.state.cache[item.rel_posix] = {"mtime": new_mtime, "hash": new_hash}
+            done.append((item.rel_posix, action))
+            prefix = "DRY " if self.dry_run else ""
+            ui.console.print(ui.format_action(f"{prefix}{action.upper()}", item.rel_posix, False, self.dry_run))
+        if not self.dry_run:
+            fsync_policy.commit(self.state.workers)
+        return done
+
+    # --- Loop ---
+
+    def poll(self, timeout: float | None) -> bool:
+        """Handles events arriving within `timeout`; returns whether there were any."""
+        got = False
+        for event in self.inotify.read(timeout):
+            self.handle_event(*event)
+            got = True
+        return got
+
+    def run(self, stop: threading.Event | None = None) -> None:
+        while stop is None or not stop.is_set():
+            got = self.poll(self.debounce if self.has_pending else 0.5)
+            if not self.has_pending:
+                continue
+            waited = time.monotonic() - self._first_pending
+            if not got or waited >= WATCH_MAX_DELAY_SECONDS:
+                self.flush()
+
+    def close(self) -> None:
+        if not self.dry_run:
+            filesystem.save_cache(self.root, self.state.cache)
+        if self._journal is not None and self._journal.close():
+            log.info(f"Watch session journaled as run {self._journal.run_id}.")
+        self.inotify.close()
+        self.state.close()
+
+
+def main(argv: List[str]) -> int:
+    """Entry point for `autoheader watch [--root DIR] [--workers N] [--debounce S] [--dry-run]`."""
+    p = argparse.ArgumentParser(prog="autoheader watch", description="Keep headers correct as files change.")
+    p.add_argument("--root", type=Path, default=Path.cwd(), help="Root directory (default: cwd).")
+    p.add_argument("--workers", type=int, default=8, help="Number of worker threads.")
+    p.add_argument(
+        "--debounce", type=float, default=WATCH_DEBOUNCE_SECONDS,
+        help="Seconds the tree must be quiet before a batch is processed.",
+    )
+    p.add_argument("--dry-run", action="store_true", help="Report what would change without writing.")
+    args = p.parse_args(argv)
+    root = args.root.resolve()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    try:
+        watcher = Watcher(root, args.workers, args.debounce, args.dry_run)
+    except OSError as e:
+        log.error(f"Cannot watch {root}: {e}")
+        return 1
+    ui.console.print(f"Watching [bold]{root}[/bold] ({len(watcher._dirs)} directories). Press Ctrl-C to stop.")
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+    return 0
@@ -0,0 +1,197 @@
+# src/autoheader/workspace.py
+
+from __future__ import annotations
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
+import logging
+import os
+
+from . import config
+from . import filesystem
+from . import filters
+from . import git
+from .constants import CONFIG_FILE_NAME, DEFAULT_EXCLUDES, SKIP_WORKTREE_REASON
+from .models import LanguageConfig, PlanItem, RuntimeContext
+from .planner import _analyze_single_file, _get_language_for_file, _load_history
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class Package:
+    """A directory with its own autoheader.toml; headers name paths relative to it."""
+    name: str  # Posix path relative to the workspace root, "." for the root itself
+    languages: List[LanguageConfig]
+    context: RuntimeContext
+    cache: dict = field(default_factory=dict)
+
+    def to_package_path(self, rel_posix: str) -> str:
+        return rel_posix if self.name == "." else rel_posix[len(self.name) + 1:]
+
+    def to_workspace_path(self, rel_posix: str) -> str:
+        return rel_posix if self.name == "." else f"{self.name}/{rel_posix}"
+
+
+class ConfigTrie:
+    """
+    Maps directories (as path parts relative to the workspace root) to the
+    package whose config applies there: the nearest one at or above it.
+    """
+
+    def __init__(self, root_package: Package):
+        self._node: dict = {None: root_package}
+
+    def insert(self, parts: Tuple[str, ...], package: Package) -> None:
+        node = self._node
+        for part in parts:
+            node = node.setdefault(part, {})
+        node[None] = package
+
+    def lookup(self, parts: Tuple[str, ...]) -> Package:
+        node = self._node
+        package = node[None]
+        for part in parts:
+            node = node.get(part)
+            if node is None:
+                break
+            package = node.get(None, package)
+        return package
+
+
+def _walk(root: Path, excludes: List[str]) -> Tuple[List[str], List[Path]]:
+    """
+    One walk of the workspace: (directories holding a config, as posix
+    paths relative to root; all files). Excluded directories are pruned.
+    """
+    config_dirs = []
+    files = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        current = Path(dirpath)
+        dirnames[:] = sorted(
+            d for d in dirnames
+            if not filters.is_excluded_dir(current / d, root, excludes) and not (current / d).is_symlink()
+        )
+        if CONFIG_FILE_NAME in filenames and current != root:
+            config_dirs.append(current.relative_to(root).as_posix())
+        files.extend(current / name for name in filenames)
+    return config_dirs, files
+
+
+def _split(mapping: Dict[str, object], workspace: "Workspace") -> Dict[str, Dict[str, object]]:
+    """Splits a workspace-keyed mapping by package, re-keyed relative to each package, in one pass."""
+    parts: Dict[str, Dict[str, object]] = {package.name: {} for package in workspace.packages}
+    for rel_posix, value in mapping.items():
+        package = workspace.package_of(rel_posix)
+        parts[package.name][package.to_package_path(rel_posix)] = value
+    return parts
+
+
+class Workspace:
+    """
+    Every package of a monorepo, found in a single walk: the root plus each
+    directory below it with its own autoheader.toml. A package's config
+    supplies its languages (templates, licenses, owners), excludes and
+    depth; run options come from the command line and the root config.
+    """
+
+    def __init__(self, context: RuntimeContext, languages: List[LanguageConfig]):
+        self.root = context.root
+        root_package = Package(".", languages, context)
+        self.trie = ConfigTrie(root_package)
+        self.packages = [root_package]
+        config_dirs, self._files = _walk(self.root, context.excludes)
+        for name in config_dirs:
+            package_root = self.root / name
+            toml_data, _ = config.load_config_data(package_root, None, context.timeout)
+            general = config.load_general_config(toml_data)
+            package = Package(
+                name,
+                config.load_language_configs(toml_data, general),
+                replace(
+                    context,
+                    root=package_root,
+                    excludes=list(DEFAULT_EXCLUDES)
+                    + filesystem.load_gitignore_patterns(package_root)
+                    + list(general.get("exclude", [])),
+                    depth=general.get("depth", context.depth),
+                    resume={},
+                    history=None,
+                ),
+            )
+            self.trie.insert(tuple(name.split("/")), package)
+            self.packages.append(package)
+        log.info(f"Workspace has {len(self.packages)} packages.")
+
+    def package_of(self, rel_posix: str) -> Package:
+        return self.trie.lookup(tuple(rel_posix.split("/")[:-1]))
+
+    def plan(
+        self, workers: int, cache: dict
+    ) -> Tuple[Iterator[Tuple[PlanItem, Tuple[str, dict] | None]], int]:
+        """
+        Plans every package's files on one shared pool. `cache` and the
+        results are keyed by workspace-relative path; items carry the
+        package-relative path their header names in `header_path`.
+        Returns: (iterator, total_files)
+        """
+        # Loaded once for the whole workspace, then handed out per package
+        root_context = self.packages[0].context
+        _load_history(root_context, [lang for p in self.packages for lang in p.languages])
+        caches = _split(cache, self)
+        resume = _split(root_context.resume, self)
+        history = _split(root_context.history, self) if root_context.history is not None else None
+        for package in self.packages:
+            package.cache = caches[package.name]
+            package.context.resume = resume[package.name]
+            if history is not None:
+                package.context.history = history[package.name]
+
+        try:
+            not_checked_out = git.skip_worktree_paths(self.root)
+        except RuntimeError:
+            not_checked_out = set()  # Not a git work tree
+        skipped = []
+        work = []
+        for path in self._files:
+            rel_posix = path.relative_to(self.root).as_posix()
+            package = self.package_of(rel_posix)
+            lang = _get_language_for_file(path, package.languages)
+            if lang is None or path.is_symlink():
+                continue
+            if rel_posix in not_checked_out:
+                skipped.append(PlanItem(path, rel_posix, "skip-excluded", reason=SKIP_WORKTREE_REASON, prefix=lang.prefix, check_encoding=lang.check_encoding, template=lang.template, analysis_mode=lang.analysis_mode, license_spdx=lang.license_spdx))
+            else:
+                work.append((path, lang, package))
+
+        def analyze(entry: Tuple[Path, LanguageConfig, Package]) -> Tuple[PlanItem, Tuple[str, dict] | None]:
+            path, lang, package = entry
+            item, cache_info = _analyze_single_file((path, lang, package.context), package.cache)
+            if package.name == ".":
+                return item, cache_info
+            item = replace(item, rel_posix=package.to_workspace_path(item.rel_posix), header_path=item.rel_posix)
+            if cache_info is not None:
+                cache_info = (item.rel_posix, cache_info[1])
+            return item, cache_info
+
+        def generator():
+            for item in skipped:
+                yield item, None
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                yield from pool.map(analyze, work)
+
+        return generator(), len(skipped) + len(work)
+
+    def summaries(self, plan: List[PlanItem], done: Dict[str, str]) -> List[Tuple[str, Counter]]:
+        """
+        (package name, counts) for each package with files, in package
+        order. Counts use the executed action from `done` when there is
+        one, else the planned action.
+        """
+        counts: Dict[str, Counter] = {}
+        for item in plan:
+            action = done.get(item.rel_posix, item.action)
+            counts.setdefault(self.package_of(item.rel_posix).name, Counter())[action] += 1
+        return [(p.name, counts[p.name]) for p in self.packages if p.name in counts]
@@ -0,0 +1,54 @@
+# tests/e2e/test_startup.py
+
+from pathlib import Path
+import os
+import subprocess
+import sys
+
+SRC = Path(__file__).resolve().parents[2] / "src"
+
+# Generous for slow CI machines; importing rich and package metadata
+# eagerly used to cost about twice the current total.
+STARTUP_BUDGET_US = 250_000
+
+# Must not be imported just to start the CLI
+HEAVY_MODULES = ("rich", "rich_argparse", "urllib.request", "importlib.metadata", "autoheader.api", "autoheader.banner")
+
+
+def _python(*args: str) -> subprocess.CompletedProcess:
+    env = dict(os.environ, PYTHONPATH=str(SRC))
+    return subprocess.run([sys.executable, *args], env=env, capture_output=True, text=True, check=True)
+
+
+def test_cli_import_time():
+    result = _python("-X", "importtime", "-c", "import autoheader.cli")
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            timings[name.strip()] = int(cumulative)
+
+    assert not [name for name in timings if name.split(".")[0] in HEAVY_MODULES or name in HEAVY_MODULES]
+    assert timings["autoheader.cli"] < STARTUP_BUDGET_US
+
+
+def test_launcher_defers_the_runtime():
+    """The daemon fast path and subcommands run before any of these load."""
+    deferred = ("argparse", "logging", "concurrent.futures", "autoheader.cli", "autoheader.planner", "autoheader.core", "autoheader.git")
+    out = _python("-c", f"import sys, autoheader.launcher; print([m for m in {deferred!r} if m in sys.modules])").stdout
+    assert out.strip() == "[]"
+
+
+def test_check_never_imports_rich(populated_project: Path):
+    script = (
+        "import sys\n"
+        "from autoheader.cli import main\n"
+        f"code = main(['--check', '--root', {str(populated_project)!r}])\n"
+        "print('exit', code, sorted(m for m in sys.modules if m.split('.')[0] in ('rich', 'rich_argparse')))\n"
+    )
+    out = _python("-c", script).stdout
+    assert "autoheader: The following files require header changes:" in out
+    assert "[red]" not in out and "\x1b[" not in out
+    assert out.splitlines()[-1] == "exit 1 []"
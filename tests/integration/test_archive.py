@@ -0,0 +1,92 @@
+# tests/integration/test_archive.py
+
+from pathlib import Path
+import io
+import json
+import tarfile
+import zipfile
+
+from autoheader.archive import MemberResolver
+from autoheader.cli import main
+
+GOOD = b"# src/pkg/mod.py\n\nx = 1\n"
+
+
+def _project(root: Path) -> Path:
+    (root / "src" / "pkg").mkdir(parents=True)
+    (root / "pyproject.toml").write_text("[project]\nname = 'pkg'\n")
+    (root / "README.md").write_text("pkg\n")
+    (root / "src" / "pkg" / "mod.py").write_bytes(GOOD)
+    (root / "src" / "pkg" / "bad.py").write_text("# src/pkg/bad.py\n\ny = 1\n")  # Fine on disk only
+    (root / "dist").mkdir()
+    return root
+
+
+def _wheel(path: Path) -> Path:
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("pkg/mod.py", GOOD)
+        zf.writestr("pkg/bad.py", b"y = 1\n")
+        zf.writestr("pkg-1.0.dist-info/METADATA", b"Name: pkg\n")
+    return path
+
+
+def _sdist(path: Path) -> Path:
+    with tarfile.open(path, "w:gz") as tf:
+        for name, data in [("pkg-1.0/src/pkg/mod.py", GOOD), ("pkg-1.0/src/pkg/bad.py", b"y = 1\n"), ("pkg-1.0/PKG-INFO", b"x")]:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tf.addfile(info, io.BytesIO(data))
+    return path
+
+
+def test_member_resolver():
+    resolver = MemberResolver(["src/pkg/mod.py", "src/pkg/__init__.py", "tests/__init__.py", "setup.py"])
+    assert resolver.resolve("pkg-1.0/src/pkg/mod.py") == "src/pkg/mod.py"  # sdist
+    assert resolver.resolve("pkg-1.0/setup.py") == "setup.py"
+    assert resolver.resolve("pkg/mod.py") == "src/pkg/mod.py"  # wheel of a src layout
+    assert resolver.resolve("__init__.py") == "__init__.py"  # Ambiguous: kept as is
+    assert resolver.resolve("other/new.py") == "other/new.py"
+
+
+def test_cli_check_archives(tmp_path: Path, capsys):
+    root = _project(tmp_path / "proj")
+    wheel = _wheel(root / "dist" / "pkg-1.0-py3-none-any.whl")
+    sdist = _sdist(root / "dist" / "pkg-1.0.tar.gz")
+
+    assert main(["--check", "--root", str(root), "--archive", str(wheel), str(sdist)]) == 1
+    out = capsys.readouterr().out
+    assert "- dist/pkg-1.0-py3-none-any.whl!/pkg/bad.py (Action: add)" in out
+    assert "- dist/pkg-1.0.tar.gz!/pkg-1.0/src/pkg/bad.py (Action: add)" in out
+    assert "mod.py" not in out and "METADATA" not in out
+    assert not (root / "pkg").exists() and len(list((root / "dist").iterdir())) == 2  # Nothing extracted
+
+    assert main(["--format", "sarif", "--root", str(root), "--archive", str(sdist)]) == 1
+    results = json.loads(capsys.readouterr().out)["runs"][0]["results"]
+    assert [r["locations"][0]["physicalLocation"]["artifactLocation"]["uri"] for r in results] == [
+        "dist/pkg-1.0.tar.gz!/pkg-1.0/src/pkg/bad.py"
+    ]
+
+
+def test_cli_archive_errors(tmp_path: Path, capsys):
+    root = _project(tmp_path / "proj")
+    (root / "dist" / "notes.txt").write_text("not an archive\n")
+    assert main(["--check", "--root", str(root), "--archive", str(root / "dist" / "notes.txt")]) == 1
+    assert "not a zip or tar archive" in capsys.readouterr().out
+
+
+def test_cli_corrupt_archive_members(tmp_path: Path, capsys):
+    root = _project(tmp_path / "proj")
+    wheel = root / "dist" / "pkg-1.0-py3-none-any.whl"
+    with zipfile.ZipFile(wheel, "w", zipfile.ZIP_STORED) as zf:
+        zf.writestr("pkg/mod.py", GOOD)
+    wheel.write_bytes(wheel.read_bytes().replace(b"x = 1", b"x = 2"))  # Fails its CRC
+    assert main(["--check", "--root", str(root), "--archive", str(wheel)]) == 1
+    assert "is unreadable: Bad CRC-32" in capsys.readouterr().out
+
+    # Truncated inside the first header, and past it
+    sdist = _sdist(root / "dist" / "pkg-1.0.tar.gz")
+    data = sdist.read_bytes()
+    for size in (60, 120):
+        sdist.write_bytes(data[:size])
+        assert main(["--check", "--root", str(root), "--archive", str(sdist)]) == 1
+        assert "is unreadable" in capsys.readouterr().out
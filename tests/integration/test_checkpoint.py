@@ -0,0 +1,81 @@
+# tests/integration/test_checkpoint.py
+
+from pathlib import Path
+from unittest import mock
+
+import pytest
+
+from autoheader import checkpoint
+from autoheader.cli import main
+from autoheader.constants import CHECKPOINT_FILE_NAME
+from autoheader.core import write_with_header
+from autoheader.filesystem import get_file_hash
+from autoheader.hashing import CACHE_DIGEST_SIZE
+from autoheader.models import LanguageConfig, RuntimeContext
+from autoheader.planner import _analyze_single_file
+
+SIGNATURE = {"override": True}
+PY_LANG = LanguageConfig(name="python", file_globs=["*.py"], prefix="# ", check_encoding=False, template="# {path}")
+
+
+def test_checkpoint_round_trip(tmp_path: Path):
+    ckpt = checkpoint.Checkpoint(tmp_path, SIGNATURE)
+    ckpt.record("a.py", {"mtime": 1.0, "hash": "b2:aa"})
+    ckpt.record("b.py", {"mtime": 2.0, "hash": "b2:bb"})
+    ckpt.close(completed=False)
+    # A run killed mid-write leaves a torn last line
+    with (tmp_path / CHECKPOINT_FILE_NAME).open("a") as f:
+        f.write('{"path": "c.py", "mti')
+
+    done = checkpoint.load_checkpoint(tmp_path, SIGNATURE)
+    assert done == {"a.py": {"mtime": 1.0, "hash": "b2:aa"}, "b.py": {"mtime": 2.0, "hash": "b2:bb"}}
+    assert checkpoint.load_checkpoint(tmp_path, {"override": False}) == {}
+
+    # Resuming appends to the same checkpoint; completing the run removes it
+    ckpt = checkpoint.Checkpoint(tmp_path, SIGNATURE, resume=True)
+    ckpt.record("d.py", {"mtime": 3.0, "hash": "b2:dd"})
+    ckpt.flush()
+    assert "d.py" in checkpoint.load_checkpoint(tmp_path, SIGNATURE)
+    ckpt.close(completed=True)
+    assert not (tmp_path / CHECKPOINT_FILE_NAME).exists()
+
+
+def test_resume_reverifies_changed_files(tmp_path: Path):
+    p = tmp_path / "a.py"
+    p.write_text("x = 1\n")
+    file_hash = get_file_hash(p, "blake2b", CACHE_DIGEST_SIZE)
+    context = RuntimeContext(root=tmp_path, excludes=[], depth=None, override=False, remove=False, check_hash=False, timeout=10)
+
+    # Touched but byte-identical: still done
+    context.resume = {"a.py": {"mtime": 0.0, "hash": file_hash}}
+    item, _ = _analyze_single_file((p, PY_LANG, context), {})
+    assert (item.action, item.reason) == ("skip-header-exists", "checkpoint")
+
+    # Content changed since the checkpoint: planned again
+    context.resume = {"a.py": {"mtime": 0.0, "hash": "b2:stale"}}
+    item, _ = _analyze_single_file((p, PY_LANG, context), {})
+    assert item.action == "add"
+
+
+def test_cli_resume_after_interruption(populated_project: Path):
+    root = populated_project
+    argv = ["--no-dry-run", "--yes", "--override", "--no-journal", "--workers", "1", "--root", str(root)]
+    written = []
+
+    def interrupt_second(item, **kwargs):
+        if written:
+            raise KeyboardInterrupt
+        written.append(item.rel_posix)
+        return write_with_header(item, **kwargs)
+
+    with mock.patch("autoheader.cli.write_with_header", side_effect=interrupt_second):
+        with pytest.raises(KeyboardInterrupt):
+            main(argv)
+    assert (root / CHECKPOINT_FILE_NAME).exists()
+
+    with mock.patch("autoheader.cli.write_with_header", wraps=write_with_header) as resumed:
+        assert main(argv + ["--resume"]) == 0
+    redone = {call.args[0].rel_posix for call in resumed.call_args_list}
+    assert written[0] not in redone
+    assert len(redone) == 2
+    assert not (root / CHECKPOINT_FILE_NAME).exists()
@@ -1,8 +1,10 @@
 # tests/integration/test_core.py
 
 from pathlib import Path
+from unittest.mock import patch
 
 from autoheader.planner import plan_files
+from autoheader import filesystem
 from autoheader.core import write_with_header
 from autoheader.models import PlanItem, RuntimeContext
 # --- ADD THESE IMPORTS ---
@@ -122,7 +124,8 @@ def test_plan_files_with_flags(populated_project: Path):
 
 def test_analyze_single_file_too_large(fs):
     """
-    Tests that _analyze_single_file skips a file that is too large.
+    Tests that _analyze_single_file plans a streamed rewrite, rather than
+    skipping, for a file above the streaming threshold.
     """
     from autoheader.planner import _analyze_single_file
     from autoheader.constants import MAX_FILE_SIZE_BYTES
@@ -130,7 +133,7 @@ def test_analyze_single_file_too_large(fs):
     root = Path("/fake_project")
     fs.create_dir(root)
     large_file = root / "large.py"
-    fs.create_file(large_file, st_size=MAX_FILE_SIZE_BYTES + 1)
+    fs.create_file(large_file, contents="x = 1\n" * (MAX_FILE_SIZE_BYTES // 6 + 1))
 
     context = RuntimeContext(
         root=root, excludes=[], depth=None, override=False, remove=False, check_hash=False, timeout=60.0
@@ -138,8 +141,65 @@ def test_analyze_single_file_too_large(fs):
 
     plan_item, _ = _analyze_single_file((large_file, PY_LANG, context), {})
 
-    assert plan_item.action == "skip-excluded"
-    assert "file size" in plan_item.reason
+    assert plan_item.action == "add"
+    assert plan_item.streaming
+
+
+def test_streaming_write_round_trip(tmp_path: Path):
+    """
+    With a tiny streaming threshold, plan + write must produce exactly the
+    same bytes as the in-memory engine, for add and then remove.
+    """
+    body = b"#!/usr/bin/env python\r\n" + b"value = 1  # \xff\r\n" * 5000
+    target = tmp_path / "big.py"
+    target.write_bytes(body)
+
+    context = RuntimeContext(
+        root=tmp_path, excludes=[], depth=None, override=False, remove=False,
+        check_hash=False, timeout=60.0, streaming_threshold=16,
+    )
+    generator, _ = plan_files(context, files=[target], languages=DEFAULT_LANGUAGES, workers=1)
+    (item, _), = list(generator)
+    assert item.action == "add" and item.streaming
+
+    write_with_header(item, backup=True, dry_run=False, blank_lines_after=1)
+    assert target.read_bytes() == (
+        b"#!/usr/bin/env python\r\n# big.py\r\n\r\n" + body.split(b"\r\n", 1)[1]
+    )
+    assert (tmp_path / "big.py.bak").read_bytes() == body
+
+    context.remove = True
+    generator, _ = plan_files(context, files=[target], languages=DEFAULT_LANGUAGES, workers=1)
+    (item, _), = list(generator)
+    assert item.action == "remove" and item.streaming
+    write_with_header(item, backup=False, dry_run=False, blank_lines_after=1)
+    assert target.read_bytes() == body
+
+
+def test_tampered_streamed_file_is_rewritten_by_streaming(tmp_path: Path):
+    """A hash mismatch above the streaming threshold keeps the streaming rewrite."""
+    body = b"value = 1\n" * 5000
+    target = tmp_path / "big.py"
+    target.write_bytes(b"# big.py hash:" + b"0" * 64 + b"\n\n" + body)
+    lang = LanguageConfig(
+        name="python", file_globs=["*.py"], prefix=HEADER_PREFIX, check_encoding=True,
+        template="# {path} hash:{hash}", license_owner="ACME",
+    )
+    context = RuntimeContext(
+        root=tmp_path, excludes=[], depth=None, override=False, remove=False,
+        check_hash=True, timeout=60.0, streaming_threshold=16,
+    )
+    generator, _ = plan_files(context, files=[target], languages=[lang], workers=1)
+    (item, _), = list(generator)
+    assert item.action == "override" and item.reason == "hash mismatch"
+    assert item.streaming and item.license_owner == "ACME"
+
+    with patch("autoheader.core.filesystem.stream_rewrite", wraps=filesystem.stream_rewrite) as rewrite, \
+         patch("autoheader.core.filesystem.read_file_bytes", side_effect=AssertionError("read in full")):
+        write_with_header(item, backup=False, dry_run=False, blank_lines_after=1)
+    rewrite.assert_called_once()
+    assert target.read_bytes().endswith(b"\n\n" + body)
+    assert not target.read_bytes().startswith(b"# big.py hash:" + b"0" * 64)
 
 
 def test_write_with_header_actions(populated_project: Path):
@@ -229,6 +289,31 @@ def test_write_with_header_actions(populated_project: Path):
     assert lines[0] == 'print("hello")'
 
 
+def test_write_with_header_preserves_bytes(tmp_path: Path):
+    """
+    CRLF line endings, a missing final newline and non-UTF-8 bytes must
+    survive a write untouched; only the header block is inserted.
+    """
+    target = tmp_path / "legacy.py"
+    original = b"#!/usr/bin/env python\r\nname = '\xe9t\xe9'\r\nprint(name)"
+    target.write_bytes(original)
+
+    item = PlanItem(
+        path=target,
+        rel_posix="legacy.py",
+        action="add",
+        prefix=PY_LANG.prefix,
+        check_encoding=PY_LANG.check_encoding,
+        template=PY_LANG.template,
+        analysis_mode=PY_LANG.analysis_mode,
+    )
+    write_with_header(item, backup=False, dry_run=False, blank_lines_after=1)
+
+    assert target.read_bytes() == (
+        b"#!/usr/bin/env python\r\n# legacy.py\r\n\r\nname = '\xe9t\xe9'\r\nprint(name)"
+    )
+
+
 def test_analyze_single_file_empty_file(fs):
     """
     Tests that _analyze_single_file skips an empty file.
@@ -0,0 +1,82 @@
+# tests/integration/test_daemon.py
+
+from pathlib import Path
+import socket
+import threading
+import time
+
+import pytest
+
+from autoheader import client
+from autoheader.cli import main
+from autoheader.daemon import DaemonServer, main as daemon_main
+
+pytestmark = pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="needs Unix sockets")
+
+
+@pytest.fixture
+def daemon(populated_project: Path, tmp_path_factory, monkeypatch):
+    # A short runtime dir keeps the socket path under the AF_UNIX limit
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path_factory.mktemp("run")))
+    server = DaemonServer(populated_project, workers=2)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def test_client_check_matches_in_process(daemon, populated_project: Path, capsys, monkeypatch):
+    root = populated_project
+    assert client.run_check(["--check", "--root", str(root)]) == 1
+    out = capsys.readouterr().out
+    assert "- src/dirty_file.py (Action: add)" in out
+    assert "- src/incorrect_file.py" not in out  # not overridden by --check
+    assert "clean_file.py" not in out
+
+    # Files are resolved by the client, relative to its cwd
+    monkeypatch.chdir(root)
+    assert client.run_check(["--check", "src/clean_file.py"]) == 0
+    assert "All headers are correct" in capsys.readouterr().out
+    assert client.run_check(["--check", "-q", "src/dirty_file.py"]) == 1
+    assert capsys.readouterr().out == ""
+
+
+def test_cli_forwards_to_daemon(daemon, populated_project: Path, monkeypatch):
+    monkeypatch.setattr("autoheader.cli.build_parser", lambda: pytest.fail("ran in-process"))
+    assert main(["--check", "--root", str(populated_project)]) == 1
+
+
+def test_client_ignores_untrusted_socket(daemon, populated_project: Path, monkeypatch):
+    # A socket others can write to (or that another user owns) may not be our daemon
+    daemon.path.chmod(0o666)
+    assert client.run_check(["--check", "--root", str(populated_project)]) is None
+    daemon.path.chmod(0o600)
+    monkeypatch.setattr(client.os, "getuid", lambda: daemon.path.stat().st_uid + 1)
+    assert client.run_check(["--check", "--root", str(populated_project)]) is None
+
+
+def test_daemon_reloads_changed_config(daemon, populated_project: Path, capsys):
+    root = populated_project
+    assert client.run_check(["--check", "--root", str(root), str(root / "src" / "dirty_file.py")]) == 1
+    time.sleep(0.01)  # distinct mtime
+    # Python files are no longer managed
+    (root / "autoheader.toml").write_text('[language.text]\nfile_globs = ["*.txt"]\nprefix = "# "\ntemplate = "# {path}"\n')
+    assert client.run_check(["--check", "--root", str(root), str(root / "src" / "dirty_file.py")]) == 0
+
+
+def test_client_falls_back_without_daemon(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    assert client.run_check(["--check", "--root", str(tmp_path)]) is None
+    # Flags the daemon does not understand always run in-process
+    assert client.run_check(["--check", "--override"]) is None
+    assert client.run_check(["--no-dry-run"]) is None
+
+
+def test_second_daemon_refused_and_stop(daemon, populated_project: Path, capsys):
+    with pytest.raises(RuntimeError):
+        DaemonServer(populated_project)
+    assert daemon_main(["--status", "--root", str(populated_project)]) == 0
+    assert daemon_main(["--stop", "--root", str(populated_project)]) == 0
+    assert "stopped" in capsys.readouterr().out
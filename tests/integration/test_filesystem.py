@@ -11,7 +11,14 @@ import builtins # <-- ADDED
 # --- MODIFIED IMPORTS ---
 from autoheader.filesystem import (
     read_file_lines,
+    read_file_bytes,
     write_file_content,
+    write_file_bytes,
+    stream_rewrite,
+    file_contains,
+    FsyncPolicy,
+    reflink,
+    supports_reflink,
     find_configured_files,
     load_gitignore_patterns,
     get_file_hash,
@@ -171,11 +178,10 @@ def test_write_file_content_backup_fails(tmp_path: Path, monkeypatch, caplog):
     p = tmp_path / "test.py"
     p.write_text("original")
 
-    def mock_write_text(*args, **kwargs):
-        # Let the *first* write (the backup) fail
+    def mock_write_bytes(*args, **kwargs):
         raise IOError("Disk full")
 
-    monkeypatch.setattr(Path, "write_text", mock_write_text)
+    monkeypatch.setattr(Path, "write_bytes", mock_write_bytes)
 
     with pytest.raises(IOError, match="Disk full"), caplog.at_level(logging.ERROR):
         write_file_content(p, "new", "original", backup=True, dry_run=False)
@@ -186,31 +192,152 @@ def test_write_file_content_backup_fails(tmp_path: Path, monkeypatch, caplog):
 
 
 def test_write_file_content_write_fails(tmp_path: Path, monkeypatch, caplog):
-    """Tests failure when writing the final file."""
+    """
+    Tests failure when replacing the final file: the original must be
+    untouched and no temp file may be left behind.
+    """
     p = tmp_path / "test.py"
     p.write_text("original")
 
-    # Mock write_text to fail on the *second* call (the main write)
-    mock_writer = mock.Mock(side_effect=[None, IOError("Permission denied")])
-    monkeypatch.setattr(Path, "write_text", mock_writer)
-
-    # --- FIX ---
-    # We must also mock chmod, because the mock_writer doesn't
-    # create the .bak file, so bak.chmod would fail first.
-    mock_chmod = mock.Mock()
-    monkeypatch.setattr(Path, "chmod", mock_chmod)
-    # --- END FIX ---
+    monkeypatch.setattr(os, "replace", mock.Mock(side_effect=IOError("Permission denied")))
 
     with pytest.raises(IOError, match="Permission denied"), caplog.at_level(logging.ERROR):
-        write_file_content(p, "new", "original", backup=True, dry_run=False)
+        write_file_content(p, "new", "original", backup=False, dry_run=False)
 
     assert "Failed to write file" in caplog.text
+    assert p.read_text() == "original"
+    assert [f.name for f in tmp_path.iterdir()] == ["test.py"]
+
+
+def test_write_file_bytes_interrupted(tmp_path: Path):
+    """A Ctrl-C mid-write leaves the original file intact."""
+    p = tmp_path / "test.py"
+    p.write_bytes(b"original\n")
+
+    def chunks():
+        yield b"partial"
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        write_file_bytes(p, chunks(), b"original\n", backup=False, dry_run=False)
+
+    assert p.read_bytes() == b"original\n"
+    assert [f.name for f in tmp_path.iterdir()] == ["test.py"]
+
+
+def test_write_file_bytes_follows_symlink(tmp_path: Path):
+    """Writing through a symlink updates the target and keeps the link."""
+    target = tmp_path / "real.py"
+    target.write_bytes(b"x\n")
+    link = tmp_path / "link.py"
+    try:
+        link.symlink_to(target)
+    except OSError:
+        pytest.skip("symlinks not supported")
 
-    # We can check that the mocks were called as expected
-    assert mock_writer.call_count == 2  # 1 for backup, 1 for main file
+    write_file_bytes(link, [b"# h\nx\n"], b"x\n", backup=False, dry_run=False)
 
-    # original_mode (from stat) + bak.chmod
-    assert mock_chmod.call_count == 1  # Only the bak.chmod is called
+    assert link.is_symlink()
+    assert target.read_bytes() == b"# h\nx\n"
+
+
+@pytest.mark.parametrize("mode", ["file", "batch"])
+def test_write_file_bytes_fsync_policies(tmp_path: Path, monkeypatch, mode):
+    """'file' syncs during each write; 'batch' defers to one commit()."""
+    synced = []
+    real_fsync = os.fsync
+    monkeypatch.setattr(os, "fsync", lambda fd: synced.append(fd) or real_fsync(fd))
+
+    policy = FsyncPolicy(mode)
+    paths = [tmp_path / f"f{i}.py" for i in range(3)]
+    for p in paths:
+        p.write_bytes(b"x\n")
+        write_file_bytes(p, [b"y\n"], b"x\n", backup=False, dry_run=False, fsync=policy)
+
+    if mode == "file":
+        assert len(synced) == 6  # file + directory, per write
+    else:
+        assert synced == []
+        policy.commit(workers=2)
+        assert len(synced) == 4  # 3 files + the shared directory once
+        policy.commit()  # Nothing pending: no-op
+        assert len(synced) == 4
+    assert all(p.read_bytes() == b"y\n" for p in paths)
+
+
+def test_fsync_policy_rejects_unknown_mode():
+    with pytest.raises(ValueError, match="Unknown fsync policy"):
+        FsyncPolicy("always")
+
+
+def test_write_file_bytes_backup(tmp_path: Path):
+    """Asserts chunks are written verbatim and the backup is byte-identical."""
+    p = tmp_path / "test.py"
+    original = b"\xef\xbb\xbforiginal\r\n"
+    p.write_bytes(original)
+
+    data = read_file_bytes(p)
+    write_file_bytes(
+        p, [b"# head\r\n", memoryview(data)[3:]], data, backup=True, dry_run=False
+    )
+
+    assert p.read_bytes() == b"# head\r\noriginal\r\n"
+    assert p.with_suffix(".py.bak").read_bytes() == original
+
+
+def test_read_file_bytes_nonexistent(tmp_path: Path, caplog):
+    """Tests reading raw bytes from a non-existent file."""
+    p = tmp_path / "nonexistent.py"
+
+    with caplog.at_level(logging.WARNING):
+        assert read_file_bytes(p) == b""
+
+    assert f"Failed to read {p}" in caplog.text
+
+
+@pytest.mark.parametrize("disable", [(), ("copy_file_range",), ("copy_file_range", "sendfile")])
+def test_stream_rewrite_copy_fallbacks(tmp_path: Path, monkeypatch, disable):
+    """The streamed copy must be exact whichever copy primitive is used."""
+    p = tmp_path / "big.py"
+    p.write_bytes(b"HEAD\n" + bytes(range(256)) * 4096)
+    os.chmod(p, 0o750)
+
+    def unsupported(*args, **kwargs):
+        raise OSError("not supported")
+
+    for name in disable:
+        monkeypatch.setattr(os, name, unsupported, raising=False)
+
+    stream_rewrite(p, [b"# new\n"], tail_offset=5, backup=False, dry_run=False)
+
+    assert p.read_bytes() == b"# new\n" + bytes(range(256)) * 4096
+    assert stat.S_IMODE(p.stat().st_mode) == 0o750
+    assert [f.name for f in tmp_path.iterdir()] == ["big.py"]
+
+
+def test_file_contains(tmp_path: Path):
+    """Scans mapped and empty files for a marker."""
+    p = tmp_path / "test.py"
+    p.write_bytes(b"x = 1\n" * 200_000 + b"# autoheader: ignore\n")
+    empty = tmp_path / "empty.py"
+    empty.write_bytes(b"")
+
+    assert file_contains(p, b"autoheader: ignore")
+    assert not file_contains(p, b"not present")
+    assert not file_contains(empty, b"autoheader: ignore")
+    assert not file_contains(tmp_path / "missing.py", b"autoheader: ignore")
+
+
+def test_get_file_hash_mmap(tmp_path: Path):
+    """Files above the mmap threshold hash identically to small-file hashing."""
+    import hashlib
+    from autoheader.constants import MMAP_THRESHOLD_BYTES
+
+    content = os.urandom(MMAP_THRESHOLD_BYTES + 17)
+    p = tmp_path / "big.bin"
+    p.write_bytes(content)
+
+    assert get_file_hash(p) == hashlib.sha256(content).hexdigest()
 
 
 # --- ADD THIS NEW TEST ---
@@ -359,3 +486,57 @@ def test_get_file_hash_error(fs, caplog):
 
     assert result == ""
     assert f"Failed to hash {p}" in caplog.text
+
+
+def _fake_ficlone(dst_fd, request, src_fd):
+    """Stands in for FICLONE on filesystems without reflink support."""
+    os.write(dst_fd, os.pread(src_fd, 1 << 20, 0))
+    return 0
+
+
+def test_backup_uses_reflink(tmp_path: Path, monkeypatch):
+    """With FICLONE available the backup is a clone, not a rewrite of the content."""
+    p = tmp_path / "a.py"
+    p.write_bytes(b"on disk\n")
+    calls = []
+
+    def ioctl(dst_fd, request, src_fd):
+        calls.append(request)
+        return _fake_ficlone(dst_fd, request, src_fd)
+
+    monkeypatch.setattr("autoheader.filesystem.fcntl.ioctl", ioctl)
+    monkeypatch.setattr("autoheader.filesystem._NO_REFLINK_DEVICES", set())
+    monkeypatch.setattr(Path, "write_bytes", mock.Mock(side_effect=AssertionError("not cloned")))
+
+    write_file_bytes(p, [b"new\n"], b"on disk\n", backup=True, dry_run=False)
+
+    assert calls == [0x40049409]
+    assert p.read_bytes() == b"new\n"
+    assert (tmp_path / "a.py.bak").read_bytes() == b"on disk\n"
+
+
+def test_reflink_unsupported_falls_back(tmp_path: Path, monkeypatch):
+    """EOPNOTSUPP leaves no partial clone, and the device is not probed again."""
+    import errno
+    from autoheader import filesystem
+
+    src = tmp_path / "big.bin"
+    src.write_bytes(b"x" * 100)
+    ioctl = mock.Mock(side_effect=OSError(errno.EOPNOTSUPP, "not supported"))
+    monkeypatch.setattr("autoheader.filesystem.fcntl.ioctl", ioctl)
+    monkeypatch.setattr(filesystem, "_NO_REFLINK_DEVICES", set())
+
+    assert reflink(src, tmp_path / "clone") is False
+    assert not (tmp_path / "clone").exists()
+    assert reflink(src, tmp_path / "clone") is False
+    assert ioctl.call_count == 1
+
+    stream_rewrite(src, [b"# h\n"], tail_offset=0, backup=True, dry_run=False)
+    assert (tmp_path / "big.bin.bak").read_bytes() == b"x" * 100
+    assert src.read_bytes() == b"# h\n" + b"x" * 100
+
+
+def test_supports_reflink_probe(tmp_path: Path):
+    """The probe answers for the real filesystem and cleans up after itself."""
+    assert supports_reflink(tmp_path) in (True, False)
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,28 @@
+# tests/integration/test_generated.py
+
+from pathlib import Path
+
+from autoheader.cli import main
+
+
+def test_cli_skips_generated_and_minified_files(tmp_path: Path, capsys):
+    root = tmp_path / "proj"
+    (root / "src").mkdir(parents=True)
+    (root / "pyproject.toml").write_text("[project]\nname = 'proj'\n")
+    (root / "README.md").write_text("proj\n")
+    (root / "src" / "api_pb2.py").write_text("# -*- coding: utf-8 -*-\n# Generated by the protocol buffer compiler.  DO NOT EDIT!\nx = 1\n")
+    (root / "src" / "bundle.py").write_text("x = [" + "1, " * 1000 + "]\n")
+    (root / "src" / "mod.py").write_text("x = 1\n")
+
+    assert main(["--no-dry-run", "--yes", "--root", str(root)]) == 0
+    assert "skipped_generated=2" in capsys.readouterr().out
+    assert (root / "src" / "mod.py").read_text().startswith("# src/mod.py\n")
+    assert (root / "src" / "api_pb2.py").read_text().startswith("# -*- coding: utf-8 -*-\n# Generated by")
+    assert (root / "src" / "bundle.py").read_text().startswith("x = [")
+
+    # Turned off from the config: both files get headers
+    (root / "autoheader.toml").write_text("[detection]\ngenerated_markers = []\nminified_line_length = 0\n")
+    # (the generator's comment is taken for a wrong header)
+    assert main(["--check", "--override", "--root", str(root)]) == 1
+    out = capsys.readouterr().out
+    assert "src/api_pb2.py (Action: override)" in out and "src/bundle.py (Action: add)" in out
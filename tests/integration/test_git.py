@@ -0,0 +1,315 @@
+# tests/integration/test_git.py
+
+from pathlib import Path
+from unittest import mock
+import datetime
+import json
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from autoheader import git, planner
+from autoheader.cli import main
+from autoheader.config import load_general_config, load_language_configs
+from autoheader.constants import STREAM_HEAD_BYTES
+from autoheader.models import RuntimeContext
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="git not installed")
+
+
+def _git(root: Path, *args: str) -> None:
+    subprocess.run(["git", "-C", str(root), *args], check=True, capture_output=True)
+
+
+@pytest.fixture
+def repo(tmp_path: Path) -> Path:
+    root = tmp_path / "repo"
+    (root / "src").mkdir(parents=True)
+    (root / "pyproject.toml").write_text("[project]\nname = 'x'\n")
+    for name in ("a.py", "b.py", "c.py"):
+        (root / "src" / name).write_text(f"# src/{name}\n\nx = 1\n")
+    (root / ".gitignore").write_text("ignored.py\n")
+    _git(root, "init", "-q", "-b", "main")
+    _git(root, "-c", "user.name=t", "-c", "user.email=t@t", "add", ".")
+    _git(root, "-c", "user.name=t", "-c", "user.email=t@t", "commit", "-q", "-m", "base")
+    _git(root, "checkout", "-q", "-b", "feature")
+    return root
+
+
+def test_changed_files_since_merge_base(repo: Path):
+    (repo / "src" / "a.py").write_text("x = 2\n")  # Modified, unstaged
+    _git(repo, "mv", "src/b.py", "src/moved.py")  # Renamed, staged
+    (repo / "src" / "c.py").unlink()  # Deleted
+    (repo / "src" / "new.py").write_text("y = 1\n")  # Untracked
+    (repo / "ignored.py").write_text("z = 1\n")  # Ignored
+
+    assert git.changed_files(repo, since="main") == [repo / "src" / "a.py", repo / "src" / "moved.py"]
+    assert git.changed_files(repo, since="main", untracked=True) == [
+        repo / "src" / "a.py", repo / "src" / "moved.py", repo / "src" / "new.py",
+    ]
+    assert git.changed_files(repo, staged=True) == [repo / "src" / "moved.py"]
+    # Paths are relative to a root below the repository top
+    assert git.changed_files(repo / "src", since="main") == [repo / "src" / "a.py", repo / "src" / "moved.py"]
+
+
+def test_cli_check_since(repo: Path, capsys):
+    (repo / "src" / "a.py").write_text("x = 2\n")
+    (repo / "src" / "new.py").write_text("y = 1\n")
+    (repo / "README.md").write_text("# docs\n")  # Changed, but no language manages it
+
+    assert main(["--check", "--since", "main", "--root", str(repo)]) == 1
+    out = capsys.readouterr().out
+    assert "- src/a.py (Action: add)" in out
+    assert "new.py" not in out
+
+    assert main(["--check", "--since", "main", "--untracked", "--root", str(repo)]) == 1
+    assert "- src/new.py (Action: add)" in capsys.readouterr().out
+
+    # Nothing staged: nothing to check, rather than the whole tree
+    (repo / "src" / "b.py").write_text("x = 1\n")
+    assert main(["--check", "--staged", "--root", str(repo)]) == 0
+
+
+def test_cli_since_run_keeps_other_cache_entries(repo: Path):
+    assert main(["--no-dry-run", "--yes", "--root", str(repo)]) == 0
+    cache_path = repo / ".autoheader_cache"
+    before = json.loads(cache_path.read_text())
+    assert {"src/a.py", "src/b.py", "src/c.py"} <= set(before)
+
+    (repo / "src" / "a.py").write_text("x = 2\n")
+    assert main(["--no-dry-run", "--yes", "--since", "main", "--root", str(repo)]) == 0
+    after = json.loads(cache_path.read_text())
+    assert after["src/b.py"] == before["src/b.py"] and after["src/c.py"] == before["src/c.py"]
+    assert after["src/a.py"] != before["src/a.py"]
+
+
+def test_cli_since_outside_a_repository(tmp_path: Path, capsys):
+    (tmp_path / "pyproject.toml").write_text("")
+    (tmp_path / "README.md").write_text("")
+    assert main(["--check", "--since", "main", "--root", str(tmp_path)]) == 1
+    assert "git merge-base failed" in capsys.readouterr().out
+    with pytest.raises(SystemExit):
+        main(["--check", "--untracked", "--root", str(tmp_path)])
+
+
+def test_renamed_files_and_selection(repo: Path):
+    from autoheader.config import load_language_configs
+    from autoheader.models import RuntimeContext
+    from autoheader.planner import select_renamed
+
+    (repo / "src" / "c.py").write_text("# Custom header\n\nx = 1\n")
+    _git(repo, "-c", "user.name=t", "-c", "user.email=t@t", "commit", "-qam", "custom")
+    _git(repo, "mv", "src/a.py", "src/a2.py")
+    _git(repo, "mv", "src/c.py", "src/c2.py")
+
+    renames = git.renamed_files(repo)
+    assert renames == [(repo / "src" / "a.py", repo / "src" / "a2.py"), (repo / "src" / "c.py", repo / "src" / "c2.py")]
+
+    context = RuntimeContext(root=repo, excludes=[], depth=None, override=True, remove=False, check_hash=False, timeout=60.0)
+    languages = load_language_configs({}, {})
+    # c2.py's header never named its path, so it is not touched
+    assert select_renamed(renames, context, languages, workers=2) == [repo / "src" / "a2.py"]
+
+
+def test_cli_renames_between_commits(repo: Path, capsys):
+    _git(repo, "mv", "src/a.py", "src/moved.py")
+    (repo / "src" / "b.py").write_text("x = 1\n")  # Needs a header, but was not renamed
+    _git(repo, "-c", "user.name=t", "-c", "user.email=t@t", "commit", "-qam", "move")
+
+    assert main(["--check", "--renames", "main..feature", "--root", str(repo)]) == 1
+    out = capsys.readouterr().out
+    assert "- src/moved.py (Action: override)" in out
+    assert "b.py" not in out
+
+    assert main(["--renames", "main..feature", "--no-dry-run", "--yes", "--root", str(repo)]) == 0
+    assert (repo / "src" / "moved.py").read_text().startswith("# src/moved.py\n")
+    assert (repo / "src" / "b.py").read_text() == "x = 1\n"
+
+
+def _commit(root: Path, message: str, date: str) -> None:
+    env_date = f"{date}T12:00:00"
+    subprocess.run(
+        ["git", "-C", str(root), "-c", "user.name=t", "-c", "user.email=t@t", "commit", "-qam", message],
+        check=True, capture_output=True,
+        env={**os.environ, "GIT_AUTHOR_DATE": env_date, "GIT_COMMITTER_DATE": env_date},
+    )
+
+
+def test_file_history_follows_renames(repo: Path):
+    body = "".join(f"value_{i} = {i}\n" for i in range(20))
+    (repo / "src" / "a.py").write_text(body)
+    _commit(repo, "grow", "2020-01-01")
+    _git(repo, "mv", "src/a.py", "src/renamed.py")
+    (repo / "src" / "renamed.py").write_text(body + "x = 2\n")
+    _commit(repo, "rename", "2021-03-01")
+    (repo / "src" / "b.py").unlink()
+    _commit(repo, "delete", "2022-01-01")
+    (repo / "src" / "b.py").write_text("new file\n")
+    _git(repo, "add", "src/b.py")
+    _commit(repo, "re-add", "2023-01-01")
+
+    history = git.file_history(repo)
+    base_year = history["src/c.py"].year_created
+    renamed = history["src/renamed.py"]
+    assert (renamed.year_created, renamed.year_modified) == (base_year, 2021)
+    assert renamed.commit == subprocess.run(
+        ["git", "-C", str(repo), "rev-parse", "HEAD~2"], capture_output=True, text=True
+    ).stdout.strip()
+    assert history["src/c.py"].year_modified == base_year
+    # Re-added after a delete: a new file, not the old one's history
+    assert (history["src/b.py"].year_created, history["src/b.py"].year_modified) == (2023, 2023)
+    assert "src/a.py" not in history
+    # Relative to a root below the repository top
+    assert set(git.file_history(repo / "src")) == {"renamed.py", "b.py", "c.py"}
+
+
+def test_history_placeholders(repo: Path, capsys):
+    (repo / "autoheader.toml").write_text(
+        '[language.python]\nfile_globs = ["*.py"]\nprefix = "# "\n'
+        'template = "# {path} ({year_created}-{year_modified}, {commit})"\n'
+    )
+    (repo / "src" / "a.py").write_text("x = 1\n")
+    _commit(repo, "edit", "2024-06-01")
+    (repo / "src" / "untracked.py").write_text("y = 1\n")
+    sha = subprocess.run(["git", "-C", str(repo), "rev-parse", "HEAD"], capture_output=True, text=True).stdout
+    base_year = git.file_history(repo)["src/b.py"].year_created
+
+    with mock.patch("autoheader.git.subprocess.Popen", wraps=subprocess.Popen) as popen:
+        assert main(["--no-dry-run", "--yes", "--override", "--no-journal", "--root", str(repo)]) == 0
+    assert [call.args[0][3] for call in popen.call_args_list].count("log") == 1  # One git log for the whole run
+
+    assert (repo / "src" / "a.py").read_text().startswith(f"# src/a.py ({base_year}-2024, {sha[:12]})\n")
+    year = datetime.date.today().year
+    assert (repo / "src" / "untracked.py").read_text().startswith(f"# src/untracked.py ({year}-{year}, uncommitted)\n")
+
+    # A new commit makes the header stale even though the file is unchanged
+    _commit(repo, "touch", "2025-01-01")
+    capsys.readouterr()
+    assert main(["--check", "--override", "--root", str(repo)]) == 1
+    assert "- src/a.py (Action: override)" in capsys.readouterr().out
+
+
+def test_tree_files_and_read_blobs(repo: Path):
+    os.symlink("a.py", repo / "src" / "link.py")
+    _git(repo, "add", ".")
+    _git(repo, "-c", "user.name=t", "-c", "user.email=t@t", "commit", "-qm", "link")
+
+    entries = git.tree_files(repo, "HEAD")
+    assert [name for name, _, _ in entries] == [".gitignore", "pyproject.toml", "src/a.py", "src/b.py", "src/c.py"]
+    assert [name for name, _, _ in git.tree_files(repo / "src", "HEAD", ["b.py"])] == ["b.py"]
+
+    with mock.patch("autoheader.git.subprocess.Popen", wraps=subprocess.Popen) as popen:
+        blobs = list(git.read_blobs(repo, [sha for _, sha, _ in entries]))
+    assert popen.call_count == 1
+    assert blobs[2] == b"# src/a.py\n\nx = 1\n"
+    assert [len(b) for b in blobs] == [size for _, _, size in entries]
+
+
+def test_blob_reader_serves_many_reads(repo: Path):
+    shas = [sha for _, sha, _ in git.tree_files(repo, "HEAD")]
+    with mock.patch("autoheader.git.subprocess.Popen", wraps=subprocess.Popen) as popen:
+        with git.BlobReader(repo) as reader:
+            first = list(reader.read(shas))
+            assert list(reader.read(shas[1:])) == first[1:]
+            # A read abandoned halfway does not leak its answers into the next
+            next(reader.read(shas))
+            assert list(reader.read(shas[:1])) == first[:1]
+    assert popen.call_count == 2
+
+
+def test_plan_revision_keeps_only_the_head_of_large_blobs(repo: Path):
+    (repo / "src" / "big.py").write_text("x = 1\n" * 100_000)
+    _git(repo, "add", ".")
+    _git(repo, "-c", "user.name=t", "-c", "user.email=t@t", "commit", "-qm", "big")
+    size = (repo / "src" / "big.py").stat().st_size
+    context = RuntimeContext(root=repo, excludes=[], depth=None, override=False, remove=False, check_hash=False, timeout=10, streaming_threshold=1024)
+    languages = load_language_configs({}, load_general_config({}))
+
+    with mock.patch("autoheader.planner._analyze_blob", wraps=planner._analyze_blob) as analyze:
+        generator, _ = planner.plan_revision(context, "HEAD", languages, workers=2, paths=["src/big.py", "src/a.py"])
+        items = {item.rel_posix: item for item, _ in generator}
+    assert items["src/big.py"].action == "add" and items["src/big.py"].streaming
+    assert items["src/a.py"].action == "skip-header-exists" and not items["src/a.py"].streaming
+    received = {call.args[0]: (len(call.args[1]), call.args[4]) for call in analyze.call_args_list}
+    assert received["src/big.py"] == (STREAM_HEAD_BYTES, size)
+
+
+def test_cli_check_rev(repo: Path, capsys):
+    (repo / "src" / "a.py").write_text("x = 2\n")
+    _git(repo, "-c", "user.name=t", "-c", "user.email=t@t", "commit", "-qam", "drop header")
+    # The working tree does not matter: fixed, deleted and new files alike
+    (repo / "src" / "a.py").write_text("# src/a.py\n\nx = 2\n")
+    (repo / "src" / "b.py").unlink()
+    (repo / "src" / "new.py").write_text("y = 1\n")
+
+    assert main(["--check", "--rev", "feature", "--root", str(repo)]) == 1
+    out = capsys.readouterr().out
+    assert "- src/a.py (Action: add)" in out
+    assert "b.py" not in out and "new.py" not in out
+
+    assert main(["--check", "--rev", "main", "--root", str(repo)]) == 0
+    assert main(["--check", "--rev", "feature", "--root", str(repo), str(repo / "src" / "c.py")]) == 0
+    capsys.readouterr()
+    assert main(["--check", "--rev", "no-such-ref", "--root", str(repo)]) == 1
+    assert "ls-tree failed" in capsys.readouterr().out
+    with pytest.raises(SystemExit):
+        main(["--rev", "main", "--root", str(repo)])
+
+
+def test_cli_check_staged_reads_the_index(repo: Path, capsys):
+    # Staged without a header, then fixed in the working tree only
+    (repo / "src" / "a.py").write_text("x = 2\n")
+    (repo / "src" / "odd[1].py").write_text("y = 1\n")
+    _git(repo, "add", "src")
+    (repo / "src" / "a.py").write_text("# src/a.py\n\nx = 2\n")
+    (repo / "src" / "b.py").write_text("x = 2\n")  # Unstaged: not checked
+
+    assert git.staged_blobs(repo, ["src/odd[1].py"])[0][0] == "src/odd[1].py"
+    assert main(["--check", "--staged", "--root", str(repo)]) == 1
+    out = capsys.readouterr().out
+    assert "- src/a.py (Action: add)" in out
+    assert "b.py" not in out
+
+    # Explicit files (as the native hook passes them) narrow the staged set
+    assert main(["--check", "--staged", "--root", str(repo), str(repo / "src" / "odd[1].py")]) == 1
+    out = capsys.readouterr().out
+    assert "odd[1].py" in out and "a.py" not in out
+    assert main(["--check", "--staged", "--root", str(repo), str(repo / "src" / "b.py")]) == 0
+
+    # Fixing the staged content is what makes the commit pass
+    _git(repo, "add", "src/a.py")
+    assert main(["--check", "--staged", "--root", str(repo), str(repo / "src" / "a.py")]) == 0
+
+
+def test_sparse_checkout_files_are_not_read(repo: Path, capsys):
+    # Still on disk, but git treats it as not checked out
+    (repo / "src" / "b.py").write_text("x = 1\n")
+    _git(repo, "update-index", "--skip-worktree", "src/b.py")
+    assert git.skip_worktree_paths(repo) == {"src/b.py"}
+    assert git.skip_worktree_paths(repo / "src") == {"b.py"}
+
+    with mock.patch("autoheader.planner._analyze_single_file", wraps=planner._analyze_single_file) as analyze:
+        assert main(["--dry-run", "--root", str(repo)]) == 0
+    assert {args[0][0][0].name for args in analyze.call_args_list} == {"a.py", "c.py"}
+    assert "not_checked_out=1" in capsys.readouterr().out
+
+    _git(repo, "update-index", "--no-skip-worktree", "src/b.py")
+    _git(repo, "checkout", "src/b.py")
+    _git(repo, "sparse-checkout", "set", "--no-cone", "/*", "!/src/c.py")
+    assert not (repo / "src" / "c.py").exists()
+    assert git.skip_worktree_paths(repo) == {"src/c.py"}
+
+
+def test_partial_clone_history_skips_rename_detection(repo: Path):
+    _git(repo, "mv", "src/a.py", "src/moved.py")
+    _git(repo, "-c", "user.name=t", "-c", "user.email=t@t", "commit", "-qm", "move")
+    assert not git.is_partial_clone(repo)
+    _git(repo, "config", "extensions.partialClone", "origin")
+    assert git.is_partial_clone(repo)
+    with mock.patch("autoheader.git.subprocess.Popen", wraps=subprocess.Popen) as popen:
+        history = git.file_history(repo)
+    # Rename detection would fetch old blobs; the move starts a new history instead
+    assert "--no-renames" in popen.call_args.args[0]
+    assert set(history) == {".gitignore", "pyproject.toml", "src/moved.py", "src/b.py", "src/c.py"}
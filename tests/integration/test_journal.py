@@ -0,0 +1,105 @@
+# tests/integration/test_journal.py
+
+from pathlib import Path
+
+import pytest
+
+from autoheader import journal
+from autoheader.cli import main
+from autoheader.core import write_with_header
+from autoheader.constants import JOURNAL_DIR_NAME, JOURNAL_KEEP_RUNS
+from autoheader.models import PlanItem
+
+
+def _item(root: Path, rel: str, streaming: bool = False) -> PlanItem:
+    return PlanItem(path=root / rel, rel_posix=rel, action="add", prefix="# ", check_encoding=False, template="# {path}", analysis_mode="line", streaming=streaming)
+
+
+def _apply(root: Path, run: journal.RunJournal, *items: PlanItem) -> None:
+    for item in items:
+        write_with_header(item, backup=False, dry_run=False, blank_lines_after=0, journal=run)
+    run.close()
+
+
+def test_undo_restores_run(tmp_path: Path):
+    (tmp_path / "a.py").write_bytes(b"print('a')\r\n")
+    (tmp_path / "b.py").write_bytes(b"print('b')\n")
+    run = journal.RunJournal(tmp_path)
+    _apply(tmp_path, run, _item(tmp_path, "a.py"), _item(tmp_path, "b.py", streaming=True))
+    assert (tmp_path / "a.py").read_bytes() == b"# a.py\r\nprint('a')\r\n"
+
+    result = journal.undo(tmp_path, run.run_id, workers=2)
+
+    assert sorted(result.restored) == ["a.py", "b.py"]
+    assert (tmp_path / "a.py").read_bytes() == b"print('a')\r\n"
+    assert (tmp_path / "b.py").read_bytes() == b"print('b')\n"
+    # A run can only be undone once
+    with pytest.raises(ValueError):
+        journal.undo(tmp_path, run.run_id)
+    assert journal.resolve_run(tmp_path) is None
+
+
+def test_undo_skips_files_edited_since(tmp_path: Path):
+    (tmp_path / "a.py").write_bytes(b"x = 1\n")
+    run = journal.RunJournal(tmp_path)
+    _apply(tmp_path, run, _item(tmp_path, "a.py"))
+    (tmp_path / "a.py").write_bytes(b"# a.py\nx = 2\n")
+
+    result = journal.undo(tmp_path, run.run_id)
+
+    assert result.conflicts == ["a.py"]
+    assert (tmp_path / "a.py").read_bytes() == b"# a.py\nx = 2\n"
+
+
+def test_undo_without_post_record(tmp_path: Path):
+    """A pre-image with no post record (interrupted run) is only restored if the file changed."""
+    (tmp_path / "a.py").write_bytes(b"x = 1\n")
+    (tmp_path / "b.py").write_bytes(b"y = 1\n")
+    run = journal.RunJournal(tmp_path)
+    run.capture("a.py", b"x = 1\n")
+    run.capture("b.py", b"y = 1\n")
+    (tmp_path / "b.py").write_bytes(b"# b.py\ny = 1\n")
+    run.close()
+
+    result = journal.undo(tmp_path, run.run_id)
+
+    assert result.unchanged == ["a.py"]
+    assert result.restored == ["b.py"]
+    assert (tmp_path / "b.py").read_bytes() == b"y = 1\n"
+
+
+def test_empty_run_leaves_no_files(tmp_path: Path):
+    run = journal.RunJournal(tmp_path)
+    assert run.close() is False
+    assert journal.list_runs(tmp_path) == []
+
+
+def test_old_runs_are_pruned(tmp_path: Path):
+    for i in range(JOURNAL_KEEP_RUNS + 2):
+        run = journal.RunJournal(tmp_path, run_id=f"run-{i:02d}")
+        run.capture("a.py", b"")
+        run.close()
+    runs = journal.list_runs(tmp_path)
+    assert len(runs) == JOURNAL_KEEP_RUNS
+    assert runs[-1] == f"run-{JOURNAL_KEEP_RUNS + 1:02d}"
+    assert not (tmp_path / JOURNAL_DIR_NAME / "run-00.pack").exists()
+
+
+def test_cli_undo_round_trip(populated_project: Path, capsys):
+    root = populated_project
+    before = (root / "src" / "dirty_file.py").read_bytes()
+
+    assert main(["--no-dry-run", "--yes", "--override", "--root", str(root)]) == 0
+    assert (root / "src" / "dirty_file.py").read_bytes() != before
+    assert len(journal.list_runs(root)) == 1
+    assert "journaled" in capsys.readouterr().out
+
+    assert main(["--undo", "--root", str(root)]) == 0
+    assert (root / "src" / "dirty_file.py").read_bytes() == before
+    assert main(["--undo", "--root", str(root)]) == 1
+
+
+def test_cli_no_journal(populated_project: Path):
+    root = populated_project
+    assert main(["--no-dry-run", "--yes", "--no-journal", "--root", str(root)]) == 0
+    assert journal.list_runs(root) == []
@@ -0,0 +1,100 @@
+# tests/integration/test_patch.py
+
+from pathlib import Path
+import shutil
+import subprocess
+
+import pytest
+
+from autoheader import AutoHeader
+from autoheader.cli import main
+from autoheader.models import PlanItem
+from autoheader.patch import emit_patch, file_patch
+
+needs_git = pytest.mark.skipif(shutil.which("git") is None, reason="git not installed")
+
+
+def _item(root: Path, rel: str, action: str = "add", streaming: bool = False) -> PlanItem:
+    return PlanItem(path=root / rel, rel_posix=rel, action=action, prefix="# ", check_encoding=False, template="# {path}", analysis_mode="line", streaming=streaming)
+
+
+def _git_apply(root: Path, patch: Path) -> None:
+    subprocess.run(["git", "init", "-q", str(root)], check=True)
+    subprocess.run(["git", "apply", "--whitespace=nowarn", str(patch)], cwd=root, check=True)
+
+
+def test_file_patch_format(tmp_path: Path):
+    (tmp_path / "a.py").write_bytes(b"x = 1")
+    diff = file_patch(_item(tmp_path, "a.py"), blank_lines_after=0)
+    assert diff == (
+        b"diff --git a/a.py b/a.py\n"
+        b"--- a/a.py\n"
+        b"+++ b/a.py\n"
+        b"@@ -1 +1,2 @@\n"
+        b"+# a.py\n"
+        b" x = 1\n"
+        b"\\ No newline at end of file\n"
+    )
+    # Nothing to change, nothing in the patch
+    (tmp_path / "b.py").write_bytes(b"# b.py\nx = 1\n")
+    assert file_patch(_item(tmp_path, "b.py", action="override"), blank_lines_after=0) == b""
+
+
+@needs_git
+def test_emit_patch_applies_byte_for_byte(tmp_path: Path):
+    work = tmp_path / "work"
+    work.mkdir()
+    files = {
+        "b/crlf.py": b"\xef\xbb\xbfx = 1\r\ny = 2\r\n",
+        "a.py": b"#!/usr/bin/env python\nprint('a')",
+        "c.py": b"# wrong.py\n\nz = 3\n",
+    }
+    for rel, data in files.items():
+        (work / rel).parent.mkdir(parents=True, exist_ok=True)
+        (work / rel).write_bytes(data)
+    items = [_item(work, "b/crlf.py"), _item(work, "a.py", streaming=True), _item(work, "c.py", action="override")]
+
+    out = tmp_path / "out.diff"
+    patched = emit_patch(items, out, blank_lines_after=1, workers=3)
+
+    # Written in path order, and nothing in the workspace changed
+    assert [i.rel_posix for i in patched] == ["a.py", "b/crlf.py", "c.py"]
+    assert all((work / rel).read_bytes() == data for rel, data in files.items())
+
+    expected = tmp_path / "expected"
+    shutil.copytree(work, expected)
+    for item in items:
+        item.path = expected / item.rel_posix
+        item.streaming = False
+    from autoheader.core import write_with_header
+    for item in items:
+        write_with_header(item, backup=False, dry_run=False, blank_lines_after=1, journal=None)
+
+    _git_apply(work, out)
+    for rel in files:
+        assert (work / rel).read_bytes() == (expected / rel).read_bytes()
+
+
+def test_cli_emit_patch(populated_project: Path):
+    root = populated_project
+    out = root.parent / "headers.diff"
+    before = (root / "src" / "dirty_file.py").read_bytes()
+
+    assert main(["--emit-patch", str(out), "--override", "--root", str(root)]) == 0
+
+    text = out.read_text()
+    assert "diff --git a/src/dirty_file.py b/src/dirty_file.py" in text
+    assert "+# src/incorrect_file.py" in text
+    assert "clean_file.py" not in text
+    assert (root / "src" / "dirty_file.py").read_bytes() == before
+
+
+def test_sdk_emit_patch(tmp_path: Path):
+    (tmp_path / "autoheader.toml").write_text('[language.python]\nfile_globs = ["*.py"]\nprefix = "# "\ntemplate = "# {path}"\n')
+    (tmp_path / "m.py").write_text("print('m')\n")
+
+    results = AutoHeader(root=tmp_path).emit_patch(tmp_path / "out.diff")
+
+    assert [(r.path.name, r.status) for r in results] == [("m.py", "add")]
+    assert "+# m.py" in (tmp_path / "out.diff").read_text()
+    assert (tmp_path / "m.py").read_text() == "print('m')\n"
@@ -0,0 +1,83 @@
+# tests/integration/test_planfile.py
+
+from pathlib import Path
+import json
+from unittest import mock
+
+import pytest
+
+from autoheader import planfile
+from autoheader.cli import main
+from autoheader.filesystem import get_file_hash
+from autoheader.models import PlanItem
+
+
+def test_plan_round_trip(tmp_path: Path):
+    (tmp_path / "a.py").write_text("x = 1\n")
+    item = PlanItem(path=tmp_path / "a.py", rel_posix="a.py", action="add", prefix="# ", check_encoding=True, template="# {path}", analysis_mode="ast", license_spdx="MIT", streaming=True, hash_algorithm="blake2b")
+    fingerprint = {"mtime": 1.0, "hash": get_file_hash(tmp_path / "a.py", "blake2b", 16)}
+
+    assert planfile.write_plan(tmp_path / "plan.ndjson", [(item, fingerprint)]) == 1
+
+    # Paths are relative, so the plan can be applied in another checkout
+    other = tmp_path / "other"
+    other.mkdir()
+    (other / "a.py").write_text("x = 1\n")
+    [(loaded, loaded_fp)] = planfile.read_plan(tmp_path / "plan.ndjson", other)
+    assert loaded.path == other / "a.py"
+    assert (loaded.action, loaded.analysis_mode, loaded.license_spdx, loaded.streaming, loaded.hash_algorithm) == ("add", "ast", "MIT", True, "blake2b")
+    assert loaded_fp == fingerprint
+
+    valid, stale = planfile.verify_plan([(loaded, loaded_fp)])
+    assert valid == [loaded] and stale == []
+    (other / "a.py").write_text("x = 2\n")
+    valid, stale = planfile.verify_plan([(loaded, loaded_fp)])
+    assert valid == [] and stale == [loaded]
+
+
+def test_read_plan_rejects_other_files(tmp_path: Path):
+    (tmp_path / "plan.ndjson").write_text(json.dumps({"format": "something-else"}) + "\n")
+    with pytest.raises(ValueError):
+        planfile.read_plan(tmp_path / "plan.ndjson", tmp_path)
+
+
+def test_cli_plan_then_apply(populated_project: Path):
+    root = populated_project
+    plan_path = root.parent / "plan.ndjson"
+
+    # The check job fails and leaves a plan behind
+    assert main(["--check", "--override", "--plan-out", str(plan_path), "--root", str(root)]) == 1
+    planned = [json.loads(line)["path"] for line in plan_path.read_text().splitlines()[1:]]
+    assert sorted(planned) == ["src/a/b/c/d/e/deep_file.py", "src/dirty_file.py", "src/incorrect_file.py"]
+
+    # One file changes before the fix job runs
+    (root / "src" / "dirty_file.py").write_text("print('edited')\n")
+
+    with mock.patch("autoheader.cli.plan_files") as plan_files:
+        assert main(["--apply-plan", str(plan_path), "--no-dry-run", "--yes", "--root", str(root)]) == 1
+    plan_files.assert_not_called()
+
+    assert (root / "src" / "incorrect_file.py").read_text().startswith("# src/incorrect_file.py\n")
+    assert (root / "src" / "dirty_file.py").read_text() == "print('edited')\n"
+
+
+@pytest.mark.parametrize(
+    "record",
+    [
+        ["a.py"],
+        {"path": "a.py", "fingerprint": {}, "prefix": "# ", "check_encoding": True, "template": "# {path}", "analysis_mode": "ast"},
+        {"path": "a.py", "fingerprint": [], "action": "add", "prefix": "# ", "check_encoding": True, "template": "# {path}", "analysis_mode": "ast"},
+        {"path": "a.py", "fingerprint": {}, "action": "add", "prefix": "# ", "check_encoding": True, "template": "# {path}", "analysis_mode": "ast", "colour": "red"},
+    ],
+    ids=["not-an-object", "missing-action", "fingerprint-list", "unknown-field"],
+)
+def test_malformed_plan_fails_cleanly(project_root: Path, record, capsys):
+    (project_root / "a.py").write_text("x = 1\n")
+    header = {"format": planfile.PLAN_FORMAT, "version": planfile.PLAN_VERSION}
+    plan_path = project_root.parent / "plan.ndjson"
+    plan_path.write_text(json.dumps(header) + "\n" + json.dumps(record) + "\n")
+
+    with pytest.raises(ValueError, match="malformed plan record"):
+        planfile.read_plan(plan_path, project_root)
+    assert main(["--apply-plan", str(plan_path), "--yes", "--root", str(project_root)]) == 1
+    assert "Failed to load plan" in capsys.readouterr().out
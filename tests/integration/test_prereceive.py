@@ -0,0 +1,153 @@
+# tests/integration/test_prereceive.py
+
+from pathlib import Path
+from unittest import mock
+import io
+import json
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+import autoheader
+from autoheader.cli import main
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="git not installed")
+
+ZERO = "0" * 40
+
+
+def _git(root: Path, *args: str) -> str:
+    result = subprocess.run(
+        ["git", "-C", str(root), "-c", "user.name=t", "-c", "user.email=t@t", *args],
+        check=True, capture_output=True, text=True,
+    )
+    return result.stdout.strip()
+
+
+@pytest.fixture
+def repo(tmp_path: Path) -> Path:
+    root = tmp_path / "repo"
+    (root / "src").mkdir(parents=True)
+    for name in ("a.py", "b.py"):
+        (root / "src" / name).write_text(f"# src/{name}\n\nx = 1\n")
+    (root / "README.md").write_text("docs\n")
+    _git(root, "init", "-q", "-b", "main")
+    _git(root, "add", ".")
+    _git(root, "commit", "-q", "-m", "base")
+    return root
+
+
+def _pre_receive(root: Path, lines: str, *args: str) -> int:
+    with mock.patch("sys.stdin", io.StringIO(lines)):
+        return main(["pre-receive", "--root", str(root), *args])
+
+
+def test_pre_receive_checks_only_pushed_blobs(repo: Path, capsys):
+    base = _git(repo, "rev-parse", "HEAD")
+    (repo / "src" / "b.py").write_text("x = 2\n")
+    (repo / "src" / "c.py").write_text("# src/c.py\n\ny = 1\n")
+    _git(repo, "add", ".")
+    _git(repo, "commit", "-q", "-m", "change")
+    new = _git(repo, "rev-parse", "HEAD")
+
+    assert _pre_receive(repo, f"{base} {new} refs/heads/main\n") == 1
+    out = capsys.readouterr().out
+    assert "- refs/heads/main: src/b.py (Action: add)" in out
+    assert "a.py" not in out and "c.py" not in out
+
+    # Deleting a ref checks nothing; a new ref checks its whole tree
+    assert _pre_receive(repo, f"{new} {ZERO} refs/heads/old\n") == 0
+    assert _pre_receive(repo, f"{ZERO} {base} refs/heads/new\n") == 0
+
+    assert _pre_receive(repo, f"{base} {new} refs/heads/main\n", "--format", "sarif") == 1
+    report = json.loads(capsys.readouterr().out)
+    assert [r["locations"][0]["physicalLocation"]["artifactLocation"]["uri"] for r in report["runs"][0]["results"]] == ["src/b.py"]
+
+
+def test_pre_receive_reuses_verdicts(repo: Path, capsys):
+    base = _git(repo, "rev-parse", "HEAD")
+    (repo / "src" / "b.py").write_text("x = 2\n")
+    _git(repo, "commit", "-q", "-am", "change")
+    new = _git(repo, "rev-parse", "HEAD")
+    update = f"{base} {new} refs/heads/main\n"
+
+    assert _pre_receive(repo, update) == 1
+    verdicts = json.loads((repo / ".git" / "autoheader-verdicts.json").read_text())["verdicts"]
+    assert list(verdicts.values()) == [["add", ""]]
+
+    # The same push again reads no blobs, and reports the same result
+    with mock.patch("autoheader.git.BlobReader.read", side_effect=AssertionError("re-read")):
+        assert _pre_receive(repo, update) == 1
+    assert "src/b.py (Action: add)" in capsys.readouterr().out
+
+    # Another configuration invalidates every verdict
+    (repo / "autoheader.toml").write_text('[exclude]\npaths = ["src/b*"]\n')
+    assert _pre_receive(repo, update) == 0
+
+
+def test_pre_receive_new_ref_checks_only_new_blobs(repo: Path, capsys):
+    base = _git(repo, "rev-parse", "HEAD")
+    (repo / "src" / "c.py").write_text("y = 1\n")
+    _git(repo, "add", ".")
+    # A commit no ref reaches yet, as in a pushed branch
+    branch = _git(repo, "-c", "user.name=t", "-c", "user.email=t@t", "commit-tree", _git(repo, "write-tree"), "-p", base, "-m", "c")
+    (repo / "src" / "a.py").write_text("x = 2\n")
+    _git(repo, "add", ".")
+    other = _git(repo, "-c", "user.name=t", "-c", "user.email=t@t", "commit-tree", _git(repo, "write-tree"), "-p", branch, "-m", "a")
+
+    checked = []
+    read = autoheader.git.BlobReader.read
+
+    def tracking_read(self, shas, **kwargs):
+        checked.append(len(shas))
+        return read(self, shas, **kwargs)
+
+    with mock.patch("autoheader.git.subprocess.Popen", wraps=subprocess.Popen) as popen, \
+            mock.patch("autoheader.git.BlobReader.read", tracking_read):
+        assert _pre_receive(repo, f"{ZERO} {branch} refs/heads/c\n{ZERO} {other} refs/heads/a\n") == 1
+    out = capsys.readouterr().out
+    assert "- refs/heads/c: src/c.py (Action: add)" in out
+    assert "- refs/heads/a: src/a.py (Action: add)" in out
+    assert "b.py" not in out
+    # Only the new blobs are read, from one cat-file process for the whole push
+    assert checked == [1, 1]
+    assert sum("cat-file" in call.args[0] for call in popen.call_args_list) == 1
+
+
+def test_pre_receive_survives_a_corrupt_verdict_store(repo: Path):
+    base = _git(repo, "rev-parse", "HEAD")
+    (repo / "src" / "b.py").write_text("x = 2\n")
+    _git(repo, "commit", "-q", "-am", "change")
+    new = _git(repo, "rev-parse", "HEAD")
+    store = repo / ".git" / "autoheader-verdicts.json"
+    store.write_text('{"config": "')
+
+    assert _pre_receive(repo, f"{base} {new} refs/heads/main\n") == 1
+    assert list(json.loads(store.read_text())["verdicts"].values()) == [["add", ""]]
+    assert [p.name for p in store.parent.iterdir() if p.name.endswith(".tmp")] == []
+
+
+def test_pre_receive_rejects_a_real_push(repo: Path, tmp_path: Path):
+    server = tmp_path / "server.git"
+    _git(tmp_path, "clone", "-q", "--bare", str(repo), str(server))
+    src = Path(autoheader.__file__).resolve().parents[1]
+    hook = server / "hooks" / "pre-receive"
+    hook.write_text(
+        f"#!{sys.executable}\nimport sys\nsys.path.insert(0, {str(src)!r})\n"
+        "from autoheader.cli import main\nsys.exit(main(['pre-receive']))\n"
+    )
+    hook.chmod(0o755)
+    _git(repo, "remote", "add", "origin", str(server))
+
+    (repo / "src" / "b.py").write_text("x = 2\n")
+    _git(repo, "commit", "-q", "-am", "drop header")
+    result = subprocess.run(["git", "-C", str(repo), "push", "origin", "main"], capture_output=True, text=True)
+    assert result.returncode != 0
+    assert "src/b.py (Action: add)" in result.stderr
+
+    (repo / "src" / "b.py").write_text("# src/b.py\n\nx = 2\n")
+    _git(repo, "commit", "-q", "-am", "fix header")
+    _git(repo, "push", "-q", "origin", "main")
+    assert (server / "autoheader-verdicts.json").is_file()
@@ -0,0 +1,46 @@
+# tests/integration/test_sniff.py
+
+from pathlib import Path
+
+from autoheader.cli import main
+
+
+def test_cli_sniff_manages_extensionless_scripts(tmp_path: Path):
+    root = tmp_path / "proj"
+    (root / "bin").mkdir(parents=True)
+    (root / "pyproject.toml").write_text("[project]\nname = 'proj'\n")
+    (root / "README.md").write_text("proj\n")
+    (root / "bin" / "tool").write_text("#!/usr/bin/env python3\nprint('hi')\n")
+    (root / "bin" / "data").write_text("1,2,3\n")
+    (root / "node_modules" / ".bin").mkdir(parents=True)
+    (root / "node_modules" / ".bin" / "dep").write_text("#!/usr/bin/env python3\n")
+
+    assert main(["--check", "--root", str(root)]) == 0  # Not without --sniff
+    assert main(["--check", "--sniff", "--root", str(root)]) == 1
+
+    assert main(["--sniff", "--no-dry-run", "--yes", "--root", str(root)]) == 0
+    assert (root / "bin" / "tool").read_text() == "#!/usr/bin/env python3\n# bin/tool\n\nprint('hi')\n"
+    assert (root / "bin" / "data").read_text() == "1,2,3\n"
+    assert (root / "node_modules" / ".bin" / "dep").read_text() == "#!/usr/bin/env python3\n"
+    assert (root / ".autoheader_sniff").is_file()
+
+    # [detection] sniff turns it on from the config
+    (root / "autoheader.toml").write_text("[detection]\nsniff = true\n")
+    (root / "bin" / "other").write_text("#!/usr/bin/python3\n")
+    assert main(["--check", "--root", str(root)]) == 1
+
+
+def test_sniffed_shell_script_keeps_its_shebang_first(tmp_path: Path):
+    root = tmp_path / "proj"
+    (root / "bin").mkdir(parents=True)
+    (root / "pyproject.toml").write_text("[project]\nname = 'proj'\n")
+    (root / "README.md").write_text("proj\n")
+    # A language without check_encoding: the shebang is still skipped
+    (root / "autoheader.toml").write_text(
+        '[language.shell]\nfile_globs = ["*.sh"]\nprefix = "# "\ntemplate = "# {path}"\ninterpreters = ["bash", "sh"]\n'
+    )
+    (root / "bin" / "tool").write_text("#!/bin/bash\necho hi\n")
+
+    assert main(["--sniff", "--no-dry-run", "--yes", "--root", str(root)]) == 0
+    assert (root / "bin" / "tool").read_text().splitlines() == ["#!/bin/bash", "# bin/tool", "", "echo hi"]
+    assert main(["--check", "--sniff", "--root", str(root)]) == 0
@@ -0,0 +1,152 @@
+# tests/integration/test_watch.py
+
+from pathlib import Path
+import sys
+import time
+
+import pytest
+
+from autoheader import journal
+from autoheader.filters import is_excluded_dir
+
+pytestmark = pytest.mark.skipif(not sys.platform.startswith("linux"), reason="needs inotify")
+
+
+@pytest.fixture
+def watcher(project_root: Path):
+    from autoheader.watch import Watcher
+
+    (project_root / "src").mkdir()
+    (project_root / "node_modules").mkdir()
+    w = Watcher(project_root, workers=2, debounce=0.05)
+    yield w
+    w.close()
+
+
+def _settle(watcher, timeout: float = 2.0):
+    """Reads events until the tree has been quiet for one debounce period, then flushes."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if not watcher.poll(watcher.debounce) and watcher.has_pending:
+            break
+    return watcher.flush()
+
+
+def test_new_file_gets_header(watcher, project_root: Path):
+    (project_root / "src" / "new.py").write_text("x = 1\n")
+    assert _settle(watcher) == [("src/new.py", "add")]
+    assert (project_root / "src" / "new.py").read_text() == "# src/new.py\n\nx = 1\n"
+    # Its own write is seen, but not acted on
+    watcher.poll(0.2)
+    assert project_root / "src" / "new.py" in watcher._pending
+    assert watcher._candidates(watcher._pending) == []
+
+
+def test_rename_rewrites_path_header(watcher, project_root: Path):
+    (project_root / "src" / "old.py").write_text("# src/old.py\n\nx = 1\n")
+    _settle(watcher)
+    (project_root / "src" / "old.py").rename(project_root / "src" / "new.py")
+    assert _settle(watcher) == [("src/new.py", "override")]
+    assert (project_root / "src" / "new.py").read_text().startswith("# src/new.py\n")
+
+
+def test_rename_keeps_a_custom_header(watcher, project_root: Path):
+    (project_root / "src" / "old.py").write_text("# Copyright ACME, all rights reserved\n\nx = 1\n")
+    _settle(watcher, timeout=0.3)
+    (project_root / "src" / "old.py").rename(project_root / "src" / "new.py")
+    assert _settle(watcher, timeout=0.3) == []
+    assert (project_root / "src" / "new.py").read_text() == "# Copyright ACME, all rights reserved\n\nx = 1\n"
+
+
+def test_directory_rename_and_new_directories(watcher, project_root: Path):
+    pkg = project_root / "src" / "pkg"
+    pkg.mkdir()
+    (pkg / "mod.py").write_text("x = 1\n")
+    assert _settle(watcher) == [("src/pkg/mod.py", "add")]
+
+    pkg.rename(project_root / "src" / "lib")
+    assert _settle(watcher) == [("src/lib/mod.py", "override")]
+    # The moved directory is still watched, under its new name
+    (project_root / "src" / "lib" / "more.py").write_text("y = 2\n")
+    assert _settle(watcher) == [("src/lib/more.py", "add")]
+
+
+def test_excluded_directories_are_not_watched(watcher, project_root: Path):
+    assert project_root / "node_modules" not in watcher._dirs.values()
+    (project_root / "node_modules" / "dep.py").write_text("x = 1\n")
+    (project_root / "notes.txt").write_text("not managed\n")
+    _settle(watcher, timeout=0.3)
+    assert (project_root / "node_modules" / "dep.py").read_text() == "x = 1\n"
+    assert is_excluded_dir(project_root / "a" / ".git" / "b", project_root, [])
+    assert not is_excluded_dir(project_root / "src", project_root, ["docs/"])
+
+
+def test_batches_are_journaled(watcher, project_root: Path):
+    for name in ("a.py", "b.py", "c.py"):
+        (project_root / "src" / name).write_text("x = 1\n")
+    assert [rel for rel, _ in _settle(watcher)] == ["src/a.py", "src/b.py", "src/c.py"]
+    result = journal.undo(project_root, journal.resolve_run(project_root, "latest"))
+    assert sorted(result.restored) == ["src/a.py", "src/b.py", "src/c.py"]
+
+
+def test_session_keeps_journals_of_other_runs(watcher, project_root: Path):
+    from autoheader.cli import main
+
+    (project_root / "src" / "cli.py").write_text("x = 1\n")
+    assert main(["--no-dry-run", "--yes", "--root", str(project_root), str(project_root / "src" / "cli.py")]) == 0
+    cli_run = journal.resolve_run(project_root, "latest")
+    _settle(watcher, timeout=0.3)  # The CLI's own write
+
+    for i in range(12):
+        (project_root / "src" / f"m{i}.py").write_text("x = 1\n")
+        assert _settle(watcher) == [(f"src/m{i}.py", "add")]
+    assert cli_run in journal.list_runs(project_root)
+    assert len(journal.list_runs(project_root)) == 2  # The CLI run and the watch session
+
+    assert journal.undo(project_root, cli_run).restored == ["src/cli.py"]
+    assert (project_root / "src" / "cli.py").read_text() == "x = 1\n"
+
+
+def test_cli_dispatches_watch(monkeypatch, tmp_path: Path):
+    from autoheader.cli import main
+
+    calls = []
+    monkeypatch.setattr("autoheader.watch.main", lambda argv: calls.append(argv) or 0)
+    assert main(["watch", "--root", str(tmp_path)]) == 0
+    assert calls == [["--root", str(tmp_path)]]
+
+
+def test_queue_overflow_rescans(watcher, project_root: Path):
+    from autoheader.watch import IN_Q_OVERFLOW
+
+    (project_root / "src" / "missed.py").write_text("x = 1\n")
+    watcher.handle_event(-1, IN_Q_OVERFLOW, 0, "")
+    assert _settle(watcher) == [("src/missed.py", "add")]
+
+
+def test_run_until_stopped(watcher, project_root: Path):
+    import threading
+
+    stop = threading.Event()
+    thread = threading.Thread(target=watcher.run, args=(stop,))
+    thread.start()
+    try:
+        target = project_root / "src" / "live.py"
+        target.write_text("x = 1\n")
+        deadline = time.monotonic() + 5
+        while not target.read_text().startswith("# src/live.py") and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        stop.set()
+        thread.join()
+    assert target.read_text() == "# src/live.py\n\nx = 1\n"
+
+
+def test_main_reports_unavailable_inotify(monkeypatch, tmp_path: Path):
+    from autoheader import watch
+
+    def unavailable():
+        raise OSError(38, "inotify is not available on this platform")
+
+    monkeypatch.setattr(watch, "Inotify", unavailable)
+    assert watch.main(["--root", str(tmp_path)]) == 1
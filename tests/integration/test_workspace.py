@@ -0,0 +1,88 @@
+# tests/integration/test_workspace.py
+
+from pathlib import Path
+import json
+
+import pytest
+
+from autoheader.cli import main
+from autoheader.config import load_general_config, load_language_configs
+from autoheader.models import RuntimeContext
+from autoheader.workspace import ConfigTrie, Package, Workspace
+
+
+def _monorepo(root: Path) -> Path:
+    (root / "tools").mkdir(parents=True)
+    (root / "pyproject.toml").write_text("[project]\nname = 'mono'\n")
+    (root / "README.md").write_text("mono\n")
+    (root / "tools" / "run.py").write_text("x = 1\n")
+    api = root / "packages" / "api"
+    (api / "src").mkdir(parents=True)
+    (api / "autoheader.toml").write_text(
+        '[language.python]\nfile_globs = ["*.py"]\nprefix = "# "\ntemplate = "# api: {path}"\n'
+    )
+    (api / "src" / "server.py").write_text("x = 1\n")
+    web = root / "packages" / "web"
+    (web / "lib" / "vendor").mkdir(parents=True)
+    (web / "autoheader.toml").write_text('[exclude]\npaths = ["lib/vendor/*"]\n')
+    (web / "lib" / "app.py").write_text("x = 1\n")
+    (web / "lib" / "vendor" / "dep.py").write_text("x = 1\n")
+    return root
+
+
+def _context(root: Path) -> RuntimeContext:
+    return RuntimeContext(root=root, excludes=[], depth=None, override=False, remove=False, check_hash=False, timeout=60.0)
+
+
+def test_config_trie_nearest_package(tmp_path: Path):
+    context = _context(tmp_path)
+    root, api = Package(".", [], context), Package("packages/api", [], context)
+    trie = ConfigTrie(root)
+    trie.insert(("packages", "api"), api)
+    assert trie.lookup(("packages", "api", "src", "deep")) is api
+    assert trie.lookup(("packages", "api")) is api
+    assert trie.lookup(("packages",)) is root
+    assert trie.lookup(("packages", "apix")) is root
+    assert trie.lookup(()) is root
+
+
+def test_workspace_plans_packages_with_their_configs(tmp_path: Path):
+    root = _monorepo(tmp_path / "mono")
+    languages = load_language_configs({}, load_general_config({}))
+    ws = Workspace(_context(root), languages)
+    assert [p.name for p in ws.packages] == [".", "packages/api", "packages/web"]
+
+    generator, total = ws.plan(workers=2, cache={})
+    items = {item.rel_posix: item for item, _ in generator}
+    assert total == len(items) == 4
+    assert items["tools/run.py"].header_path is None
+    assert items["packages/api/src/server.py"].header_path == "src/server.py"
+    assert items["packages/api/src/server.py"].template == "# api: {path}"
+    assert items["packages/web/lib/app.py"].action == "add"
+    assert items["packages/web/lib/vendor/dep.py"].action == "skip-excluded"
+
+
+def test_cli_workspace_run(tmp_path: Path, capsys):
+    root = _monorepo(tmp_path / "mono")
+    assert main(["--workspace", "--no-dry-run", "--yes", "--root", str(root)]) == 0
+    out = capsys.readouterr().out
+    assert (root / "packages" / "api" / "src" / "server.py").read_text() == "# api: src/server.py\n\nx = 1\n"
+    assert (root / "packages" / "web" / "lib" / "app.py").read_text().startswith("# lib/app.py\n")
+    assert (root / "tools" / "run.py").read_text().startswith("# tools/run.py\n")
+    assert (root / "packages" / "web" / "lib" / "vendor" / "dep.py").read_text() == "x = 1\n"
+    assert "packages/api: added=1" in out
+    assert "packages/web: added=1" in out and "skipped_excluded=1" in out
+
+    # One cache for the whole workspace, keyed by workspace paths
+    cache = json.loads((root / ".autoheader_cache").read_text())
+    assert {"tools/run.py", "packages/api/src/server.py", "packages/web/lib/app.py"} <= set(cache)
+    assert not (root / "packages" / "api" / ".autoheader_cache").exists()
+
+    assert main(["--workspace", "--check", "--root", str(root)]) == 0
+
+
+def test_cli_workspace_rejects_selections(tmp_path: Path, capsys):
+    root = _monorepo(tmp_path / "mono")
+    with pytest.raises(SystemExit):
+        main(["--workspace", "--check", "--root", str(root), str(root / "tools" / "run.py")])
+    assert "--workspace plans the whole tree" in capsys.readouterr().err
@@ -3,6 +3,8 @@ import os
 import stat
 from pathlib import Path
 from unittest.mock import MagicMock, patch
+import shutil
+import subprocess
 import pytest
 from autoheader import hooks
 
@@ -33,7 +35,8 @@ def test_install_native_hook_success(tmp_path, capsys):
 
     content = hook_path.read_text()
     assert "#!/bin/sh" in content
-    assert "autoheader --check" in content
+    assert "xargs -0 -r autoheader --check --staged --" in content
+    assert "git diff --cached --name-only" in content
 
     # Check permissions (executable)
     # On Windows this might be tricky, but on Linux/Mac:
@@ -64,3 +67,26 @@ def test_install_native_hook_already_exists(tmp_path, capsys):
 
     captured = capsys.readouterr()
     assert "Hook already exists" in captured.out
+
+@pytest.mark.skipif(os.name != "posix" or shutil.which("git") is None, reason="needs sh and git")
+def test_native_hook_skips_autoheader_when_nothing_is_staged(tmp_path):
+    """A commit with no added or modified files must not run autoheader."""
+    subprocess.run(["git", "init", "-q"], cwd=tmp_path, check=True)
+    hooks.install_native_hook(tmp_path)
+
+    # A stand-in autoheader that records being run
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    fake = bin_dir / "autoheader"
+    fake.write_text(f"#!/bin/sh\necho \"$@\" > {tmp_path / 'ran'}\n")
+    fake.chmod(0o755)
+    env = {**os.environ, "PATH": f"{bin_dir}{os.pathsep}{os.environ['PATH']}"}
+
+    hook = tmp_path / ".git" / "hooks" / "pre-commit"
+    subprocess.run([str(hook)], cwd=tmp_path, env=env, check=True)
+    assert not (tmp_path / "ran").exists()
+
+    (tmp_path / "a.py").write_text("x = 1\n")
+    subprocess.run(["git", "add", "a.py"], cwd=tmp_path, check=True)
+    subprocess.run([str(hook)], cwd=tmp_path, env=env, check=True)
+    assert (tmp_path / "ran").read_text() == "--check --staged -- a.py\n"
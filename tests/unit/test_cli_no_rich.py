@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 from unittest.mock import patch
+import argparse
 import sys
 import importlib
 
@@ -12,4 +13,14 @@ def test_build_parser_no_rich():
         from autoheader import cli
         importlib.reload(cli)
         parser = cli.build_parser()
-        assert "RichHelpFormatter" not in str(parser.formatter_class)
+        cli.use_rich_help(parser)
+        assert parser.formatter_class is argparse.HelpFormatter
+        assert "usage: autoheader" in parser.format_help()
+
+
+def test_rich_help_only_when_asked():
+    from autoheader import cli
+    parser = cli.build_parser()
+    assert parser.formatter_class is argparse.HelpFormatter
+    cli.use_rich_help(parser)
+    assert "RichHelpFormatter" in str(parser.formatter_class)
@@ -1,5 +1,6 @@
 
 from pathlib import Path
+import pytest
 from unittest.mock import patch, MagicMock
 from autoheader.config import (
     fetch_remote_config_safe,
@@ -95,6 +96,26 @@ def test_load_general_config_empty():
     assert config == {}
 
 
+def test_load_general_config_rejects_unknown_hash():
+    assert load_general_config({"general": {"cache_hash": "blake2b"}})["cache_hash"] == "blake2b"
+    with pytest.raises(ValueError, match="general.header_hash must be one of blake2b, sha256, not 'md5'"):
+        load_general_config({"general": {"header_hash": "md5"}})
+
+
+def test_load_general_config_rejects_unknown_fsync_mode():
+    assert load_general_config({"general": {"fsync": "batch"}})["fsync"] == "batch"
+    with pytest.raises(ValueError, match="general.fsync must be one of none, file, batch, not 'always'"):
+        load_general_config({"general": {"fsync": "always"}})
+
+
+def test_cli_reports_invalid_config(tmp_path: Path, capsys):
+    from autoheader.cli import main
+
+    (tmp_path / "autoheader.toml").write_text('[general]\ncache_hash = "crc32"\n')
+    assert main(["--check", "--root", str(tmp_path)]) == 1
+    assert "Invalid autoheader.toml: general.cache_hash must be one of" in capsys.readouterr().out
+
+
 def test_load_language_configs_invalid_entry():
     toml_data = {"language": {"python": "invalid"}}
     result = load_language_configs(toml_data, {})
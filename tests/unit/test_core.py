@@ -1,5 +1,6 @@
 
 from pathlib import Path
+import hashlib
 from unittest.mock import MagicMock, patch
 import pytest
 import logging
@@ -91,13 +92,11 @@ def test_write_with_header_remove():
         analysis_mode="auto",
     )
 
-    with patch("autoheader.core.filesystem.read_file_lines", return_value=["# My Header", "import os"]), \
-         patch("autoheader.core.filesystem.write_file_content") as mock_write, \
-         patch("autoheader.core.headerlogic.build_removed_lines", return_value=["import os"]), \
-         patch("autoheader.core.filesystem.get_file_hash", return_value="new_hash"):
+    with patch("autoheader.core.filesystem.read_file_bytes", return_value=b"# My Header\nimport os\n"), \
+         patch("autoheader.core.filesystem.write_file_bytes") as mock_write:
         write_with_header(item, backup=False, dry_run=False, blank_lines_after=1)
         mock_write.assert_called_once()
-        assert "# My Header" not in mock_write.call_args[0][1]
+        assert b"".join(mock_write.call_args[0][1]) == b"import os\n"
 
 def test_write_with_header_dry_run():
     item = PlanItem(
@@ -110,10 +109,11 @@ def test_write_with_header_dry_run():
         analysis_mode="auto",
     )
 
-    with patch("autoheader.core.filesystem.read_file_lines", return_value=["import os"]), \
-         patch("autoheader.core.filesystem.get_file_hash", return_value="new_hash"):
-        _, _, _, diff_info = write_with_header(item, backup=False, dry_run=True, blank_lines_after=1)
+    with patch("autoheader.core.filesystem.read_file_bytes", return_value=b"import os\n"):
+        _, _, new_hash, diff_info = write_with_header(item, backup=False, dry_run=True, blank_lines_after=1)
         assert diff_info is not None
+        # Dry runs report the hash of the untouched file
+        assert new_hash == "b2:" + hashlib.blake2b(b"import os\n", digest_size=16).hexdigest()
 
 def test_write_with_header_add():
     item = PlanItem(
@@ -126,10 +126,11 @@ def test_write_with_header_add():
         analysis_mode="auto",
     )
 
-    with patch("autoheader.core.filesystem.read_file_lines", return_value=["import os"]), \
-         patch("autoheader.core.filesystem.write_file_content") as mock_write, \
-         patch("autoheader.core.headerlogic.build_new_lines", return_value=["# New Header", "import os"]), \
-         patch("autoheader.core.filesystem.get_file_hash", return_value="new_hash"):
-        write_with_header(item, backup=False, dry_run=False, blank_lines_after=1)
+    with patch("autoheader.core.filesystem.read_file_bytes", return_value=b"import os\r\n"), \
+         patch("autoheader.core.filesystem.write_file_bytes") as mock_write, \
+         patch("autoheader.core.headerlogic.header_line_for", return_value="# New Header"):
+        _, _, new_hash, _ = write_with_header(item, backup=False, dry_run=False, blank_lines_after=1)
         mock_write.assert_called_once()
-        assert "# New Header" in mock_write.call_args[0][1]
+        written = b"".join(mock_write.call_args[0][1])
+        assert written == b"# New Header\r\n\r\nimport os\r\n"
+        assert new_hash == "b2:" + hashlib.blake2b(written, digest_size=16).hexdigest()
@@ -1,5 +1,6 @@
 
 from pathlib import Path
+import os
 from unittest.mock import patch
 from autoheader.filesystem import read_file_lines, write_file_content, get_file_hash, load_gitignore_patterns, find_configured_files, save_cache, load_cache
 from autoheader.models import LanguageConfig
@@ -95,3 +96,17 @@ def test_load_cache_io_error(fs):
     with patch("pathlib.Path.open", side_effect=IOError("Permission denied")):
         cache = load_cache(Path(fs.cwd))
         assert cache == {}
+
+
+
+def test_write_file_content_without_fchmod_or_fchown(tmp_path: Path, monkeypatch):
+    """Windows has no os.fchmod/os.fchown/os.getuid: the mode is kept through os.chmod."""
+    target = tmp_path / "tool.py"
+    target.write_text("x = 1\n")
+    target.chmod(0o750)
+    for name in ("fchmod", "fchown", "getuid", "getgid"):
+        monkeypatch.delattr(os, name)
+    write_file_content(target, "# tool.py\nx = 1\n", "x = 1\n", backup=False, dry_run=False)
+    monkeypatch.undo()
+    assert target.read_text() == "# tool.py\nx = 1\n"
+    assert target.stat().st_mode & 0o777 == 0o750
@@ -2,7 +2,8 @@
 
 import pytest
 from pathlib import Path
-from autoheader.filters import is_excluded, within_depth
+from autoheader.filters import LanguageIndex, is_excluded, within_depth
+from autoheader.models import LanguageConfig
 
 # Fixture for a mock root
 @pytest.fixture
@@ -76,3 +77,44 @@ def test_within_depth(root: Path, path_str: str, max_depth: int | None, expected
     """
     path = root / path_str
     assert within_depth(path, root, max_depth) == expected
+
+
+# --- test_language_index ---
+
+def _lang(name: str, *globs: str) -> LanguageConfig:
+    return LanguageConfig(name, list(globs), "# ", False, "# {path}")
+
+
+LANGUAGES = [
+    _lang("tests", "tests/*.py"),
+    _lang("python", "*.py", "*.pyi"),
+    _lang("make", "Makefile", "*.mk"),
+    _lang("archives", "*.tar.gz"),
+    _lang("c", "*.[ch]", "**/*.py"),
+]
+
+
+@pytest.mark.parametrize(
+    "path_str, expected",
+    [
+        ("tests/test_x.py", "tests"),  # Earlier complex glob beats a later extension
+        ("src/tests/test_x.py", "tests"),
+        ("src/mod.py", "python"),
+        ("src/mod.pyi", "python"),
+        ("Makefile", "make"),
+        ("build/rules.mk", "make"),
+        ("dist/pkg.tar.gz", "archives"),
+        ("src/x.c", "c"),
+        ("src/x.h", "c"),
+        ("README.md", None),
+        ("Makefile.bak", None),
+        ("py", None),
+    ],
+)
+def test_language_index_matches_path_match(path_str: str, expected: str | None):
+    """The index agrees with a first-match Path.match() scan over every glob."""
+    path = Path(path_str)
+    lang = LanguageIndex(LANGUAGES).lookup(path)
+    assert (lang.name if lang else None) == expected
+    first = next((l for l in LANGUAGES for glob in l.file_globs if path.match(glob)), None)
+    assert lang is first
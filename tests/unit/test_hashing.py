@@ -0,0 +1,40 @@
+import hashlib
+import pytest
+
+from autoheader import hashing
+
+
+def test_new_blake2b_digest_size():
+    assert hashing.new("blake2b", 16).digest_size == 16
+    assert hashing.new("blake2b").digest_size == 32
+    assert hashing.new("sha256", 16).digest_size == 32
+
+
+def test_new_unknown_algorithm():
+    with pytest.raises(ValueError, match="Unsupported hash algorithm"):
+        hashing.new("md5")
+
+
+@pytest.mark.parametrize("algorithm, value", [
+    ("sha256", "ab" * 32),
+    ("blake2b", "b2:" + "cd" * 16),
+])
+def test_format_and_parse_digest(algorithm, value):
+    algo, hexdigest = hashing.parse_digest(value)
+    assert algo == algorithm
+    assert hashing.format_digest(algo, hexdigest) == value
+
+
+def test_parse_digest_unknown_tag():
+    with pytest.raises(ValueError, match="Unknown hash tag"):
+        hashing.parse_digest("zz:abcd")
+
+
+def test_find_token():
+    legacy = hashlib.sha256(b"x").hexdigest()
+    assert hashing.find_token(f"# a.py hash:{legacy}") == ("sha256", legacy)
+    assert hashing.find_token("# a.py hash:b2:" + "ef" * 16) == ("blake2b", "ef" * 16)
+    # Unknown tags and short untagged digests are not verifiable
+    assert hashing.find_token("# a.py hash:zz:" + "ef" * 16) is None
+    assert hashing.find_token("# a.py hash:" + "ef" * 16) is None
+    assert hashing.find_token("# a.py") is None
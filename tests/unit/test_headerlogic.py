@@ -9,6 +9,13 @@ from autoheader.headerlogic import (
     build_new_lines,
     build_removed_lines,
     header_line_for,
+    detect_newline,
+    decode_lines,
+    line_offset,
+    build_new_bytes,
+    build_removed_bytes,
+    content_hash,
+    content_hash_from_line,
 )
 
 # --- header_line_for Tests ---
@@ -78,6 +85,12 @@ def test_analyze_header_state_shebang_and_encoding(lines, expected_index):
     analysis = analyze_header_state(lines, "", "#", check_encoding=True)
     assert analysis.insert_index == expected_index
 
+def test_analyze_header_state_shebang_without_check_encoding():
+    assert analyze_header_state(["#!/bin/bash", "echo hi"], "", "#", check_encoding=False).insert_index == 1
+    # Rust inner attributes are not shebangs; encoding cookies stay Python-only
+    assert analyze_header_state(["#![allow(dead_code)]"], "", "//", check_encoding=False).insert_index == 0
+    assert analyze_header_state(["# -*- coding: utf-8 -*-", "x"], "", "#", check_encoding=False).insert_index == 0
+
 def test_analyze_header_state_ast_mode_no_docstring():
     lines = ["import os", "print('hello')"]
     analysis = analyze_header_state(
@@ -188,3 +201,96 @@ def test_build_removed_lines_empty_existing_header():
     )
     result = build_removed_lines(lines, analysis)
     assert result == ["import os"]
+
+
+# --- Byte-preserving engine Tests ---
+
+@pytest.mark.parametrize("data, expected", [
+    (b"a\nb\n", b"\n"),
+    (b"a\r\nb\r\n", b"\r\n"),
+    (b"a\rb\r", b"\r"),
+    (b"no newline", b"\n"),
+])
+def test_detect_newline(data, expected):
+    assert detect_newline(data) == expected
+
+
+def test_decode_lines_strips_bom_and_crlf():
+    data = b"\xef\xbb\xbf#!/usr/bin/env python\r\nx = 1\r\n"
+    assert decode_lines(data) == ["#!/usr/bin/env python", "x = 1"]
+
+
+def test_line_offset_past_end():
+    assert line_offset(b"a\nb", 1) == 2
+    assert line_offset(b"a\nb", 5) == 3
+
+
+def test_build_new_bytes_preserves_tail():
+    data = b"#!/bin/sh\r\n\xff\xfe raw\r\n"
+    analysis = HeaderAnalysis(1, None, False)
+    chunks = build_new_bytes(data, "# head", analysis, False, 1)
+    assert isinstance(chunks[-1], memoryview)
+    assert b"".join(chunks) == b"#!/bin/sh\r\n# head\r\n\r\n\xff\xfe raw\r\n"
+
+
+def test_build_new_bytes_after_unterminated_line():
+    analysis = HeaderAnalysis(1, None, False)
+    chunks = build_new_bytes(b"#!/bin/sh", "# head", analysis, False, 0)
+    assert b"".join(chunks) == b"#!/bin/sh\n# head\n"
+
+
+def test_build_new_bytes_override_keeps_bom():
+    data = b"\xef\xbb\xbf# old\nx\n"
+    analysis = HeaderAnalysis(0, "# old", False)
+    chunks = build_new_bytes(data, "# new", analysis, True, 0)
+    assert b"".join(chunks) == b"\xef\xbb\xbf# new\nx\n"
+
+
+def test_build_removed_bytes():
+    data = b"# head\r\n\r\nx = 1"
+    analysis = HeaderAnalysis(0, "# head", True)
+    assert b"".join(build_removed_bytes(data, analysis)) == b"x = 1"
+    no_header = HeaderAnalysis(0, None, False)
+    assert b"".join(build_removed_bytes(data, no_header)) == data
+
+
+@pytest.mark.parametrize("data", [
+    b"a = 1\nb = 2\n",
+    b"a = 1\nb = 2",
+    b"a = 1\n\n",
+    b"caf\xc3\xa9\n",
+    b"a = 1\r\nb = 2\r\n",
+    b"bad \xff byte\n",
+    b"form\x0cfeed\n",
+    b"",
+])
+def test_content_hash_matches_legacy_definition(data):
+    text = data.decode("utf-8", errors="replace")
+    legacy = hashlib.sha256("\n".join(text.splitlines()).encode("utf-8")).hexdigest()
+    assert content_hash(data) == legacy
+
+
+def test_content_hash_from_line_matches_check_hash():
+    body = "import os\nprint(os.name)\n"
+    digest = content_hash(body.encode())
+    data = f"# test.py hash:{digest}\n{body}".encode()
+    lines = data.decode().splitlines()
+
+    assert content_hash_from_line(data, 1) == digest
+    analysis = analyze_header_state(
+        lines, "", "#", False, check_hash=True,
+        content_hasher=lambda i, algo, size: content_hash_from_line(data, i, algo, size),
+    )
+    assert not analysis.has_tampered_header
+
+
+@pytest.mark.parametrize("algorithm, token_prefix", [("sha256", ""), ("blake2b", "b2:")])
+def test_hash_placeholder_round_trip(algorithm, token_prefix):
+    body = "import os\n"
+    header = header_line_for("test.py", "# hash:{hash}", content=body.rstrip("\n"), hash_algorithm=algorithm)
+    assert header.startswith("# hash:" + token_prefix)
+
+    lines = [header] + body.splitlines()
+    assert not analyze_header_state(lines, "", "#", False, check_hash=True).has_tampered_header
+    lines.append("tampered = True")
+    assert analyze_header_state(lines, "", "#", False, check_hash=True).has_tampered_header
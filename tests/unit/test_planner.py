@@ -66,10 +66,31 @@ def test_analyze_single_file_stat_error(mock_path, lang_config, runtime_context)
 
 def test_analyze_single_file_too_large(mock_path, lang_config, runtime_context):
     mock_path.stat.return_value.st_size = MAX_FILE_SIZE_BYTES + 1
+    lang_config.template = "# {path}"
 
-    result, _ = _analyze_single_file((mock_path, lang_config, runtime_context), {})
-    assert result.action == "skip-excluded"
-    assert "exceeds limit" in result.reason
+    with patch("autoheader.planner.filesystem.get_file_hash", return_value="some_hash"), \
+         patch("autoheader.planner.filesystem.read_file_head", return_value=b"import os\n") as mock_head, \
+         patch("autoheader.planner.filesystem.file_contains", return_value=False), \
+         patch("autoheader.planner.filesystem.read_file_lines") as mock_read:
+        result, _ = _analyze_single_file((mock_path, lang_config, runtime_context), {})
+        assert result.action == "add"
+        assert result.streaming is True
+        mock_head.assert_called_once()
+        mock_read.assert_not_called()
+
+def test_analyze_single_file_too_large_with_hash_template(mock_path, lang_config, runtime_context):
+    mock_path.stat.return_value.st_size = MAX_FILE_SIZE_BYTES + 1
+    lang_config.template = "# {path} hash:{hash}"
+
+    with patch("autoheader.planner.filesystem.get_file_hash", return_value="some_hash"), \
+         patch("autoheader.planner.filesystem.read_file_head", return_value=b"import os\n"), \
+         patch("autoheader.planner.filesystem.file_contains", return_value=False), \
+         patch("autoheader.planner.filesystem.map_file") as mock_map:
+        mock_map.return_value.__enter__.return_value = b"import os\n"
+        result, _ = _analyze_single_file((mock_path, lang_config, runtime_context), {})
+        assert result.action == "add"
+        assert result.streaming is True
+        mock_map.assert_called_once_with(mock_path)
 
 def test_analyze_single_file_hash_failed(mock_path, lang_config, runtime_context):
     with patch("autoheader.planner.filesystem.get_file_hash", return_value=None):
@@ -158,3 +179,34 @@ def test_plan_files_no_files_provided(runtime_context, lang_config):
         generator, count = plan_files(runtime_context, None, languages, workers=1)
         list(generator) # Consume
         mock_find.assert_called_once_with(runtime_context.root, languages)
+
+@pytest.mark.parametrize(
+    "head, markers, expected",
+    [
+        (b"# Generated by the protocol buffer compiler.  DO NOT EDIT!\n", None, "generated (DO NOT EDIT)"),
+        (b"#!/usr/bin/env python\n# Copyright\n\n# @generated by openapi-generator\n", None, "generated (@generated)"),
+        (b"!function(){" + b"var a=1;" * 200, None, "minified"),  # One long line, cut by the head read
+        (b"# Generated by hand\nimport os\n", [], None),  # Markers are configurable
+        (b"# autogen: keep\nimport os\n", ["autogen: keep"], "generated (autogen: keep)"),
+        # Only the leading comment block counts, not strings, code or later comments
+        (b'MARKER = "@generated"\n', None, None),
+        (b'"""Generated by the protocol buffer compiler."""\n', None, None),
+        (b"# src/tool.py\nimport os\n# DO NOT EDIT below\n", None, None),
+        (b"// Code generated by protoc. DO NOT EDIT.\n", None, None),  # Not this language's comments
+    ],
+)
+def test_analyze_single_file_generated(mock_path, lang_config, runtime_context, head, markers, expected):
+    if markers is not None:
+        runtime_context.generated_markers = markers
+    with patch("autoheader.planner.filesystem.read_file_head", return_value=head), \
+         patch("autoheader.planner.filesystem.get_file_hash", return_value="some_hash") as mock_hash, \
+         patch("autoheader.planner.filesystem.read_file_lines", return_value=["import os"]) as mock_read:
+        result, cache_info = _analyze_single_file((mock_path, lang_config, runtime_context), {})
+    if expected is None:
+        assert result.action != "skip-generated"
+        return
+    assert result.action == "skip-generated"
+    assert result.reason == expected
+    assert cache_info is None
+    mock_hash.assert_not_called()
+    mock_read.assert_not_called()
@@ -0,0 +1,83 @@
+# tests/unit/test_sniff.py
+
+from pathlib import Path
+from unittest import mock
+
+import pytest
+
+from autoheader.models import LanguageConfig
+from autoheader.sniff import Sniffer, modeline_mode, shebang_interpreter
+
+PYTHON = LanguageConfig("python", ["*.py"], "# ", True, "# {path}")
+SHELL = LanguageConfig("bash", ["*.sh"], "# ", False, "# {path}", interpreters=["sh", "zsh"])
+
+
+@pytest.mark.parametrize(
+    "line, expected",
+    [
+        ("#!/usr/bin/python3", "python3"),
+        ("#!/usr/bin/env python3.11", "python3.11"),
+        ("#!/usr/bin/env -S PYTHONDONTWRITEBYTECODE=1 python3 -u", "python3"),
+        ("#! /bin/sh -e", "sh"),
+        ("# not a shebang", None),
+        ("#!", None),
+    ],
+)
+def test_shebang_interpreter(line: str, expected: str | None):
+    assert shebang_interpreter(line) == expected
+
+
+@pytest.mark.parametrize(
+    "line, expected",
+    [
+        ("# -*- mode: python; coding: utf-8 -*-", "python"),
+        ("# -*- Python -*-", "python"),
+        ("# -*- coding: utf-8 -*-", None),
+        ("# vim: set ft=sh ts=4:", "sh"),
+        ("# vi: filetype=bash", "bash"),
+        ("# just a comment", None),
+    ],
+)
+def test_modeline_mode(line: str, expected: str | None):
+    assert modeline_mode(line) == expected
+
+
+@pytest.mark.parametrize(
+    "head, expected",
+    [
+        (b"#!/usr/bin/env python3\nprint()\n", PYTHON),
+        (b"#!/bin/zsh\necho hi\n", SHELL),
+        (b"#!/bin/bash\n", SHELL),  # The language's own name
+        (b"#!/usr/bin/perl\n# vim: ft=sh\n", SHELL),  # Unknown interpreter: the modeline decides
+        (b"# -*- coding: latin-1 -*-\nx = 1\n", PYTHON),  # Encoding cookie
+        (b"#!/usr/bin/perl\nprint 1;\n", None),
+        (b"\x7fELF\x00\x00", None),
+        (b"", None),
+    ],
+)
+def test_classify(tmp_path: Path, head: bytes, expected):
+    assert Sniffer(tmp_path, [PYTHON, SHELL]).classify(head) is expected
+
+
+def test_verdicts_are_cached_by_fingerprint(tmp_path: Path):
+    (tmp_path / "bin").mkdir()
+    tool = tmp_path / "bin" / "tool"
+    tool.write_text("#!/usr/bin/env python3\n")
+    (tmp_path / "bin" / "notes.txt").write_text("#!/usr/bin/env python3\n")  # Has an extension
+    (tmp_path / "bin" / "setup.py").write_text("#!/usr/bin/env python3\n")  # A glob matches it
+
+    sniffer = Sniffer(tmp_path, [PYTHON, SHELL])
+    assert list(sniffer.find_scripts([])) == [(tool, PYTHON)]
+    sniffer.save()
+
+    # Unchanged files are not reopened
+    with mock.patch("autoheader.filesystem.read_file_head", side_effect=AssertionError("reopened")):
+        assert list(Sniffer(tmp_path, [PYTHON, SHELL]).find_scripts([])) == [(tool, PYTHON)]
+
+    tool.write_text("#!/bin/sh\necho changed\n")
+    assert list(Sniffer(tmp_path, [PYTHON, SHELL]).find_scripts([])) == [(tool, SHELL)]
+
+    # Other languages make every verdict stale
+    with mock.patch("autoheader.filesystem.read_file_head", return_value=b"") as read:
+        assert list(Sniffer(tmp_path, [PYTHON]).find_scripts([])) == []
+    assert read.called
@@ -9,6 +9,8 @@ from autoheader.ui import (
     confirm_continue,
     confirm_no_dry_run,
     show_header_diff,
+    strip_markup,
+    CliConsole,
 )
 
 
@@ -41,6 +43,8 @@ def test_format_summary():
     assert "removed=3" in result
     assert "skipped_ok=4" in result
     assert "skipped_excluded=5" in result
+    assert "not_checked_out" not in result
+    assert "not_checked_out=6" in format_summary(1, 2, 3, 4, 5, 6)
 
 
 def test_format_dry_run_note():
@@ -121,3 +125,26 @@ def test_show_header_diff_no_old_header():
     with patch("autoheader.ui.console.print") as mock_print:
         show_header_diff("src/main.py", None, "new header")
         mock_print.assert_called_once()
+
+
+def test_strip_markup():
+    assert strip_markup("✅ [green]ADD             [/green] src/main.py") == "✅ ADD              src/main.py"
+    assert strip_markup("[bold red]x[/bold red] = 1") == "x = 1"
+
+
+def test_plain_console_skips_rich(capsys):
+    console = CliConsole()
+    console.plain = True
+    console.print(format_action("ADD", "src/main.py", False, False))
+    with console.status("working"):
+        pass
+    assert capsys.readouterr().out == "✅ ADD              src/main.py\n"
+    assert console._rich is None
+
+    console.quiet = True
+    console.print("hidden")
+    assert capsys.readouterr().out == ""
+
+
+def test_strip_markup_keeps_escaped_brackets():
+    assert strip_markup("[white]continue? \\[y/N]: [/white]") == "continue? [y/N]: "